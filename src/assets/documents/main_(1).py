@@ -26,27 +26,58 @@ PAID OPTIONAL ENHANCEMENTS (Add when ready):
 Last Updated: 2025-11-12
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Security, Query
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Security, Query, Request
 from fastapi.security import APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Dict, Any, Literal
+from starlette.routing import Match
+from typing import List, Optional, Dict, Any, Literal, Tuple
 import asyncio
 import asyncpg
+import base64
+import bisect
+import contextvars
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager, contextmanager, AsyncExitStack
+from functools import lru_cache
 from datetime import datetime, timedelta
 import os
 import hashlib
 import json
+import multiprocessing
+import random
+import socket
+import sys
+import threading
+import time
+import traceback
+import uuid
+import weakref
 import httpx
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: {worker} in LOG_FILE falls back to the PID
 from enum import Enum
 import logging
+import logging.handlers
+import queue
 import re
-from collections import defaultdict
+from collections import Counter, defaultdict, deque
+from urllib.parse import parse_qsl, urlparse
 
 # AI Provider imports
 from openai import AsyncOpenAI
 from anthropic import AsyncAnthropic
 
+# Content scoring (a separate module so post-processing workers don't import this one)
+from scoring import (
+    BatchScorer, KeywordMatcher, PostProcessRequest, TextAnalysis,
+    add_smart_hashtags, assess_quality, calculate_seo_score, optimize_for_platform, run_post_processing
+)
+
 # ============================================
 # PAID OPTIONAL ENHANCEMENT: Redis Caching (+$10-15/month)
 # Reduces AI API costs by 30-50% through intelligent caching
@@ -59,17 +90,198 @@ from anthropic import AsyncAnthropic
 # LOGGING CONFIGURATION
 # ============================================
 
-# Create logs directory if it doesn't exist
-os.makedirs('logs', exist_ok=True)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("LOG_FILE", "logs/app.{worker}.log")  # Empty for console only; {worker}/{pid} give each worker its own file
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # text, or json for one object per line
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))  # Rotate past this size; 0 = never (external logrotate)
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "")  # Rotate on a schedule instead, e.g. "midnight" or "H"
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "10"))  # Rotated files kept
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Records waiting to be written; beyond it they're dropped
+LOG_INFO_SAMPLE_RATE = float(os.getenv("LOG_INFO_SAMPLE_RATE", "1.0"))  # Fraction of requests whose INFO lines are kept
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),  # Console output
-        logging.FileHandler('logs/app.log')  # File output
-    ]
-)
+# Whether the current request's INFO lines are kept (decided per request by middleware)
+log_sampled: contextvars.ContextVar[bool] = contextvars.ContextVar("log_sampled", default=True)
+
+class JSONLogFormatter(logging.Formatter):
+    """One JSON object per line, with the request's route and trace id when there is one"""
+    
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for key in ("route", "trace_id"):
+            value = getattr(record, key, None)
+            if value:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class RequestLogContext(logging.Filter):
+    """
+    Runs on the thread that logs: drops INFO and DEBUG lines of requests
+    left out by LOG_INFO_SAMPLE_RATE (warnings and errors are always kept)
+    and stamps records with the route and trace id, which only that thread
+    can read from its context variables.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.sampled_out = 0
+    
+    def filter(self, record):
+        if record.levelno <= logging.INFO and not log_sampled.get():
+            self.sampled_out += 1
+            return False
+        try:
+            route = current_route.get()
+            span = current_span.get()
+        except NameError:
+            return True  # Logged while the module is still loading
+        if route != "unknown":
+            record.route = route
+        if span is not None:
+            record.trace_id = span.trace_id
+        return True
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks or raises when the writer falls behind"""
+    
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record):
+        # Resolve the message and traceback now; the writer thread formats the rest
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class LogPipeline:
+    """
+    Non-blocking logging
+    
+    Loggers only put records on a bounded queue (a few microseconds, with
+    the message already rendered); a listener thread does the formatting
+    and the console and file I/O, so a slow disk or a full pipe can't stall
+    the event loop. If the writer falls behind by LOG_QUEUE_SIZE records,
+    new records are dropped and counted rather than waited for.
+    
+    The file rotates past LOG_MAX_BYTES or on the LOG_ROTATE_WHEN schedule,
+    keeping LOG_BACKUP_COUNT old files. Several workers must not rotate the
+    same file, so the default LOG_FILE gives each its own: {worker} is the
+    lowest slot number no running process holds (app.0.log, app.1.log, ...),
+    so restarted workers and redeploys reuse the same few file sets rather
+    than starting new ones. ({pid} also works, but leaves a file set per
+    process behind.) A shared path needs LOG_MAX_BYTES=0 and external
+    rotation (the file is reopened when it's moved away).
+    """
+    
+    def __init__(self):
+        self.queue = queue.Queue(LOG_QUEUE_SIZE)
+        self.handler = LogQueueHandler(self.queue)
+        self.context = RequestLogContext()
+        self.handler.addFilter(self.context)
+        self.path = LOG_FILE.replace("{pid}", str(os.getpid()))
+        self.listener = None
+        self._slot_lock = None
+    
+    def _claim_slot(self):
+        """
+        Resolve {worker} to the lowest free slot
+        
+        A slot is held by an flock on a .lock file beside its log, which the
+        kernel releases when the process exits - however it exits.
+        """
+        if fcntl is None:
+            self.path = self.path.replace("{worker}", str(os.getpid()))
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        slot = 0
+        while True:
+            path = self.path.replace("{worker}", str(slot))
+            lock = open(path + ".lock", "a")
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock.close()
+                slot += 1
+                continue
+            self.path, self._slot_lock = path, lock
+            return
+    
+    def _file_handler(self) -> logging.Handler:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if LOG_ROTATE_WHEN:
+            return logging.handlers.TimedRotatingFileHandler(
+                self.path, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, delay=True
+            )
+        if LOG_MAX_BYTES > 0:
+            return logging.handlers.RotatingFileHandler(
+                self.path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, delay=True
+            )
+        return logging.handlers.WatchedFileHandler(self.path, delay=True)
+    
+    def start(self):
+        handlers = [logging.StreamHandler()]  # Console output
+        if self.path:
+            if "{worker}" in self.path:
+                self._claim_slot()
+            handlers.append(self._file_handler())  # File output
+        formatter = (
+            JSONLogFormatter() if LOG_FORMAT == "json"
+            else logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        )
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        
+        logging.basicConfig(level=LOG_LEVEL, handlers=[self.handler])
+        self.listener = logging.handlers.QueueListener(self.queue, *handlers)
+        self.listener.start()
+    
+    def stop(self):
+        """Write out everything queued and close the files"""
+        if self.listener:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "format": LOG_FORMAT,
+            "file": self.path or None,
+            "rotation": (
+                f"every {LOG_ROTATE_WHEN}" if LOG_ROTATE_WHEN
+                else f"{LOG_MAX_BYTES} bytes" if LOG_MAX_BYTES > 0 else "external"
+            ),
+            "queued": self.queue.qsize(),
+            "queue_size": LOG_QUEUE_SIZE,
+            "dropped": self.handler.dropped,
+            "info_sample_rate": LOG_INFO_SAMPLE_RATE,
+            "sampled_out": self.context.sampled_out
+        }
+
+log_pipeline = LogPipeline()
+# Spawned children re-import the script that started them as __mp_main__
+# (process pool workers under `python main.py`) - they don't get a listener
+# thread and log file of their own. uvicorn --workers processes import the
+# app by name and log as usual.
+if multiprocessing.parent_process() is None or __name__ != "__mp_main__":
+    log_pipeline.start()
 logger = logging.getLogger(__name__)
 
 # ============================================
@@ -108,11 +320,37 @@ app.add_middleware(
 
 # REQUIRED - Core System ($30/month infrastructure)
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://splants:password@db:5432/splants")
+
+# Database connection pools (per worker)
+# Request handlers use the interactive pool; usage tracking, analytics events,
+# webhook logging and other background work use a separate, smaller pool so
+# they can never starve request handlers. Set DB_BACKGROUND_POOL_MAX_SIZE=0
+# to share the interactive pool instead.
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_BACKGROUND_POOL_MAX_SIZE = int(os.getenv("DB_BACKGROUND_POOL_MAX_SIZE", "3"))
+DB_POOL_ACQUIRE_TIMEOUT = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "0"))  # Seconds, 0 = wait indefinitely
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "60"))
+
+# Per-query statistics and slow-query log for all SQL on the pools (GET /v1/system/queries)
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500"))  # 0 disables the slow-query log
+QUERY_STATS_MAX_STATEMENTS = int(os.getenv("QUERY_STATS_MAX_STATEMENTS", "500"))  # Distinct statements tracked
+
+# OPTIONAL - Read replica for dashboards, listings and logs
+# Reads fall back to the primary whenever the replica is down or lagging
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+DATABASE_READ_MAX_LAG_SECONDS = float(os.getenv("DATABASE_READ_MAX_LAG_SECONDS", "10"))
+DATABASE_READ_CHECK_INTERVAL = float(os.getenv("DATABASE_READ_CHECK_INTERVAL", "5"))
+DATABASE_READ_CHECK_TIMEOUT = float(os.getenv("DATABASE_READ_CHECK_TIMEOUT", "5"))  # Connect + lag query; slower = unhealthy
+DB_READ_POOL_MAX_SIZE = int(os.getenv("DB_READ_POOL_MAX_SIZE", "10"))
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")  # Required for AI generation
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # Optional: compatible server, e.g. scripts/stub_llm.py for load tests
 API_KEY = os.getenv("API_KEY", "change-this-to-a-secure-key")  # Your API key for authentication
+ADMIN_API_KEY = os.getenv("ADMIN_API_KEY")  # Optional: separate key for admin endpoints (profiling)
 
 # OPTIONAL - Multi-Model Enhancement
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")  # For premium multi-model
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL")  # Optional: compatible server (load tests)
 
 # FREE OPTIONAL ENHANCEMENT: Cost Control
 MONTHLY_AI_BUDGET = float(os.getenv("MONTHLY_AI_BUDGET", "0"))  # Set to 0 for unlimited
@@ -127,6 +365,75 @@ WEBHOOK_CONTENT_GENERATED = os.getenv("WEBHOOK_CONTENT_GENERATED_URL")
 WEBHOOK_CONTENT_PUBLISHED = os.getenv("WEBHOOK_CONTENT_PUBLISHED_URL")
 WEBHOOK_DAILY_REPORT = os.getenv("WEBHOOK_DAILY_REPORT_URL")
 
+# Webhook delivery (transactional outbox, delivered by every worker)
+WEBHOOK_POLL_INTERVAL = float(os.getenv("WEBHOOK_POLL_INTERVAL", "1"))  # Seconds between outbox polls when idle
+WEBHOOK_CLAIM_BATCH_SIZE = int(os.getenv("WEBHOOK_CLAIM_BATCH_SIZE", "50"))  # Outbox rows claimed per poll
+WEBHOOK_MAX_IN_FLIGHT = int(os.getenv("WEBHOOK_MAX_IN_FLIGHT", "100"))  # Per worker
+WEBHOOK_ENDPOINT_CONCURRENCY = int(os.getenv("WEBHOOK_ENDPOINT_CONCURRENCY", "4"))  # Per URL, per worker
+WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "10"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))  # Then the delivery is dead-lettered
+WEBHOOK_RETRY_BASE_SECONDS = float(os.getenv("WEBHOOK_RETRY_BASE_SECONDS", "2"))  # Doubles every attempt
+WEBHOOK_RETRY_MAX_SECONDS = float(os.getenv("WEBHOOK_RETRY_MAX_SECONDS", "3600"))
+WEBHOOK_CLAIM_TIMEOUT = int(os.getenv("WEBHOOK_CLAIM_TIMEOUT", "300"))  # Seconds before a stuck delivery is retried
+
+# Batched webhook delivery: endpoints listed here receive a JSON array of
+# events per request instead of one request per event (for bulk runs)
+WEBHOOK_BATCH_URLS = os.getenv("WEBHOOK_BATCH_URLS", "")  # Comma-separated webhook URLs
+WEBHOOK_BATCH_WINDOW_SECONDS = float(os.getenv("WEBHOOK_BATCH_WINDOW_SECONDS", "5"))  # Max wait before sending
+WEBHOOK_BATCH_MAX_SIZE = int(os.getenv("WEBHOOK_BATCH_MAX_SIZE", "100"))  # Events per request
+
+# Registered webhooks are cached in memory; changes arrive via LISTEN/NOTIFY,
+# with a periodic full refresh as a safety net
+WEBHOOK_ROUTES_REFRESH_SECONDS = float(os.getenv("WEBHOOK_ROUTES_REFRESH_SECONDS", "300"))
+
+# Webhook log retention: older rows are compacted into per-day summaries
+WEBHOOK_LOG_RETENTION_DAYS = int(os.getenv("WEBHOOK_LOG_RETENTION_DAYS", "7"))  # Successful deliveries
+WEBHOOK_LOG_FAILURE_RETENTION_DAYS = int(os.getenv("WEBHOOK_LOG_FAILURE_RETENTION_DAYS", "30"))  # Failed deliveries
+WEBHOOK_LOG_COMPACTION_BATCH = int(os.getenv("WEBHOOK_LOG_COMPACTION_BATCH", "5000"))  # Rows per transaction
+
+# Content library re-scoring (POST /v1/system/rescore)
+RESCORE_CHUNK_SIZE = int(os.getenv("RESCORE_CHUNK_SIZE", "2000"))  # Documents per read/score/write round
+
+# Post-processing (scoring, hashtags, platform optimization) off the event loop
+POSTPROCESS_EXECUTOR = os.getenv("POSTPROCESS_EXECUTOR", "process").lower()  # process, thread or inline
+POSTPROCESS_WORKERS = int(os.getenv("POSTPROCESS_WORKERS", str(min(4, os.cpu_count() or 1))))
+# A pool round trip adds ~0.5ms; post-processing takes ~0.15ms per 1,000 chars, so
+# offloading pays for itself from a few thousand chars (~700 words) up
+POSTPROCESS_OFFLOAD_CHARS = int(os.getenv("POSTPROCESS_OFFLOAD_CHARS", "4000"))  # Smaller documents run inline
+
+# Traffic capture for replay benchmarks (scripts/replay_traffic.py); off unless a path is set
+TRAFFIC_CAPTURE_PATH = os.getenv("TRAFFIC_CAPTURE_PATH", "")  # e.g. logs/traffic.jsonl
+TRAFFIC_CAPTURE_SAMPLE_RATE = float(os.getenv("TRAFFIC_CAPTURE_SAMPLE_RATE", "1.0"))  # Fraction of requests recorded
+TRAFFIC_CAPTURE_MAX_BODY_BYTES = int(os.getenv("TRAFFIC_CAPTURE_MAX_BODY_BYTES", "65536"))  # Larger bodies are not kept
+TRAFFIC_CAPTURE_FLUSH_SECONDS = float(os.getenv("TRAFFIC_CAPTURE_FLUSH_SECONDS", "1"))
+TRAFFIC_CAPTURE_BUFFER = int(os.getenv("TRAFFIC_CAPTURE_BUFFER", "10000"))  # Records held between flushes
+
+# Prometheus metrics at GET /metrics (per-stage generation latency, providers, pools, webhooks)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # Optional: scrape credential, instead of the admin key
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "false").lower() == "true"  # Serve without credentials (private networks only)
+
+# Tracing (OTLP/JSON spans; trace id returned in the X-Trace-Id header)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))  # Fraction of new traces recorded
+TRACING_FILE = os.getenv("TRACING_FILE", "logs/traces.jsonl")  # Empty to export only to the collector
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "")  # e.g. http://localhost:4318/v1/traces
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "splants-marketing-engine")
+TRACING_EXPORT_INTERVAL = float(os.getenv("TRACING_EXPORT_INTERVAL", "2"))  # Seconds between batches
+TRACING_BUFFER = int(os.getenv("TRACING_BUFFER", "50000"))  # Spans held between exports
+
+# Event loop lag monitor (blocking code logged with its stack and route)
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.05"))  # Seconds between lag samples
+LOOP_STALL_THRESHOLD_MS = float(os.getenv("LOOP_STALL_THRESHOLD_MS", "100"))  # Blocked longer -> stack logged
+LOOP_STALL_LOG_INTERVAL = float(os.getenv("LOOP_STALL_LOG_INTERVAL", "60"))  # Seconds before the same stack is logged again
+
+# Sampling profiler (GET /v1/system/profile, collapsed stacks for flamegraphs)
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))  # Longest on-demand profile
+PROFILER_CONTINUOUS = os.getenv("PROFILER_CONTINUOUS", "false").lower() == "true"  # Always-on low-rate sampling
+PROFILER_CONTINUOUS_HZ = float(os.getenv("PROFILER_CONTINUOUS_HZ", "5"))
+PROFILER_WINDOW_SECONDS = int(os.getenv("PROFILER_WINDOW_SECONDS", "600"))  # Rolling window kept by continuous mode
+
 # PAID OPTIONAL ENHANCEMENT: Social Media Auto-Publishing (Costs vary)
 # These are for automatic posting to platforms (optional)
 TWITTER_API_KEY = os.getenv("TWITTER_API_KEY")
@@ -137,6 +444,30 @@ TWITTER_ACCESS_SECRET = os.getenv("TWITTER_ACCESS_SECRET")
 LINKEDIN_CLIENT_ID = os.getenv("LINKEDIN_CLIENT_ID")
 LINKEDIN_CLIENT_SECRET = os.getenv("LINKEDIN_CLIENT_SECRET")
 
+# Outbound platform rate limits: "platform=requests/seconds" pairs overriding
+# the built-in defaults, e.g. "twitter=300/10800,linkedin=100/86400"
+PLATFORM_RATE_LIMITS = os.getenv("PLATFORM_RATE_LIMITS", "")
+PLATFORM_ACCOUNT_RATE_LIMITS = os.getenv("PLATFORM_ACCOUNT_RATE_LIMITS", "")  # Same format, per account
+PLATFORM_RATE_LIMIT_SMOOTHING = os.getenv("PLATFORM_RATE_LIMIT_SMOOTHING", "true").lower() == "true"  # Even spacing, no bursts
+
+# Testing: send posts to a local mock platform server (scripts/mock_platform.py)
+MOCK_PLATFORM_URL = os.getenv("MOCK_PLATFORM_URL")
+
+# Publishing backend: manual (default), simulated (in-process mock) or mock_server
+PLATFORM_ADAPTER = os.getenv("PLATFORM_ADAPTER", "mock_server" if MOCK_PLATFORM_URL else "manual").lower()
+PLATFORM_ADAPTERS = os.getenv("PLATFORM_ADAPTERS", "")  # Per-platform overrides, e.g. "twitter=simulated"
+MOCK_PLATFORM_LATENCY_MS = float(os.getenv("MOCK_PLATFORM_LATENCY_MS", "200"))  # Simulated adapter
+MOCK_PLATFORM_ERROR_RATE = float(os.getenv("MOCK_PLATFORM_ERROR_RATE", "0"))  # 0.0 - 1.0
+MOCK_PLATFORM_BATCH_SIZE = int(os.getenv("MOCK_PLATFORM_BATCH_SIZE", "1"))  # Posts per simulated API call
+
+# Scheduled post dispatcher (runs in every worker; workers share the work)
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_POLL_INTERVAL = float(os.getenv("SCHEDULER_POLL_INTERVAL", "5"))  # Seconds between polls when idle
+SCHEDULER_BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", "50"))  # Max posts claimed per poll
+SCHEDULER_MAX_IN_FLIGHT = int(os.getenv("SCHEDULER_MAX_IN_FLIGHT", "100"))  # Per worker
+SCHEDULER_PLATFORM_CONCURRENCY = int(os.getenv("SCHEDULER_PLATFORM_CONCURRENCY", "5"))  # Per platform, per worker
+SCHEDULER_CLAIM_TIMEOUT = int(os.getenv("SCHEDULER_CLAIM_TIMEOUT", "300"))  # Seconds before a stuck claim is retried
+
 # Application settings
 MAX_CONTENT_LENGTH = int(os.getenv("MAX_CONTENT_LENGTH", "5000"))  # Max words per generation
 DEFAULT_CONTENT_LENGTH = int(os.getenv("DEFAULT_CONTENT_LENGTH", "500"))  # Default words
@@ -170,212 +501,2221 @@ async def verify_api_key(api_key: str = Security(api_key_header)):
         )
     return api_key
 
+async def verify_admin_key(api_key: str = Security(api_key_header)):
+    """Admin endpoints take ADMIN_API_KEY when it is set, otherwise the regular API key"""
+    if api_key != (ADMIN_API_KEY or API_KEY):
+        logger.warning(f"Invalid admin API key attempt: {api_key[:10] if api_key else 'None'}...")
+        raise HTTPException(
+            status_code=403,
+            detail="Invalid admin API Key. Please check your X-API-Key header."
+        )
+    return api_key
+
 # ============================================
-# DATABASE SETUP (Core Feature)
+# METRICS (Prometheus Exposition at /metrics)
 # ============================================
 
-db_pool = None
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PROVIDER_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 45, 60, 90, 120, 180)
+THROUGHPUT_BUCKETS = (5, 10, 20, 30, 45, 60, 80, 100, 150, 200, 400)
 
-# FREE OPTIONAL ENHANCEMENT: Redis Cache
-redis_cache = None
+def _format_labels(pairs) -> str:
+    """{name="value",...} with label values escaped per the exposition format"""
+    if not pairs:
+        return ""
+    escaped = (
+        f'{name}="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
 
-@app.on_event("startup")
-async def startup():
-    """Initialize all services when the application starts"""
-    global db_pool, redis_cache
+class CounterMetric:
+    """Monotonic counter per label set"""
     
-    logger.info("=" * 60)
-    logger.info("SPLANTS Marketing Engine - Starting Up")
-    logger.info("=" * 60)
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values = defaultdict(float)
     
-    # Core: Database connection
-    try:
-        db_pool = await asyncpg.create_pool(
-            DATABASE_URL,
-            min_size=1,
-            max_size=10,
-            command_timeout=60
-        )
-        logger.info(" Database connected successfully")
-    except Exception as e:
-        logger.error(f" Database connection failed: {e}")
-        raise
+    def inc(self, amount: float = 1, *label_values):
+        self.values[label_values] += amount
     
-    # Core: Create essential tables
-    async with db_pool.acquire() as conn:
-        # Content table - stores all generated content
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS content (
-                id SERIAL PRIMARY KEY,
-                content_type VARCHAR(50) NOT NULL,
-                topic TEXT NOT NULL,
-                content TEXT NOT NULL,
-                metadata JSONB DEFAULT '{}',
-                quality_score FLOAT DEFAULT 0,
-                seo_score FLOAT DEFAULT 0,
-                status VARCHAR(20) DEFAULT 'draft',
-                created_at TIMESTAMP DEFAULT NOW(),
-                updated_at TIMESTAMP DEFAULT NOW()
-            )
-        ''')
-        
-        # Social posts table - tracks published content
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS social_posts (
-                id SERIAL PRIMARY KEY,
-                platform VARCHAR(50) NOT NULL,
-                content_id INTEGER REFERENCES content(id) ON DELETE CASCADE,
-                post_content TEXT NOT NULL,
-                status VARCHAR(20) DEFAULT 'draft',
-                platform_post_id VARCHAR(100),
-                metrics JSONB DEFAULT '{}',
-                metadata JSONB DEFAULT '{}',
-                scheduled_for TIMESTAMP,
-                published_at TIMESTAMP,
-                created_at TIMESTAMP DEFAULT NOW()
-            )
-        ''')
-        
-        # FREE OPTIONAL ENHANCEMENT: Analytics Tables
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS analytics_events (
-                id SERIAL PRIMARY KEY,
-                event_type VARCHAR(50) NOT NULL,
-                event_data JSONB DEFAULT '{}',
-                user_id VARCHAR(100),
-                session_id VARCHAR(100),
-                created_at TIMESTAMP DEFAULT NOW()
-            )
-        ''')
-        
-        # Create index for faster analytics queries
-        await conn.execute('''
-            CREATE INDEX IF NOT EXISTS idx_analytics_created_at 
-            ON analytics_events(created_at DESC)
-        ''')
-        
-        await conn.execute('''
-            CREATE INDEX IF NOT EXISTS idx_analytics_event_type 
-            ON analytics_events(event_type)
-        ''')
-        
-        # FREE OPTIONAL ENHANCEMENT: API Usage Tracking for Cost Control
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS api_usage (
-                id SERIAL PRIMARY KEY,
-                model VARCHAR(50) NOT NULL,
-                tokens INTEGER DEFAULT 0,
-                cost DECIMAL(10,4) DEFAULT 0,
-                request_type VARCHAR(50),
-                content_id INTEGER REFERENCES content(id) ON DELETE SET NULL,
-                success BOOLEAN DEFAULT TRUE,
-                error_message TEXT,
-                created_at TIMESTAMP DEFAULT NOW()
-            )
-        ''')
-        
-        # Create index for cost queries
-        await conn.execute('''
-            CREATE INDEX IF NOT EXISTS idx_api_usage_created_at 
-            ON api_usage(created_at DESC)
-        ''')
-        
-        # FREE OPTIONAL ENHANCEMENT: A/B Test Tracking
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS ab_tests (
-                id SERIAL PRIMARY KEY,
-                test_name VARCHAR(100) NOT NULL,
-                variant_ids INTEGER[] NOT NULL,
-                test_parameter VARCHAR(50),
-                status VARCHAR(20) DEFAULT 'active',
-                winner_id INTEGER,
-                created_at TIMESTAMP DEFAULT NOW(),
-                completed_at TIMESTAMP
-            )
-        ''')
-        
-        # FREE OPTIONAL ENHANCEMENT: Webhook Logs
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS webhook_logs (
-                id SERIAL PRIMARY KEY,
-                event_type VARCHAR(50) NOT NULL,
-                webhook_url TEXT NOT NULL,
-                payload JSONB DEFAULT '{}',
-                status_code INTEGER,
-                response_body TEXT,
-                success BOOLEAN DEFAULT FALSE,
-                retry_count INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT NOW()
-            )
-        ''')
-        
-        logger.info(" Database tables initialized")
+    def render(self, worker: str) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self.values.items()):
+            labels = _format_labels([("worker", worker), *zip(self.label_names, label_values)])
+            lines.append(f"{self.name}{labels} {value:g}")
+        return lines
+
+class HistogramMetric:
+    """
+    Histogram per label set with Prometheus semantics
     
-    # PAID OPTIONAL ENHANCEMENT: Redis Cache Connection (+$10-15/month)
-    if CACHE_ENABLED and REDIS_URL:
-        try:
-            # Uncomment these lines when you add Redis
-            # redis_cache = await aioredis.from_url(
-            #     REDIS_URL,
-            #     encoding="utf-8",
-            #     decode_responses=True
-            # )
-            # await redis_cache.ping()
-            # logger.info(" Redis cache connected (API costs will be reduced by 30-50%)")
-            logger.info(" Redis caching configured but not active (uncomment in code to enable)")
-        except Exception as e:
-            logger.warning(f" Redis connection failed: {e}")
-            logger.warning("Continuing without cache. Add Redis for 30-50% cost savings.")
-    else:
-        logger.info(" Redis caching disabled (add REDIS_URL to enable cost savings)")
+    observe() is one bisect and three increments, cheap enough for every
+    request; buckets are made cumulative only when scraped.
+    """
     
-    # FREE OPTIONAL ENHANCEMENT: Initialize services
-    await analytics.initialize()
-    await cost_controller.initialize()
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.series = {}  # label values -> [count per bucket..., count above the last, sum, count]
     
-    # Log startup configuration
-    logger.info("=" * 60)
-    logger.info("CONFIGURATION:")
-    logger.info(f"  OpenAI: {' Configured' if OPENAI_API_KEY else ' Missing'}")
-    logger.info(f"  Anthropic (Multi-Model): {' Configured' if ANTHROPIC_API_KEY else ' Not configured (optional)'}")
-    logger.info(f"  Redis Caching: {' Enabled' if CACHE_ENABLED else ' Disabled (optional +$10/mo)'}")
-    logger.info(f"  Cost Control: {' Enabled ($' + str(MONTHLY_AI_BUDGET) + '/mo budget)' if MONTHLY_AI_BUDGET > 0 else ' Disabled'}")
-    logger.info(f"  Webhooks: {' Configured' if any([WEBHOOK_CONTENT_GENERATED, WEBHOOK_CONTENT_PUBLISHED]) else ' Not configured (optional)'}")
-    logger.info("=" * 60)
-    logger.info("FREE ENHANCEMENTS ACTIVE:")
-    logger.info("  - Analytics Dashboard")
-    logger.info("  - A/B Testing")
-    logger.info("  - Content Templates")
-    logger.info("  - Smart Hashtags")
-    logger.info("  - Platform Optimization")
-    logger.info("=" * 60)
-    logger.info("SPLANTS Marketing Engine Ready")
-    logger.info("API Documentation: http://localhost:8080/docs")
-    logger.info("=" * 60)
+    def observe(self, value: float, *label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+    
+    def render(self, worker: str) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(self.series.items()):
+            pairs = [("worker", worker), *zip(self.label_names, label_values)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_format_labels(pairs + [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {series[-1]}")
+        return lines
 
-@app.on_event("shutdown")
-async def shutdown():
-    """Graceful shutdown - close all connections"""
-    logger.info("Shutting down SPLANTS Marketing Engine...")
+class MetricsRegistry:
+    """
+    Metrics for GET /metrics in the Prometheus text format
     
-    if db_pool:
-        await db_pool.close()
-        logger.info("Database connection closed")
+    Request-path timings (generation stages, provider calls, pool waits,
+    background tasks, webhook deliveries) are histograms observed as they
+    happen. Pool, webhook, post-processing and statement figures are read
+    from the services' own stats at scrape time. Like /v1/system/status,
+    every worker has its own registry; series carry a worker label so
+    scrapes of different workers never overwrite each other.
+    """
     
-    if redis_cache:
-        # Uncomment when Redis is enabled
-        # await redis_cache.close()
-        logger.info("Redis cache connection closed")
+    def __init__(self):
+        self.worker = str(os.getpid())
+        self.http_requests = HistogramMetric(
+            "splants_http_request_duration_seconds", "Request latency by route (to the start of the response)",
+            ("method", "route", "status")
+        )
+        self.generate_stages = HistogramMetric(
+            "splants_generate_stage_duration_seconds", "Time spent in each stage of content generation",
+            ("stage",)
+        )
+        self.provider_requests = HistogramMetric(
+            "splants_provider_request_duration_seconds", "AI provider call latency",
+            ("provider", "call", "outcome"), PROVIDER_BUCKETS
+        )
+        self.provider_tokens = CounterMetric(
+            "splants_provider_tokens_total", "Tokens reported by AI providers", ("provider", "kind")
+        )
+        self.provider_throughput = HistogramMetric(
+            "splants_provider_output_tokens_per_second", "Completion tokens per second of provider call time",
+            ("provider",), THROUGHPUT_BUCKETS
+        )
+        self.pool_acquire_wait = HistogramMetric(
+            "splants_db_pool_acquire_wait_seconds", "Wait for a pooled database connection", ("pool",)
+        )
+        self.pool_hold = HistogramMetric(
+            "splants_db_pool_hold_seconds", "How long a checked-out connection is held", ("pool",)
+        )
+        self.cache_requests = CounterMetric(
+            "splants_cache_requests_total", "Cache lookups by cache and result", ("cache", "result")
+        )
+        self.background_tasks = HistogramMetric(
+            "splants_background_task_duration_seconds",
+            "BackgroundTasks time queued behind the response (wait) and running (run)", ("task", "phase")
+        )
+        self.background_queued = defaultdict(int)  # task -> queued or running
+        self.webhook_posts = HistogramMetric(
+            "splants_webhook_delivery_duration_seconds", "Webhook HTTP POST latency", ("outcome",)
+        )
+        self.webhook_event_latency = HistogramMetric(
+            "splants_webhook_event_latency_seconds", "From enqueueing an event to its successful delivery",
+            (), LATENCY_BUCKETS + (120, 300, 900, 3600)
+        )
+        self.event_loop_lag = HistogramMetric(
+            "splants_event_loop_lag_seconds", "How late the event loop ran a timer due now (sampled)"
+        )
+        self.event_loop_stalls = CounterMetric(
+            "splants_event_loop_stalls_total", "Event loop blocked past LOOP_STALL_THRESHOLD_MS, by route", ("route",)
+        )
     
-    logger.info("Shutdown complete")
+    def observe_provider(
+        self,
+        provider: str,
+        call: str,
+        seconds: float,
+        success: bool,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0
+    ):
+        self.provider_requests.observe(seconds, provider, call, "success" if success else "error")
+        if prompt_tokens:
+            self.provider_tokens.inc(prompt_tokens, provider, "prompt")
+        if completion_tokens:
+            self.provider_tokens.inc(completion_tokens, provider, "completion")
+            if seconds > 0:
+                self.provider_throughput.observe(completion_tokens / seconds, provider)
+    
+    def add_background_task(self, background_tasks: BackgroundTasks, func, *args, **kwargs):
+        """
+        background_tasks.add_task(func, ...), with queue depth, wait and run time recorded (and traced)
+        
+        The task counts as queued once it is added. Starlette drops a
+        response's tasks unrun if the request fails afterwards or the
+        response can't be sent; the count is then released when the dropped
+        task is garbage collected, so the gauge can't creep up.
+        """
+        name = func.__name__
+        parent = tracer.current()  # The request's span; the task is traced as its child
+        counted = True
+        
+        def release():
+            nonlocal counted
+            if counted:
+                counted = False
+                self.background_queued[name] -= 1
+        
+        async def run(*args, **kwargs):
+            started = time.perf_counter()
+            self.background_tasks.observe(started - queued_at, name, "wait")
+            try:
+                with tracer.span(f"background {name}", parent=parent):
+                    if asyncio.iscoroutinefunction(func):
+                        return await func(*args, **kwargs)
+                    return await asyncio.to_thread(func, *args, **kwargs)
+            finally:
+                release()
+                self.background_tasks.observe(time.perf_counter() - started, name, "run")
+        
+        queued_at = time.perf_counter()
+        background_tasks.add_task(run, *args, **kwargs)
+        self.background_queued[name] += 1
+        weakref.finalize(run, release)
+    
+    def _gauges(self) -> List[str]:
+        """Figures read from the services at scrape time"""
+        samples = []  # (name, type, help, [(labels, value)])
+        
+        pools = [("interactive", db_pool)]
+        if background_db_pool is not None and background_db_pool is not db_pool:
+            pools.append(("background", background_db_pool))
+        if read_replica.pool is not None:
+            pools.append(("replica", read_replica.pool))
+        pool_stats = [(name, pool.get_stats()) for name, pool in pools if pool is not None]
+        for key, metric, kind, help_text in (
+            ("size", "splants_db_pool_connections", "gauge", "Open connections"),
+            ("in_use", "splants_db_pool_in_use", "gauge", "Connections checked out"),
+            ("max_size", "splants_db_pool_max_connections", "gauge", "Pool size limit"),
+            ("acquires", "splants_db_pool_acquires_total", "counter", "Connection checkouts"),
+            ("acquire_timeouts", "splants_db_pool_acquire_timeouts_total", "counter", "Checkouts that timed out"),
+        ):
+            samples.append((metric, kind, help_text, [((("pool", name),), stats[key]) for name, stats in pool_stats]))
+        
+        samples.append((
+            "splants_background_tasks_queued", "gauge", "BackgroundTasks queued or running",
+            [((("task", task),), count) for task, count in sorted(self.background_queued.items())]
+        ))
+        
+        statement_stats = query_registry.get_stats()
+        samples.append((
+            "splants_db_statement_calls_total", "counter", "Registered statement executions",
+            [((("statement", s["statement"]),), s["calls"]) for s in statement_stats]
+        ))
+        samples.append((
+            "splants_db_statement_errors_total", "counter", "Registered statement failures",
+            [((("statement", s["statement"]),), s["errors"]) for s in statement_stats]
+        ))
+        samples.append((
+            "splants_db_statement_seconds_total", "counter", "Time spent in registered statements",
+            [((("statement", s["statement"]),), s["total_ms"] / 1000) for s in statement_stats]
+        ))
+        
+        samples.append((
+            "splants_cache_entries", "gauge", "Entries held by in-process caches",
+            [((("cache", "keyword_matcher"),), len(KeywordMatcher._cache))]
+        ))
+        
+        webhooks = webhook_system.get_status()
+        samples.append(("splants_webhook_in_flight", "gauge", "Webhook events being delivered",
+                        [((), webhooks["in_flight"])]))
+        samples.append(("splants_webhook_events_delivered_total", "counter", "Webhook events delivered",
+                        [((), webhooks["delivered"])]))
+        samples.append(("splants_webhook_failed_attempts_total", "counter", "Failed webhook delivery attempts",
+                        [((), webhooks["failed_attempts"])]))
+        samples.append(("splants_webhook_dead_lettered_total", "counter", "Webhook events dead-lettered",
+                        [((), webhooks["dead_lettered"])]))
+        
+        post_processing = post_processor.get_status()
+        samples.append((
+            "splants_post_processing_total", "counter", "Post-processing runs by where they ran",
+            [((("mode", "inline"),), post_processing["inline"]), ((("mode", "offloaded"),), post_processing["offloaded"])]
+        ))
+        
+        lines = []
+        for name, kind, help_text, values in samples:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, value in values:
+                lines.append(f"{name}{_format_labels([('worker', self.worker), *labels])} {value:g}")
+        return lines
+    
+    def render(self) -> str:
+        lines = []
+        for metric in (
+            self.http_requests, self.generate_stages, self.provider_requests, self.provider_tokens,
+            self.provider_throughput, self.pool_acquire_wait, self.pool_hold, self.cache_requests,
+            self.background_tasks, self.webhook_posts, self.webhook_event_latency,
+            self.event_loop_lag, self.event_loop_stalls
+        ):
+            lines += metric.render(self.worker)
+        lines += self._gauges()
+        return "\n".join(lines) + "\n"
 
 # ============================================
-# DATA MODELS (Core Feature)
+# TRACING (OpenTelemetry-compatible Spans)
 # ============================================
 
-class ContentType(str, Enum):
-    """Types of content that can be generated"""
-    BLOG = "blog"
+# Span active in the current task; copied into tasks it starts (BackgroundTasks included)
+current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+class Span:
+    """One timed operation; trace and span ids follow W3C Trace Context"""
+    
+    __slots__ = (
+        "trace_id", "span_id", "parent_id", "name", "kind", "start_ns", "end_ns",
+        "attributes", "error", "sampled"
+    )
+    
+    def __init__(self, name: str, kind: str, trace_id: str, parent_id: Optional[str], sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = {}
+        self.error = None
+        self.sampled = sampled
+    
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+    
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+    
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON span"""
+        attributes = []
+        for key, value in self.attributes.items():
+            if isinstance(value, bool):
+                attributes.append({"key": key, "value": {"boolValue": value}})
+            elif isinstance(value, int):
+                attributes.append({"key": key, "value": {"intValue": str(value)}})
+            elif isinstance(value, float):
+                attributes.append({"key": key, "value": {"doubleValue": value}})
+            else:
+                attributes.append({"key": key, "value": {"stringValue": str(value)}})
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KINDS[self.kind],
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": attributes,
+            "status": {"code": 2, "message": self.error[:500]} if self.error is not None else {"code": 0}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+class Tracer:
+    """
+    Minimal OpenTelemetry-compatible tracer
+    
+    Spans cover requests (server spans, continuing an incoming traceparent
+    header), provider calls, every database query on the pools (through
+    asyncpg's query logger), post-processing, platform publishing, webhook
+    POSTs and BackgroundTasks work, which runs under the span of the request
+    that queued it. The trace id is returned in the X-Trace-Id header.
+    
+    Finished spans are batched every TRACING_EXPORT_INTERVAL seconds as
+    OTLP/JSON - one ExportTraceServiceRequest per line to TRACING_FILE (the
+    format of the OpenTelemetry Collector's file exporter and otlpjsonfile
+    receiver) and/or POSTed to an OTLP/HTTP endpoint (TRACING_OTLP_ENDPOINT,
+    e.g. http://localhost:4318/v1/traces). TRACING_SAMPLE_RATE samples
+    whole traces at the root.
+    """
+    
+    def __init__(self):
+        self.enabled = TRACING_ENABLED
+        self.buffer = deque()
+        self.exported = 0
+        self.dropped = 0
+        self.export_errors = 0
+        self._task = None
+        self._client = None
+    
+    def current(self) -> Optional[Span]:
+        return current_span.get()
+    
+    def start_span(
+        self,
+        name: str,
+        kind: str = "internal",
+        parent: Optional[Span] = None,
+        traceparent: Optional[str] = None
+    ) -> Span:
+        """A new span: child of parent, else continuing traceparent, else a new trace"""
+        if parent is not None:
+            return Span(name, kind, parent.trace_id, parent.span_id, parent.sampled)
+        
+        match = TRACEPARENT.match(traceparent or "")
+        if match and match.group(1) != "0" * 32:
+            return Span(name, kind, match.group(1), match.group(2), self.enabled and int(match.group(3), 16) & 1 == 1)
+        
+        sampled = self.enabled and (TRACING_SAMPLE_RATE >= 1 or random.random() < TRACING_SAMPLE_RATE)
+        return Span(name, kind, os.urandom(16).hex(), None, sampled)
+    
+    def end_span(self, span: Span, end_ns: Optional[int] = None):
+        span.end_ns = end_ns or time.time_ns()
+        if not span.sampled:
+            return
+        if len(self.buffer) >= TRACING_BUFFER:
+            self.dropped += 1  # Exporter can't keep up; never block on it
+        else:
+            self.buffer.append(span)
+    
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: str = "internal",
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[Span] = None
+    ):
+        """Run the block in a child of the current (or given) span"""
+        span = self.start_span(name, kind, parent or current_span.get())
+        if attributes:
+            span.attributes.update(attributes)
+        token = current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            current_span.reset(token)
+            self.end_span(span)
+    
+    def record_query(self, record):
+        """asyncpg query logger: a span for each query run inside a sampled span"""
+        parent = current_span.get()
+        if parent is None or not parent.sampled:
+            return  # Untraced work (pollers, housekeeping)
+        
+        end_ns = time.time_ns()
+        name = query_registry.statement_names.get(record.query)
+        if name:
+            label = name
+        elif "pg_advisory_unlock_all()" in record.query:
+            label = "pool reset"  # asyncpg resets every connection it takes back
+        else:
+            label = (record.query.split(None, 1) or ["query"])[0].rstrip(";").upper()
+        span = Span(f"db {label}", "client", parent.trace_id, parent.span_id, True)
+        span.start_ns = end_ns - int(record.elapsed * 1e9)
+        span.attributes["db.system"] = "postgresql"
+        span.attributes["db.statement"] = " ".join(record.query.split())[:1000]
+        if name:
+            span.attributes["db.operation.name"] = name
+        if record.exception is not None:
+            span.error = f"{type(record.exception).__name__}: {record.exception}"
+        self.end_span(span, end_ns)
+    
+    async def start(self):
+        if not self.enabled:
+            return
+        if TRACING_FILE:
+            os.makedirs(os.path.dirname(os.path.abspath(TRACING_FILE)), exist_ok=True)
+        if TRACING_OTLP_ENDPOINT:
+            self._client = httpx.AsyncClient(timeout=10.0)
+        self._task = asyncio.create_task(self._export_loop())
+        logger.info(
+            f" Tracing enabled (sample rate {TRACING_SAMPLE_RATE:g}) -> "
+            + ", ".join(filter(None, [TRACING_FILE, TRACING_OTLP_ENDPOINT]))
+        )
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _export_loop(self):
+        while True:
+            await asyncio.sleep(TRACING_EXPORT_INTERVAL)
+            await self.flush()
+    
+    async def flush(self):
+        if not self.buffer:
+            return
+        spans = []
+        while self.buffer:
+            spans.append(self.buffer.popleft().to_otlp())
+        body = json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": TRACING_SERVICE_NAME}},
+                    {"key": "service.version", "value": {"stringValue": "2.1"}},
+                    {"key": "process.pid", "value": {"intValue": str(os.getpid())}}
+                ]},
+                "scopeSpans": [{"scope": {"name": "splants"}, "spans": spans}]
+            }]
+        }, separators=(",", ":"), default=str)
+        
+        try:
+            if TRACING_FILE:
+                await asyncio.to_thread(self._append, (body + "\n").encode())
+            if self._client:
+                response = await self._client.post(
+                    TRACING_OTLP_ENDPOINT, content=body, headers={"Content-Type": "application/json"}
+                )
+                response.raise_for_status()
+            self.exported += len(spans)
+        except (OSError, httpx.HTTPError) as e:
+            self.export_errors += 1
+            logger.error(f"Trace export failed ({len(spans)} spans lost): {e}")
+    
+    def _append(self, data: bytes):
+        # O_APPEND and a single write keep concurrent workers' lines whole
+        fd = os.open(TRACING_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": TRACING_SAMPLE_RATE,
+            "file": TRACING_FILE or None,
+            "otlp_endpoint": TRACING_OTLP_ENDPOINT or None,
+            "exported_spans": self.exported,
+            "dropped_spans": self.dropped,
+            "buffered_spans": len(self.buffer),
+            "export_errors": self.export_errors
+        }
+
+@contextmanager
+def provider_call(provider: str, call: str, model: str):
+    """
+    Metrics and a client span for one AI provider request
+    
+    Set gen_ai.usage.input_tokens / gen_ai.usage.output_tokens on the
+    yielded span once the response is in; they feed the token metrics too.
+    """
+    start = time.perf_counter()
+    with tracer.span(f"{provider} {call}", "client", {
+        "gen_ai.system": provider,
+        "gen_ai.request.model": model,
+        "splants.call": call
+    }) as span:
+        try:
+            yield span
+        except Exception:
+            metrics.observe_provider(provider, call, time.perf_counter() - start, False)
+            raise
+    metrics.observe_provider(
+        provider, call, time.perf_counter() - start, True,
+        span.attributes.get("gen_ai.usage.input_tokens", 0), span.attributes.get("gen_ai.usage.output_tokens", 0)
+    )
+
+# ============================================
+# EVENT LOOP MONITOR (Lag and Blocking Calls)
+# ============================================
+
+class EventLoopMonitor:
+    """
+    Measures event loop lag and catches the code that causes it
+    
+    A heartbeat task sleeps LOOP_MONITOR_INTERVAL at a time and records how
+    late it wakes up - the delay every other request on the worker saw too.
+    A watchdog thread checks the heartbeat; once the loop has been stuck for
+    LOOP_STALL_THRESHOLD_MS it captures the loop thread's stack while the
+    blocking call is still running and logs it with the task and the route
+    it belongs to. The route comes from a task factory that remembers
+    current_route for each task when it is created, since another thread
+    can't read a task's context variables.
+    
+    Each distinct stack is logged at most once per LOOP_STALL_LOG_INTERVAL;
+    the most recent stalls are kept for /v1/system/status.
+    """
+    
+    def __init__(self):
+        self.enabled = LOOP_MONITOR_ENABLED
+        self.samples = 0
+        self.max_lag_ms = 0.0
+        self.stalls = 0
+        self.suppressed = 0
+        self.recent = deque(maxlen=20)
+        self.task_routes = weakref.WeakKeyDictionary()  # task -> route when it was created
+        self._beat = 0.0  # time.monotonic() of the last heartbeat
+        self._captured_beat = None  # Heartbeat whose stall was already captured
+        self._pending = None  # Stall captured by the watchdog, waiting for its duration
+        self._last_logged = {}  # stack signature -> time.monotonic() it was last logged
+        self._loop = None
+        self._loop_thread_id = None
+        self._previous_factory = None
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+    
+    def _task_factory(self, loop, coro, context=None):
+        if self._previous_factory is not None:
+            task = self._previous_factory(loop, coro) if context is None else self._previous_factory(loop, coro, context=context)
+        else:
+            task = asyncio.Task(coro, loop=loop, context=context)
+        route = context.get(current_route, "unknown") if context is not None else current_route.get()
+        if route != "unknown":
+            self.task_routes[task] = route
+        return task
+    
+    async def start(self):
+        if not self.enabled:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._previous_factory = self._loop.get_task_factory()
+        self._loop.set_task_factory(self._task_factory)
+        
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watchdog, name="event-loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(
+            f" Event loop monitor active (lag sampled every {LOOP_MONITOR_INTERVAL * 1000:g}ms, "
+            f"stacks logged past {LOOP_STALL_THRESHOLD_MS:g}ms)"
+        )
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread:
+            self._stop.set()
+            await asyncio.to_thread(self._thread.join, 2)
+            self._thread = None
+        if self._loop is not None:
+            self._loop.set_task_factory(self._previous_factory)
+            self._loop = None
+    
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            beat = self._beat
+            expected = loop.time() + LOOP_MONITOR_INTERVAL
+            await asyncio.sleep(LOOP_MONITOR_INTERVAL)
+            lag = max(0.0, loop.time() - expected)
+            self._beat = time.monotonic()
+            
+            self.samples += 1
+            self.max_lag_ms = max(self.max_lag_ms, lag * 1000)
+            metrics.event_loop_lag.observe(lag)
+            
+            pending = self._pending
+            if pending is not None and pending["beat"] == beat:
+                pending["blocked_ms"] = round(lag * 1000, 1)  # How long the stall really lasted
+                self._pending = None
+    
+    def _watchdog(self):
+        threshold = LOOP_STALL_THRESHOLD_MS / 1000
+        while not self._stop.wait(min(threshold / 4, LOOP_MONITOR_INTERVAL)):
+            beat = self._beat
+            stalled = time.monotonic() - beat - LOOP_MONITOR_INTERVAL
+            if stalled >= threshold and self._captured_beat != beat:
+                self._captured_beat = beat
+                try:
+                    self._capture(beat, stalled)
+                except Exception as e:  # Never let the watchdog die
+                    logger.error(f"Event loop monitor failed to capture a stall: {e}")
+    
+    def _capture(self, beat: float, stalled: float):
+        """Runs on the watchdog thread while the loop is still blocked"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = traceback.format_stack(frame, limit=30)
+        del frame
+        
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            route, task_name = "unknown", "event loop callback"
+        else:
+            coro = task.get_coro()
+            route = self.task_routes.get(task, "unknown")
+            task_name = f"{task.get_name()} ({getattr(coro, '__qualname__', type(coro).__name__)})"
+        
+        self.stalls += 1
+        metrics.event_loop_stalls.inc(1, route)
+        record = {
+            "at": datetime.utcnow().isoformat(),
+            "route": route,
+            "task": task_name,
+            "blocked_ms": round(stalled * 1000, 1),  # Replaced by the full duration when the loop resumes
+            "stack": [line.rstrip() for line in stack[-8:]],
+            "beat": beat
+        }
+        self._pending = record
+        self.recent.append(record)
+        
+        # The innermost frames identify the blocking call; log each one once per interval
+        signature = (route, tuple(stack[-3:]))
+        now = time.monotonic()
+        if now - self._last_logged.get(signature, float("-inf")) < LOOP_STALL_LOG_INTERVAL:
+            self.suppressed += 1
+            return
+        self._last_logged[signature] = now
+        logger.warning(
+            f"Event loop blocked for {stalled * 1000:.0f}ms+ in {route} [task {task_name}]; "
+            f"stack at capture:\n{''.join(stack).rstrip()}"
+        )
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "interval_ms": LOOP_MONITOR_INTERVAL * 1000,
+            "stall_threshold_ms": LOOP_STALL_THRESHOLD_MS,
+            "samples": self.samples,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "stalls": self.stalls,
+            "stalls_not_logged": self.suppressed,
+            "recent_stalls": [
+                {key: value for key, value in record.items() if key != "beat"}
+                for record in reversed(self.recent)
+            ]
+        }
+
+# ============================================
+# SAMPLING PROFILER (Collapsed Stacks)
+# ============================================
+
+# Innermost frames of threads waiting for work; left out of profiles unless idle=true
+PROFILER_IDLE_FRAMES = {
+    ("selectors.py", "select"),  # Event loop with nothing to do
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),  # Executor thread blocked on its work queue
+    ("connection.py", "wait"),
+}
+PROFILER_MAX_DEPTH = 128
+PROFILER_BUCKET_SECONDS = 10  # Continuous-mode granularity
+
+class SamplingProfiler:
+    """
+    Statistical profiler for the live worker, in the spirit of py-spy
+    
+    A sampler thread reads every other thread's current Python stack with
+    sys._current_frames() at a fixed rate and counts identical stacks.
+    Nothing is instrumented or traced, so the profiled code runs unchanged;
+    the cost is one stack walk per thread per sample, paid by the sampler
+    thread (about 1% of a core at 100 Hz). Output is the collapsed-stack
+    format ("thread;outer (file:line);...;inner (file:line) count") read by
+    flamegraph.pl, speedscope and inferno.
+    
+    On-demand profiles run one at a time per worker and are capped at
+    PROFILER_MAX_SECONDS. With PROFILER_CONTINUOUS the sampler also runs
+    permanently at PROFILER_CONTINUOUS_HZ, keeping the last
+    PROFILER_WINDOW_SECONDS in 10-second buckets, so a latency spike can be
+    looked at after the fact.
+    """
+    
+    def __init__(self):
+        self.running = False  # An on-demand profile is in progress
+        self.profiles = 0
+        self.continuous_samples = 0
+        self.window = deque()  # [bucket start, Counter of stacks, samples]
+        self._window_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+    
+    @staticmethod
+    def _sample(skip_thread: int, include_idle: bool) -> List[str]:
+        """One collapsed stack per thread, root first"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == skip_thread:
+                continue
+            code = frame.f_code
+            if not include_idle and (os.path.basename(code.co_filename), code.co_name) in PROFILER_IDLE_FRAMES:
+                continue
+            frames = []
+            while frame is not None and len(frames) < PROFILER_MAX_DEPTH:
+                code = frame.f_code
+                frames.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            frames.append(names.get(thread_id, f"thread-{thread_id}"))
+            stacks.append(";".join(reversed(frames)))
+        return stacks
+    
+    def _run(self, seconds: float, hz: float, include_idle: bool) -> Tuple[Counter, int]:
+        """Sample for `seconds` at `hz` on the calling thread"""
+        counts = Counter()
+        samples = 0
+        interval = 1 / hz
+        me = threading.get_ident()
+        next_at = time.monotonic()
+        deadline = next_at + seconds
+        while next_at < deadline:
+            counts.update(self._sample(me, include_idle))
+            samples += 1
+            next_at += interval
+            delay = next_at - time.monotonic()
+            if delay < 0:
+                next_at = time.monotonic()  # Fell behind; skip samples rather than burst
+            elif self._stop.wait(delay):
+                break  # Shutting down
+        return counts, samples
+    
+    async def profile(self, seconds: float, hz: float, include_idle: bool) -> Tuple[Counter, int]:
+        """Profile the worker for `seconds` without blocking the event loop"""
+        self.running = True
+        try:
+            result = await asyncio.to_thread(self._run, seconds, hz, include_idle)
+            self.profiles += 1
+            return result
+        finally:
+            self.running = False
+    
+    def recent(self, seconds: float) -> Tuple[Counter, int]:
+        """Continuous-mode stacks from the last `seconds` (whole buckets)"""
+        since = time.time() - seconds
+        counts = Counter()
+        samples = 0
+        with self._window_lock:
+            for started, bucket, bucket_samples in self.window:
+                if started + PROFILER_BUCKET_SECONDS > since:
+                    counts.update(bucket)
+                    samples += bucket_samples
+        return counts, samples
+    
+    def _continuous(self):
+        me = threading.get_ident()
+        interval = 1 / PROFILER_CONTINUOUS_HZ
+        while not self._stop.wait(interval):
+            stacks = self._sample(me, False)
+            started = int(time.time()) // PROFILER_BUCKET_SECONDS * PROFILER_BUCKET_SECONDS
+            with self._window_lock:
+                if not self.window or self.window[-1][0] != started:
+                    self.window.append([started, Counter(), 0])
+                    while self.window[0][0] <= started - PROFILER_WINDOW_SECONDS:
+                        self.window.popleft()
+                self.window[-1][1].update(stacks)
+                self.window[-1][2] += 1
+            self.continuous_samples += 1
+    
+    def start(self):
+        self._stop.clear()
+        if PROFILER_CONTINUOUS:
+            self._thread = threading.Thread(target=self._continuous, name="continuous-profiler", daemon=True)
+            self._thread.start()
+            logger.info(
+                f" Continuous profiling at {PROFILER_CONTINUOUS_HZ:g} Hz "
+                f"(last {PROFILER_WINDOW_SECONDS}s at /v1/system/profile?source=continuous)"
+            )
+    
+    async def stop(self):
+        self._stop.set()  # Also ends an on-demand profile early
+        if self._thread:
+            await asyncio.to_thread(self._thread.join, 2)
+            self._thread = None
+    
+    @staticmethod
+    def render(counts: Counter) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "profiling": self.running,
+            "profiles_taken": self.profiles,
+            "continuous": PROFILER_CONTINUOUS,
+            "continuous_hz": PROFILER_CONTINUOUS_HZ if PROFILER_CONTINUOUS else None,
+            "continuous_samples": self.continuous_samples,
+            "window_seconds": len(self.window) * PROFILER_BUCKET_SECONDS if PROFILER_CONTINUOUS else None
+        }
+
+# ============================================
+# DATABASE SETUP (Core Feature)
+# ============================================
+
+db_pool = None  # Interactive pool - request handlers
+background_db_pool = None  # Background pool - analytics, usage tracking, webhooks
+
+# Which endpoint a connection is checked out for (set per request by middleware)
+current_route: contextvars.ContextVar[str] = contextvars.ContextVar("current_route", default="unknown")
+
+class InstrumentedPool:
+    """
+    asyncpg pool wrapper that accounts for every connection checkout
+    
+    Tracks acquire wait time, connections in use (current and peak) and how
+    long each route holds its connection, so pool starvation shows up at
+    /v1/system/status long before requests start timing out.
+    """
+    
+    def __init__(self, name: str, pool, acquire_timeout: Optional[float] = None):
+        self.name = name
+        self.pool = pool
+        self.acquire_timeout = acquire_timeout
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.acquire_count = 0
+        self.acquire_timeouts = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.route_stats = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+    
+    @asynccontextmanager
+    async def acquire(self, route: Optional[str] = None):
+        """Check out a connection, labelled with the route (defaults to the current request)"""
+        route = route or current_route.get()
+        start = time.perf_counter()
+        
+        try:
+            conn = await self.pool.acquire(timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.acquire_timeouts += 1
+            logger.error(
+                f"Database pool '{self.name}' exhausted: no connection within "
+                f"{self.acquire_timeout}s for {route} ({self.in_use} in use)"
+            )
+            raise
+        
+        acquired = time.perf_counter()
+        wait_ms = (acquired - start) * 1000
+        metrics.pool_acquire_wait.observe(acquired - start, self.name)
+        self.acquire_count += 1
+        self.wait_total_ms += wait_ms
+        self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+        self.in_use += 1
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        
+        try:
+            yield conn
+        finally:
+            self.in_use -= 1
+            hold_ms = (time.perf_counter() - acquired) * 1000
+            metrics.pool_hold.observe(hold_ms / 1000, self.name)
+            stats = self.route_stats[route]
+            stats["count"] += 1
+            stats["total_ms"] += hold_ms
+            stats["max_ms"] = max(stats["max_ms"], hold_ms)
+            await self.pool.release(conn)
+    
+    async def close(self):
+        await self.pool.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool sizing, wait times and per-route hold times"""
+        return {
+            "size": self.pool.get_size(),
+            "idle": self.pool.get_idle_size(),
+            "min_size": self.pool.get_min_size(),
+            "max_size": self.pool.get_max_size(),
+            "in_use": self.in_use,
+            "peak_in_use": self.peak_in_use,
+            "acquires": self.acquire_count,
+            "acquire_timeouts": self.acquire_timeouts,
+            "acquire_wait_ms": {
+                "avg": round(self.wait_total_ms / self.acquire_count, 3) if self.acquire_count else 0,
+                "max": round(self.wait_max_ms, 2)
+            },
+            "hold_time_ms_by_route": {
+                route: {
+                    "count": stats["count"],
+                    "avg": round(stats["total_ms"] / stats["count"], 2),
+                    "max": round(stats["max_ms"], 2)
+                }
+                for route, stats in sorted(
+                    self.route_stats.items(),
+                    key=lambda item: item[1]["total_ms"],
+                    reverse=True
+                )
+            }
+        }
+
+def _status_rows(status: Optional[str]) -> int:
+    """Row count from a command status such as 'INSERT 0 5' or 'UPDATE 3'"""
+    last = status.rsplit(" ", 1)[-1] if status else ""
+    return int(last) if last.isdigit() else 0
+
+ROW_COUNTS = {
+    "execute": _status_rows,
+    "fetch": len,
+    "fetchrow": lambda row: 0 if row is None else 1,
+    "fetchval": lambda value: 0 if value is None else 1
+}  # Rows a query method returned, from its result
+
+class TimedConnection(asyncpg.Connection):
+    """
+    Pool connection that reports every query to the query registry
+    
+    Covers registered statements and inline SQL alike (dashboards, cost
+    reports, list endpoints), so /v1/system/queries and the slow-query log
+    see everything the pools run. Rows are counted from the result or the
+    command status. (executemany, cursors and COPY aren't timed.)
+    
+    Registered statements are left to QueryRegistry._run, which records
+    them under their name, and the reset query asyncpg runs on every
+    release is the pool's traffic, not the app's.
+    """
+    
+    __slots__ = ()
+    
+    async def _timed(self, method, query: str, args, kwargs, count_rows):
+        if query in query_registry.statement_names or query == self.get_reset_query():
+            return await method(query, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            result = await method(query, *args, **kwargs)
+        except Exception:
+            query_registry.observe(query, args, time.perf_counter() - start, 0, error=True)
+            raise
+        query_registry.observe(query, args, time.perf_counter() - start, count_rows(result))
+        return result
+    
+    async def execute(self, query: str, *args, **kwargs):
+        return await self._timed(super().execute, query, args, kwargs, ROW_COUNTS["execute"])
+    
+    async def fetch(self, query: str, *args, **kwargs):
+        return await self._timed(super().fetch, query, args, kwargs, ROW_COUNTS["fetch"])
+    
+    async def fetchrow(self, query: str, *args, **kwargs):
+        return await self._timed(super().fetchrow, query, args, kwargs, ROW_COUNTS["fetchrow"])
+    
+    async def fetchval(self, query: str, *args, **kwargs):
+        return await self._timed(super().fetchval, query, args, kwargs, ROW_COUNTS["fetchval"])
+
+async def create_instrumented_pool(
+    name: str,
+    min_size: int,
+    max_size: int,
+    dsn: Optional[str] = None
+) -> InstrumentedPool:
+    """Create an asyncpg pool with the query registry's per-connection setup and query timing"""
+    pool = await asyncpg.create_pool(
+        dsn or DATABASE_URL,
+        min_size=min_size,
+        max_size=max_size,
+        command_timeout=DB_COMMAND_TIMEOUT,
+        init=setup_connection,
+        connection_class=TimedConnection
+    )
+    return InstrumentedPool(name, pool, DB_POOL_ACQUIRE_TIMEOUT or None)
+
+async def setup_connection(conn):
+    """Per-connection setup: prepared statements, and query spans when tracing"""
+    await query_registry.prepare_connection(conn)
+    if tracer.enabled:
+        conn.add_query_logger(tracer.record_query)
+
+class ReadReplicaRouter:
+    """
+    OPTIONAL: Routes reporting and listing reads to a read replica
+    
+    Enabled by setting DATABASE_READ_URL. A monitor task checks the replica's
+    replication lag every few seconds; reads go to the replica only while it
+    is reachable and no further behind than DATABASE_READ_MAX_LAG_SECONDS.
+    Otherwise they fall back to the primary automatically.
+    
+    Only use this for reads that tolerate slightly stale data (dashboards,
+    listings, logs) - never for budget checks or read-after-write paths.
+    """
+    
+    # Caught up only counts while a WAL receiver is connected: a replica that
+    # lost its primary has replayed everything it received, too. Otherwise
+    # the lag is the age of the last replayed transaction (NULL if none yet)
+    LAG_QUERY = '''
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN EXISTS (SELECT 1 FROM pg_stat_wal_receiver)
+                 AND pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+        END
+    '''
+    
+    def __init__(self):
+        self.pool = None
+        self.healthy = False
+        self.lag_seconds = None
+        self.last_checked = None
+        self.last_error = None
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+        self._monitor_task = None
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(DATABASE_READ_URL)
+    
+    @property
+    def usable(self) -> bool:
+        """True if reads should currently go to the replica"""
+        return (
+            self.pool is not None
+            and self.healthy
+            and self.lag_seconds is not None
+            and self.lag_seconds <= DATABASE_READ_MAX_LAG_SECONDS
+        )
+    
+    async def start(self):
+        """Connect to the replica and start the lag monitor"""
+        if not self.enabled:
+            return
+        
+        await self.check()
+        self._monitor_task = asyncio.create_task(self._monitor())
+        
+        if self.usable:
+            logger.info(f" Read replica connected (lag {self.lag_seconds:.1f}s)")
+        else:
+            logger.warning(f" Read replica not usable yet, reads will use the primary ({self.last_error or 'lagging'})")
+    
+    async def stop(self):
+        if self._monitor_task:
+            self._monitor_task.cancel()
+        if self.pool:
+            await self.pool.close()
+    
+    async def check(self):
+        """(Re)connect if needed and measure replication lag"""
+        was_usable = self.usable
+        
+        try:
+            lag = await asyncio.wait_for(self._measure_lag(), DATABASE_READ_CHECK_TIMEOUT)
+            self.lag_seconds = float(lag) if lag is not None else None
+            self.healthy = True
+            self.last_error = None if lag is not None else "no WAL received or replayed"
+        except asyncio.TimeoutError:
+            self.healthy = False
+            self.last_error = f"check timed out after {DATABASE_READ_CHECK_TIMEOUT:g}s"
+        except Exception as e:
+            self.healthy = False
+            self.last_error = str(e)
+        finally:
+            self.last_checked = datetime.utcnow()
+        
+        if was_usable and not self.usable:
+            if not self.healthy:
+                reason = f"unavailable: {self.last_error}"
+            elif self.lag_seconds is None:
+                reason = self.last_error
+            else:
+                reason = f"lagging {self.lag_seconds:.1f}s"
+            logger.warning(f"Read replica {reason} - routing reads to primary")
+        elif self.usable and not was_usable and self._monitor_task:
+            logger.info("Read replica caught up - routing reads to replica")
+    
+    async def _measure_lag(self) -> Optional[float]:
+        if self.pool is None:
+            self.pool = await create_instrumented_pool(
+                "read_replica", 1, DB_READ_POOL_MAX_SIZE, dsn=DATABASE_READ_URL
+            )
+        
+        async with self.pool.acquire("replica_lag_check") as conn:
+            return await conn.fetchval(self.LAG_QUERY)
+    
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(DATABASE_READ_CHECK_INTERVAL)
+            await self.check()
+    
+    @asynccontextmanager
+    async def acquire(self, route: Optional[str] = None):
+        """Check out a read connection - replica when usable, otherwise primary"""
+        async with AsyncExitStack() as stack:
+            conn = None
+            
+            if self.usable:
+                try:
+                    conn = await stack.enter_async_context(self.pool.acquire(route))
+                    self.replica_reads += 1
+                except (OSError, asyncio.TimeoutError, asyncpg.PostgresConnectionError,
+                        asyncpg.InterfaceError) as e:
+                    logger.warning(f"Read replica acquire failed - falling back to primary: {e}")
+                    self.healthy = False
+                    self.last_error = str(e)
+            
+            if conn is None:
+                if self.enabled:
+                    self.primary_fallbacks += 1
+                conn = await stack.enter_async_context(db_pool.acquire(route))
+            
+            yield conn
+    
+    def get_status(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {"enabled": False}
+        
+        return {
+            "enabled": True,
+            "routing_reads": self.usable,
+            "healthy": self.healthy,
+            "lag_seconds": round(self.lag_seconds, 2) if self.lag_seconds is not None else None,
+            "max_lag_seconds": DATABASE_READ_MAX_LAG_SECONDS,
+            "last_checked": self.last_checked.isoformat() if self.last_checked else None,
+            "last_error": self.last_error,
+            "replica_reads": self.replica_reads,
+            "primary_fallbacks": self.primary_fallbacks,
+            "pool": self.pool.get_stats() if self.pool else None
+        }
+
+@lru_cache(maxsize=4096)
+def match_route_template(method: str, path: str, root_path: str) -> Optional[str]:
+    """Template of the route serving a request path; cached, as routes don't change after startup"""
+    scope = {"type": "http", "method": method, "path": path, "root_path": root_path}
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, 'path', path)
+    return None
+
+@app.middleware("http")
+async def track_current_route(request: Request, call_next):
+    """Label database checkouts, metrics and the request's trace span with the matched route template (e.g. GET /v1/content/{content_id})"""
+    path = match_route_template(request.method, request.scope["path"], request.scope.get("root_path", ""))
+    if path is None:
+        path = "unmatched"  # Unknown paths share one series
+    else:
+        current_route.set(f"{request.method} {path}")
+    
+    if LOG_INFO_SAMPLE_RATE < 1:
+        log_sampled.set(random.random() < LOG_INFO_SAMPLE_RATE)  # Keep or drop this request's INFO lines together
+    
+    span = tracer.start_span(f"{request.method} {path}", "server", traceparent=request.headers.get("traceparent"))
+    span.attributes.update({"http.request.method": request.method, "http.route": path, "url.path": request.url.path})
+    token = current_span.set(span)
+    
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        if tracer.enabled:
+            response.headers["X-Trace-Id"] = span.trace_id
+        return response
+    finally:
+        metrics.http_requests.observe(time.perf_counter() - start, request.method, path, status)
+        current_span.reset(token)
+        span.attributes["http.response.status_code"] = status
+        if status >= 500:
+            span.error = f"HTTP {status}"
+        tracer.end_span(span)
+
+# FREE OPTIONAL ENHANCEMENT: Redis Cache
+redis_cache = None
+
+# ============================================
+# DATABASE MIGRATIONS (Core Feature)
+# ============================================
+
+class SchemaMigrator:
+    """
+    Versioned schema migrations
+    
+    Keeps the database schema current without running DDL on every boot:
+    - Applied migrations are recorded in the schema_version table
+    - A Postgres advisory lock ensures only one worker applies them
+    - Workers that find the schema current skip DDL entirely (one SELECT)
+    
+    To change the schema, append a new numbered migration.
+    Never edit a migration that has already been deployed.
+    """
+    
+    # Advisory lock key shared by every worker (any constant bigint works)
+    LOCK_ID = 7_265_001
+    
+    # (version, description, SQL) - applied in order, each in its own transaction
+    # Version 1 keeps IF NOT EXISTS so pre-migration databases adopt it cleanly
+    migrations = [
+        (1, "baseline schema", '''
+            -- Content table - stores all generated content
+            CREATE TABLE IF NOT EXISTS content (
+                id SERIAL PRIMARY KEY,
+                content_type VARCHAR(50) NOT NULL,
+                topic TEXT NOT NULL,
+                content TEXT NOT NULL,
+                metadata JSONB DEFAULT '{}',
+                quality_score FLOAT DEFAULT 0,
+                seo_score FLOAT DEFAULT 0,
+                status VARCHAR(20) DEFAULT 'draft',
+                created_at TIMESTAMP DEFAULT NOW(),
+                updated_at TIMESTAMP DEFAULT NOW()
+            );
+            
+            -- Social posts table - tracks published content
+            CREATE TABLE IF NOT EXISTS social_posts (
+                id SERIAL PRIMARY KEY,
+                platform VARCHAR(50) NOT NULL,
+                content_id INTEGER REFERENCES content(id) ON DELETE CASCADE,
+                post_content TEXT NOT NULL,
+                status VARCHAR(20) DEFAULT 'draft',
+                platform_post_id VARCHAR(100),
+                metrics JSONB DEFAULT '{}',
+                metadata JSONB DEFAULT '{}',
+                scheduled_for TIMESTAMP,
+                published_at TIMESTAMP,
+                created_at TIMESTAMP DEFAULT NOW()
+            );
+            
+            -- FREE OPTIONAL ENHANCEMENT: Analytics Tables
+            CREATE TABLE IF NOT EXISTS analytics_events (
+                id SERIAL PRIMARY KEY,
+                event_type VARCHAR(50) NOT NULL,
+                event_data JSONB DEFAULT '{}',
+                user_id VARCHAR(100),
+                session_id VARCHAR(100),
+                created_at TIMESTAMP DEFAULT NOW()
+            );
+            
+            -- Create index for faster analytics queries
+            CREATE INDEX IF NOT EXISTS idx_analytics_created_at 
+            ON analytics_events(created_at DESC);
+            
+            CREATE INDEX IF NOT EXISTS idx_analytics_event_type 
+            ON analytics_events(event_type);
+            
+            -- FREE OPTIONAL ENHANCEMENT: API Usage Tracking for Cost Control
+            CREATE TABLE IF NOT EXISTS api_usage (
+                id SERIAL PRIMARY KEY,
+                model VARCHAR(50) NOT NULL,
+                tokens INTEGER DEFAULT 0,
+                cost DECIMAL(10,4) DEFAULT 0,
+                request_type VARCHAR(50),
+                content_id INTEGER REFERENCES content(id) ON DELETE SET NULL,
+                success BOOLEAN DEFAULT TRUE,
+                error_message TEXT,
+                created_at TIMESTAMP DEFAULT NOW()
+            );
+            
+            -- Create index for cost queries
+            CREATE INDEX IF NOT EXISTS idx_api_usage_created_at 
+            ON api_usage(created_at DESC);
+            
+            -- FREE OPTIONAL ENHANCEMENT: A/B Test Tracking
+            CREATE TABLE IF NOT EXISTS ab_tests (
+                id SERIAL PRIMARY KEY,
+                test_name VARCHAR(100) NOT NULL,
+                variant_ids INTEGER[] NOT NULL,
+                test_parameter VARCHAR(50),
+                status VARCHAR(20) DEFAULT 'active',
+                winner_id INTEGER,
+                created_at TIMESTAMP DEFAULT NOW(),
+                completed_at TIMESTAMP
+            );
+            
+            -- FREE OPTIONAL ENHANCEMENT: Webhook Logs
+            CREATE TABLE IF NOT EXISTS webhook_logs (
+                id SERIAL PRIMARY KEY,
+                event_type VARCHAR(50) NOT NULL,
+                webhook_url TEXT NOT NULL,
+                payload JSONB DEFAULT '{}',
+                status_code INTEGER,
+                response_body TEXT,
+                success BOOLEAN DEFAULT FALSE,
+                retry_count INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT NOW()
+            );
+        '''),
+        
+        (2, "scheduled post claiming", '''
+            ALTER TABLE social_posts ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP;
+            ALTER TABLE social_posts ADD COLUMN IF NOT EXISTS claimed_by VARCHAR(100);
+            ALTER TABLE social_posts ADD COLUMN IF NOT EXISTS attempts INTEGER DEFAULT 0;
+            
+            -- Due-post lookup for the dispatcher (only scheduled rows are indexed)
+            CREATE INDEX IF NOT EXISTS idx_social_posts_due
+            ON social_posts(scheduled_for) WHERE status = 'scheduled';
+            
+            -- Stale-claim recovery
+            CREATE INDEX IF NOT EXISTS idx_social_posts_claimed
+            ON social_posts(claimed_at) WHERE status = 'publishing';
+        '''),
+        
+        (3, "webhook outbox", '''
+            -- Webhooks waiting for delivery (pending -> delivering -> delivered | dead)
+            CREATE TABLE IF NOT EXISTS webhook_outbox (
+                id BIGSERIAL PRIMARY KEY,
+                event_type VARCHAR(50) NOT NULL,
+                webhook_url TEXT NOT NULL,
+                payload JSONB NOT NULL,
+                status VARCHAR(20) DEFAULT 'pending',
+                attempts INTEGER DEFAULT 0,
+                next_attempt_at TIMESTAMP NOT NULL,
+                claimed_at TIMESTAMP,
+                delivered_at TIMESTAMP,
+                last_error TEXT,
+                created_at TIMESTAMP NOT NULL
+            );
+            
+            CREATE INDEX IF NOT EXISTS idx_webhook_outbox_due
+            ON webhook_outbox(next_attempt_at) WHERE status = 'pending';
+            
+            CREATE INDEX IF NOT EXISTS idx_webhook_outbox_claimed
+            ON webhook_outbox(claimed_at) WHERE status = 'delivering';
+            
+            CREATE INDEX IF NOT EXISTS idx_webhook_outbox_delivered
+            ON webhook_outbox(delivered_at) WHERE status = 'delivered';
+        '''),
+        
+        (4, "batched webhook delivery", '''
+            -- Early flush of a full batch for one endpoint
+            CREATE INDEX IF NOT EXISTS idx_webhook_outbox_url_pending
+            ON webhook_outbox(webhook_url, id) WHERE status = 'pending';
+        '''),
+        
+        (5, "webhook registry", '''
+            -- Registered webhook subscriptions (one row per event type and URL)
+            CREATE TABLE IF NOT EXISTS webhooks (
+                id SERIAL PRIMARY KEY,
+                event_type VARCHAR(50) NOT NULL,
+                url TEXT NOT NULL,
+                batch_mode BOOLEAN DEFAULT FALSE,
+                active BOOLEAN DEFAULT TRUE,
+                description TEXT,
+                created_at TIMESTAMP DEFAULT NOW(),
+                updated_at TIMESTAMP DEFAULT NOW(),
+                UNIQUE (event_type, url)
+            );
+            
+            -- Tell every worker to reload its routing table on any change
+            CREATE OR REPLACE FUNCTION notify_webhooks_changed() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify('webhooks_changed', '');
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+            
+            DROP TRIGGER IF EXISTS webhooks_changed ON webhooks;
+            CREATE TRIGGER webhooks_changed
+            AFTER INSERT OR UPDATE OR DELETE ON webhooks
+            FOR EACH STATEMENT EXECUTE PROCEDURE notify_webhooks_changed();
+        '''),
+        
+        (6, "webhook log indexes and daily summaries", '''
+            -- Keyset pagination of /v1/webhook/logs, with and without an event filter
+            CREATE INDEX IF NOT EXISTS idx_webhook_logs_created
+            ON webhook_logs(created_at DESC, id DESC);
+            
+            CREATE INDEX IF NOT EXISTS idx_webhook_logs_event_created
+            ON webhook_logs(event_type, created_at DESC, id DESC);
+            
+            -- Compacted history: one row per day, event and endpoint
+            CREATE TABLE IF NOT EXISTS webhook_log_daily (
+                day DATE NOT NULL,
+                event_type VARCHAR(50) NOT NULL,
+                webhook_url TEXT NOT NULL,
+                delivered INTEGER DEFAULT 0,
+                failed INTEGER DEFAULT 0,
+                retries INTEGER DEFAULT 0,
+                PRIMARY KEY (day, event_type, webhook_url)
+            );
+        '''),
+    ]
+    
+    def __init__(self):
+        self.current_version = 0
+    
+    @property
+    def latest_version(self) -> int:
+        """Highest migration version known to this build"""
+        return self.migrations[-1][0] if self.migrations else 0
+    
+    async def get_current_version(self, conn) -> int:
+        """Read the applied schema version (0 for a fresh database)"""
+        try:
+            return await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        except asyncpg.UndefinedTableError:
+            return 0
+    
+    async def migrate(self, pool) -> int:
+        """
+        Bring the database up to the latest schema version
+        
+        Fast path: if the schema is already current, this costs a single
+        SELECT and takes no catalog locks. Otherwise the advisory lock
+        serializes concurrent worker boots - workers that waited re-check
+        the version and usually find nothing left to do.
+        """
+        
+        async with pool.acquire("startup") as conn:
+            self.current_version = await self.get_current_version(conn)
+            
+            if self.current_version >= self.latest_version:
+                logger.info(f" Database schema up to date (version {self.current_version})")
+                return self.current_version
+            
+            await conn.execute("SELECT pg_advisory_lock($1)", self.LOCK_ID)
+            try:
+                # Another worker may have applied migrations while we waited
+                self.current_version = await self.get_current_version(conn)
+                
+                await conn.execute('''
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version INTEGER PRIMARY KEY,
+                        description TEXT NOT NULL,
+                        applied_at TIMESTAMP DEFAULT NOW()
+                    )
+                ''')
+                
+                for version, description, sql in self.migrations:
+                    if version <= self.current_version:
+                        continue
+                    
+                    async with conn.transaction():
+                        await conn.execute(sql)
+                        await conn.execute(
+                            "INSERT INTO schema_version (version, description) VALUES ($1, $2)",
+                            version, description
+                        )
+                    
+                    self.current_version = version
+                    logger.info(f" Applied migration {version}: {description}")
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock($1)", self.LOCK_ID)
+        
+        logger.info(f" Database schema migrated to version {self.current_version}")
+        return self.current_version
+
+# ============================================
+# DATABASE QUERY REGISTRY (Core Feature)
+# ============================================
+
+# Literal values and formatting that differ between runs of the same statement
+SQL_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+SQL_STRING_LITERALS = re.compile(r"'(?:[^']|'')*'")
+SQL_NUMBER_LITERALS = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+SQL_VALUE_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+QUERY_SAMPLES = 512  # Latest timings kept per statement for percentiles
+
+def _describe_parameter(value) -> str:
+    """A query parameter's type and size, never its value"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, (str, bytes)):
+        return f"{type(value).__name__}({len(value)})"
+    if isinstance(value, (list, tuple)):
+        return f"array[{len(value)}]"
+    return type(value).__name__
+
+class QueryRegistry:
+    """
+    Central registry of hot-path SQL statements
+    
+    Every statement below is prepared once per pooled connection (via the
+    pool's init hook) and executed by name, so Postgres parses and plans it
+    once per connection instead of on every request. Each call is counted
+    and timed, which gives per-query visibility at /v1/system/queries.
+    
+    To add a query: register it here and call it with
+    query_registry.fetchrow(conn, "name", *args) (or fetch/fetchval/execute).
+    
+    Every other query on the pools is timed too (see TimedConnection):
+    observe() aggregates by normalized statement - literals replaced by ?,
+    whitespace and comments collapsed - and logs queries slower than
+    SLOW_QUERY_THRESHOLD_MS with their parameters reduced to types.
+    """
+    
+    statements = {
+        # ContentEngine
+        "insert_content": '''
+            INSERT INTO content 
+            (content_type, topic, content, metadata, quality_score, seo_score, status)
+            VALUES ($1, $2, $3, $4, $5, $6, $7)
+            RETURNING id, created_at
+        ''',
+        "get_content": "SELECT * FROM content WHERE id = $1",
+        
+        # ContentRescorer
+        "content_for_rescoring": '''
+            SELECT id, content, metadata
+            FROM content
+            WHERE id > $1
+            ORDER BY id
+            LIMIT $2
+        ''',
+        "update_content_scores": '''
+            UPDATE content AS c
+            SET quality_score = v.quality_score, seo_score = v.seo_score, updated_at = NOW()
+            FROM unnest($1::int[], $2::float8[], $3::float8[]) AS v(id, quality_score, seo_score)
+            WHERE c.id = v.id
+              AND (c.quality_score IS DISTINCT FROM v.quality_score OR c.seo_score IS DISTINCT FROM v.seo_score)
+        ''',
+        "insert_api_usage": '''
+            INSERT INTO api_usage 
+            (model, tokens, cost, request_type, content_id, success, error_message)
+            VALUES ($1, $2, $3, $4, $5, $6, $7)
+        ''',
+        "insert_ab_test": '''
+            INSERT INTO ab_tests (test_name, variant_ids, test_parameter, status)
+            VALUES ($1, $2, $3, $4)
+        ''',
+        
+        # SocialPublisher
+        "get_content_text": "SELECT content FROM content WHERE id = $1",
+        "insert_social_posts": '''
+            INSERT INTO social_posts 
+            (platform, content_id, post_content, status, scheduled_for)
+            SELECT post.platform, $2, post.post_content, post.status, post.scheduled_for
+            FROM unnest($1::text[], $3::text[], $4::text[], $5::timestamp[])
+                AS post(platform, post_content, status, scheduled_for)
+            RETURNING id, platform
+        ''',
+        "mark_posts_publishing": '''
+            UPDATE social_posts
+            SET status = 'publishing', published_at = $2, claimed_at = $2, claimed_by = $3
+            WHERE id = ANY($1::int[])
+        ''',
+        "record_post_results": '''
+            UPDATE social_posts AS p
+            SET status = r.status, platform_post_id = r.platform_post_id, metadata = r.metadata::jsonb
+            FROM unnest($1::int[], $2::text[], $3::text[], $4::text[])
+                AS r(id, status, platform_post_id, metadata)
+            WHERE p.id = r.id
+        ''',
+        
+        # ScheduledPostDispatcher ($3 = current UTC time, matching scheduled_for;
+        # $4 = platforms whose rate limit queue is already full)
+        "claim_due_posts": '''
+            UPDATE social_posts
+            SET status = 'publishing', claimed_at = $3, claimed_by = $2, attempts = attempts + 1
+            WHERE id IN (
+                SELECT id FROM social_posts
+                WHERE status = 'scheduled' AND scheduled_for <= $3
+                  AND NOT (platform = ANY($4::text[]))
+                ORDER BY scheduled_for
+                LIMIT $1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, platform, post_content
+        ''',
+        "claim_posts_by_id": '''
+            UPDATE social_posts
+            SET status = 'publishing', claimed_at = $3, claimed_by = $2, attempts = attempts + 1
+            WHERE id = ANY($1::int[]) AND status = 'scheduled'
+            RETURNING id, platform, post_content
+        ''',
+        # Immediate publishes have no scheduled_for; they come due again at their claim time
+        "reclaim_stale_posts": '''
+            UPDATE social_posts
+            SET status = 'scheduled', scheduled_for = COALESCE(scheduled_for, claimed_at),
+                claimed_at = NULL, claimed_by = NULL
+            WHERE status = 'publishing' AND claimed_at < $1
+        ''',
+        "renew_claims": '''
+            UPDATE social_posts
+            SET claimed_at = $2
+            WHERE status = 'publishing' AND claimed_by = $1
+        ''',
+        # WebhookSystem outbox
+        "insert_webhook_outbox": '''
+            INSERT INTO webhook_outbox (event_type, webhook_url, payload, created_at, next_attempt_at)
+            SELECT $1, s.url, $3, $4, s.due
+            FROM unnest($2::text[], $5::timestamp[]) AS s(url, due)
+        ''',
+        # Delivered to listeners only when the enqueuing transaction commits
+        "notify_webhook_outbox": "SELECT pg_notify('webhook_outbox', '')",
+        "claim_webhook_outbox": '''
+            UPDATE webhook_outbox
+            SET status = 'delivering', claimed_at = $2, attempts = attempts + 1
+            WHERE id IN (
+                SELECT id FROM webhook_outbox
+                WHERE status = 'pending' AND next_attempt_at <= $2
+                  AND NOT (webhook_url = ANY($3::text[]))
+                ORDER BY next_attempt_at
+                LIMIT $1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, event_type, webhook_url, payload::text AS payload, attempts, created_at
+        ''',
+        "claim_webhook_batch": '''
+            UPDATE webhook_outbox
+            SET status = 'delivering', claimed_at = $3, attempts = attempts + 1
+            WHERE id IN (
+                SELECT id FROM webhook_outbox
+                WHERE status = 'pending' AND webhook_url = $1 AND attempts = 0
+                ORDER BY id
+                LIMIT $2
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, event_type, webhook_url, payload::text AS payload, attempts, created_at
+        ''',
+        "mark_webhooks_delivered": '''
+            UPDATE webhook_outbox
+            SET status = 'delivered', delivered_at = $2, last_error = NULL
+            WHERE id = ANY($1::bigint[])
+        ''',
+        "retry_webhooks": '''
+            UPDATE webhook_outbox AS o
+            SET status = r.status, next_attempt_at = r.next_attempt_at, last_error = $4
+            FROM unnest($1::bigint[], $2::text[], $3::timestamp[]) AS r(id, status, next_attempt_at)
+            WHERE o.id = r.id
+        ''',
+        "reclaim_stale_webhooks": '''
+            UPDATE webhook_outbox
+            SET status = 'pending'
+            WHERE status = 'delivering' AND claimed_at < $1
+        ''',
+        "prune_delivered_webhooks": '''
+            DELETE FROM webhook_outbox
+            WHERE status = 'delivered' AND delivered_at < $1
+        ''',
+        "active_webhooks": "SELECT event_type, url, batch_mode FROM webhooks WHERE active ORDER BY id",
+        "list_webhooks": '''
+            SELECT id, event_type, url, batch_mode, active, description, created_at, updated_at
+            FROM webhooks
+            WHERE $1::text IS NULL OR event_type = $1
+            ORDER BY id
+        ''',
+        "upsert_webhook": '''
+            INSERT INTO webhooks (event_type, url, batch_mode, description)
+            VALUES ($1, $2, $3, $4)
+            ON CONFLICT (event_type, url) DO UPDATE
+            SET batch_mode = EXCLUDED.batch_mode,
+                description = COALESCE(EXCLUDED.description, webhooks.description),
+                active = TRUE,
+                updated_at = NOW()
+            RETURNING id, event_type, url, batch_mode, active, description, created_at, updated_at
+        ''',
+        "update_webhook": '''
+            UPDATE webhooks
+            SET active = COALESCE($2, active), batch_mode = COALESCE($3, batch_mode), updated_at = NOW()
+            WHERE id = $1
+            RETURNING id, event_type, url, batch_mode, active, description, created_at, updated_at
+        ''',
+        "delete_webhook": "DELETE FROM webhooks WHERE id = $1 RETURNING id",
+        "webhook_logs_page": '''
+            SELECT id, event_type, webhook_url, payload, status_code, response_body, success, retry_count, created_at
+            FROM webhook_logs
+            WHERE (created_at, id) < ($1, $2)
+            ORDER BY created_at DESC, id DESC
+            LIMIT $3
+        ''',
+        "webhook_logs_page_by_event": '''
+            SELECT id, event_type, webhook_url, payload, status_code, response_body, success, retry_count, created_at
+            FROM webhook_logs
+            WHERE event_type = $4 AND (created_at, id) < ($1, $2)
+            ORDER BY created_at DESC, id DESC
+            LIMIT $3
+        ''',
+        "webhook_log_daily": '''
+            SELECT day, event_type, webhook_url, delivered, failed, retries
+            FROM webhook_log_daily
+            WHERE day >= $1
+            ORDER BY day DESC, event_type, webhook_url
+        ''',
+        # Moves one batch of expired log rows into the daily summaries
+        "compact_webhook_logs": '''
+            WITH expired AS (
+                DELETE FROM webhook_logs
+                WHERE id IN (
+                    SELECT id FROM webhook_logs
+                    WHERE created_at < $2
+                      AND (success OR created_at < $3)
+                    ORDER BY created_at
+                    LIMIT $1
+                )
+                RETURNING created_at, event_type, webhook_url, success, retry_count
+            ), compacted AS (
+                INSERT INTO webhook_log_daily AS d (day, event_type, webhook_url, delivered, failed, retries)
+                SELECT created_at::date, event_type, webhook_url,
+                       COUNT(*) FILTER (WHERE success), COUNT(*) FILTER (WHERE NOT success),
+                       COALESCE(SUM(retry_count), 0)
+                FROM expired
+                GROUP BY 1, 2, 3
+                ON CONFLICT (day, event_type, webhook_url) DO UPDATE
+                SET delivered = d.delivered + EXCLUDED.delivered,
+                    failed = d.failed + EXCLUDED.failed,
+                    retries = d.retries + EXCLUDED.retries
+            )
+            SELECT COUNT(*) FROM expired
+        ''',
+        "webhook_outbox_counts": "SELECT status, COUNT(*) AS count FROM webhook_outbox GROUP BY status",
+        "list_dead_webhooks": '''
+            SELECT id, event_type, webhook_url, payload, attempts, last_error, created_at, next_attempt_at AS failed_at
+            FROM webhook_outbox
+            WHERE status = 'dead'
+            ORDER BY id DESC
+            LIMIT $1
+        ''',
+        "requeue_dead_webhook": '''
+            UPDATE webhook_outbox
+            SET status = 'pending', attempts = 0, next_attempt_at = $2, last_error = NULL
+            WHERE id = $1 AND status = 'dead'
+            RETURNING id
+        ''',
+        "insert_webhook_logs": '''
+            INSERT INTO webhook_logs
+            (event_type, webhook_url, payload, status_code, response_body, success, retry_count)
+            SELECT e.event_type, $2, e.payload::jsonb, $4, $5, $6, e.retry_count
+            FROM unnest($1::text[], $3::text[], $7::int[]) AS e(event_type, payload, retry_count)
+        ''',
+        "reschedule_posts": '''
+            UPDATE social_posts
+            SET status = 'scheduled', scheduled_for = $1, claimed_at = NULL, claimed_by = NULL
+            WHERE id = ANY($2::int[])
+        ''',
+        
+        # CostController - budget sums
+        "month_cost": '''
+            SELECT SUM(cost) as month_cost
+            FROM api_usage
+            WHERE created_at >= date_trunc('month', CURRENT_DATE)
+              AND success = true
+        ''',
+        "today_cost": '''
+            SELECT SUM(cost) as today_cost
+            FROM api_usage
+            WHERE created_at >= CURRENT_DATE
+              AND success = true
+        ''',
+        "today_api_count": '''
+            SELECT COUNT(*) as today_count
+            FROM api_usage
+            WHERE created_at >= CURRENT_DATE
+        ''',
+        "monthly_usage": '''
+            SELECT 
+                COUNT(*) as requests,
+                SUM(cost) as total_cost,
+                AVG(cost) as avg_cost,
+                SUM(CASE WHEN model = 'multi-model' THEN cost END) as premium_cost
+            FROM api_usage
+            WHERE created_at >= date_trunc('month', CURRENT_DATE)
+              AND success = true
+        ''',
+        "daily_usage": '''
+            SELECT 
+                COUNT(*) as requests,
+                SUM(cost) as total_cost
+            FROM api_usage
+            WHERE created_at >= CURRENT_DATE
+              AND success = true
+        ''',
+        "weekly_cost_trend": '''
+            SELECT 
+                DATE(created_at) as date,
+                SUM(cost) as daily_cost,
+                COUNT(*) as daily_requests
+            FROM api_usage
+            WHERE created_at >= CURRENT_DATE - INTERVAL '7 days'
+              AND success = true
+            GROUP BY DATE(created_at)
+            ORDER BY date DESC
+        ''',
+        
+        # AnalyticsDashboard ($1 = period in days)
+        "insert_analytics_event": '''
+            INSERT INTO analytics_events (event_type, event_data, user_id, session_id)
+            VALUES ($1, $2, $3, $4)
+        ''',
+        "dashboard_content_metrics": '''
+            SELECT 
+                COUNT(*) as total_generated,
+                AVG(quality_score) as avg_quality,
+                AVG(seo_score) as avg_seo,
+                COUNT(DISTINCT DATE(created_at)) as active_days,
+                COUNT(CASE WHEN quality_score > 0.8 THEN 1 END) as high_quality_count,
+                COUNT(CASE WHEN metadata->>'is_variant' = 'true' THEN 1 END) as variant_count
+            FROM content
+            WHERE created_at > NOW() - make_interval(days => $1)
+              AND status != 'variant'
+        ''',
+        "dashboard_content_types": '''
+            SELECT 
+                content_type,
+                COUNT(*) as count,
+                AVG(quality_score) as avg_quality
+            FROM content
+            WHERE created_at > NOW() - make_interval(days => $1)
+              AND status != 'variant'
+            GROUP BY content_type
+            ORDER BY count DESC
+        ''',
+        "dashboard_platforms": '''
+            SELECT 
+                metadata->>'platform' as platform,
+                COUNT(*) as count,
+                AVG(quality_score) as avg_quality
+            FROM content
+            WHERE created_at > NOW() - make_interval(days => $1)
+              AND metadata->>'platform' IS NOT NULL
+              AND status != 'variant'
+            GROUP BY metadata->>'platform'
+            ORDER BY count DESC
+        ''',
+        "dashboard_cost_metrics": '''
+            SELECT 
+                SUM(cost) as total_cost,
+                AVG(cost) as avg_cost_per_request,
+                COUNT(*) as total_requests,
+                COUNT(CASE WHEN success = true THEN 1 END) as successful_requests,
+                SUM(CASE WHEN model = 'multi-model' THEN cost END) as premium_cost
+            FROM api_usage
+            WHERE created_at > NOW() - make_interval(days => $1)
+        ''',
+        "dashboard_publish_metrics": '''
+            SELECT 
+                COUNT(*) as total_posts,
+                COUNT(DISTINCT platform) as platforms_used,
+                COUNT(CASE WHEN status = 'published' THEN 1 END) as published_count,
+                COUNT(CASE WHEN status = 'scheduled' THEN 1 END) as scheduled_count
+            FROM social_posts
+            WHERE created_at > NOW() - make_interval(days => $1)
+        ''',
+        "dashboard_ab_test_metrics": '''
+            SELECT 
+                COUNT(*) as total_tests,
+                COUNT(CASE WHEN status = 'active' THEN 1 END) as active_tests,
+                COUNT(CASE WHEN winner_id IS NOT NULL THEN 1 END) as completed_tests
+            FROM ab_tests
+            WHERE created_at > NOW() - make_interval(days => $1)
+        ''',
+        "dashboard_quality_scores": '''
+            SELECT quality_score
+            FROM content
+            WHERE created_at > NOW() - make_interval(days => $1)
+              AND status != 'variant'
+        ''',
+        "dashboard_weekly_trends": '''
+            SELECT 
+                DATE_TRUNC('week', created_at) as week,
+                COUNT(*) as count,
+                AVG(quality_score) as avg_quality,
+                AVG(seo_score) as avg_seo
+            FROM content
+            WHERE created_at > NOW() - make_interval(days => $1)
+              AND status != 'variant'
+            GROUP BY DATE_TRUNC('week', created_at)
+            ORDER BY week DESC
+            LIMIT 4
+        ''',
+    }
+    
+    def __init__(self):
+        self.statement_names = {sql: name for name, sql in self.statements.items()}  # For trace spans
+        self.queries = {}  # normalized SQL -> stats, for every query on the pools
+        self.slow_queries = deque(maxlen=50)
+        self.untracked_calls = 0  # Queries past QUERY_STATS_MAX_STATEMENTS distinct statements
+        self._normalized = {}  # SQL text -> normalized SQL
+    
+    async def prepare_connection(self, conn):
+        """
+        Pool init hook - prepare every registered statement on a new connection
+        
+        Preparing up front checks the SQL and loads the codecs for every
+        type the statements use (asyncpg's per-connection type introspection
+        round trips), so the first request on a fresh connection doesn't pay
+        for them. The PreparedStatement objects themselves are discarded:
+        asyncpg invalidates them when the connection goes back to the pool.
+        Each statement is parsed and planned once more on first use and
+        then served from the connection's statement cache.
+        
+        Tables and columns don't exist until their migration has run, so
+        anything that can't be prepared yet is prepared on first use.
+        """
+        for sql in self.statements.values():
+            try:
+                await conn.prepare(sql)
+            except (asyncpg.UndefinedTableError, asyncpg.UndefinedColumnError):
+                pass
+        
+        # A bare prepare leaves the server's implicit transaction open (and
+        # its table locks held, blocking migrations) until the next sync
+        await conn.execute("SELECT 1")
+    
+    async def _run(self, conn, name: str, method: str, args):
+        """Execute a registered statement and record its timing under its name"""
+        sql = self.statements[name]
+        start = time.perf_counter()
+        try:
+            result = await getattr(conn, method)(sql, *args)
+        except Exception:
+            self.observe(sql, args, time.perf_counter() - start, 0, error=True, name=name)
+            raise
+        self.observe(sql, args, time.perf_counter() - start, ROW_COUNTS[method](result), name=name)
+        return result
+    
+    async def fetch(self, conn, name: str, *args):
+        return await self._run(conn, name, "fetch", args)
+    
+    async def fetchrow(self, conn, name: str, *args):
+        return await self._run(conn, name, "fetchrow", args)
+    
+    async def fetchval(self, conn, name: str, *args):
+        return await self._run(conn, name, "fetchval", args)
+    
+    async def execute(self, conn, name: str, *args):
+        return await self._run(conn, name, "execute", args)
+    
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Per registered statement call counts and timings, most expensive first"""
+        return sorted(
+            [
+                {
+                    "statement": stats["name"],
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "total_ms": round(stats["total_ms"], 2),
+                    "avg_ms": round(stats["total_ms"] / stats["calls"], 3) if stats["calls"] else 0,
+                    "max_ms": round(stats["max_ms"], 2)
+                }
+                for stats in self.queries.values()
+                if stats["name"]
+            ],
+            key=lambda s: s["total_ms"],
+            reverse=True
+        )
+    
+    def normalize(self, sql: str) -> str:
+        """The statement with literals replaced by ?, so runs with different values aggregate"""
+        normalized = self._normalized.get(sql)
+        if normalized is None:
+            normalized = SQL_COMMENTS.sub(" ", sql)
+            normalized = SQL_STRING_LITERALS.sub("?", normalized)
+            normalized = SQL_NUMBER_LITERALS.sub("?", normalized)
+            normalized = SQL_VALUE_LISTS.sub("(?)", normalized)
+            normalized = " ".join(normalized.split())
+            if len(self._normalized) >= 10000:
+                self._normalized.clear()  # SQL built with inline values; forget and start over
+            self._normalized[sql] = normalized
+        return normalized
+    
+    def observe(self, sql: str, args, elapsed: float, rows: int, error: bool = False, name: Optional[str] = None):
+        """Record one query: inline SQL from a TimedConnection, or a registered statement by name"""
+        elapsed_ms = elapsed * 1000
+        normalized = self.normalize(sql)
+        stats = self.queries.get(normalized)
+        if stats is None:
+            if len(self.queries) >= QUERY_STATS_MAX_STATEMENTS and name is None:
+                self.untracked_calls += 1
+                stats = None
+            else:
+                stats = self.queries[normalized] = {
+                    "name": name,
+                    "calls": 0,
+                    "errors": 0,
+                    "rows": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "samples": deque(maxlen=QUERY_SAMPLES)
+                }
+        if stats is not None:
+            stats["calls"] += 1
+            stats["errors"] += error
+            stats["rows"] += rows
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["samples"].append(elapsed_ms)
+        
+        if SLOW_QUERY_THRESHOLD_MS and elapsed_ms >= SLOW_QUERY_THRESHOLD_MS:
+            route = current_route.get()
+            parameters = [_describe_parameter(value) for value in args]
+            self.slow_queries.append({
+                "at": datetime.utcnow().isoformat(),
+                "ms": round(elapsed_ms, 1),
+                "rows": rows,
+                "error": error,
+                "route": route,
+                "statement": normalized[:2000],
+                "parameters": parameters
+            })
+            logger.warning(
+                f"Slow query ({elapsed_ms:.0f}ms, {rows} rows{', failed' if error else ''}) in {route}: "
+                f"{normalized[:500]} | parameters: {', '.join(parameters) or 'none'}"
+            )
+    
+    def get_query_stats(self, sort: str = "total_ms", limit: int = 50) -> List[Dict[str, Any]]:
+        """Per normalized statement: calls, rows and timings (percentiles over the latest runs)"""
+        table = []
+        for normalized, stats in self.queries.items():
+            samples = sorted(stats["samples"])
+            table.append({
+                "statement": normalized[:2000],
+                "name": stats["name"],
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "rows": stats["rows"],
+                "rows_per_call": round(stats["rows"] / stats["calls"], 1) if stats["calls"] else 0,
+                "total_ms": round(stats["total_ms"], 2),
+                "avg_ms": round(stats["total_ms"] / stats["calls"], 3) if stats["calls"] else 0,
+                "p50_ms": round(samples[len(samples) // 2], 3) if samples else 0,
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3) if samples else 0,
+                "max_ms": round(stats["max_ms"], 2)
+            })
+        table.sort(key=lambda row: row[sort], reverse=True)
+        return table[:limit]
+
+@app.on_event("startup")
+async def startup():
+    """Initialize all services when the application starts"""
+    global db_pool, background_db_pool, redis_cache
+    
+    logger.info("=" * 60)
+    logger.info("SPLANTS Marketing Engine - Starting Up")
+    logger.info("=" * 60)
+    
+    # Core: Database connection
+    try:
+        db_pool = await create_instrumented_pool("interactive", DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE)
+        
+        if DB_BACKGROUND_POOL_MAX_SIZE > 0:
+            background_db_pool = await create_instrumented_pool("background", 1, DB_BACKGROUND_POOL_MAX_SIZE)
+        else:
+            background_db_pool = db_pool
+        
+        logger.info(
+            f" Database connected successfully (pools: interactive {DB_POOL_MIN_SIZE}-{DB_POOL_MAX_SIZE}, "
+            f"background {DB_BACKGROUND_POOL_MAX_SIZE if DB_BACKGROUND_POOL_MAX_SIZE > 0 else 'shared'})"
+        )
+    except Exception as e:
+        logger.error(f" Database connection failed: {e}")
+        raise
+    
+    # Core: Apply schema migrations (skips all DDL when already current)
+    await schema_migrator.migrate(db_pool)
+    
+    # OPTIONAL: Read replica routing (DATABASE_READ_URL)
+    await read_replica.start()
+    
+    # PAID OPTIONAL ENHANCEMENT: Redis Cache Connection (+$10-15/month)
+    if CACHE_ENABLED and REDIS_URL:
+        try:
+            # Uncomment these lines when you add Redis
+            # redis_cache = await aioredis.from_url(
+            #     REDIS_URL,
+            #     encoding="utf-8",
+            #     decode_responses=True
+            # )
+            # await redis_cache.ping()
+            # logger.info(" Redis cache connected (API costs will be reduced by 30-50%)")
+            logger.info(" Redis caching configured but not active (uncomment in code to enable)")
+        except Exception as e:
+            logger.warning(f" Redis connection failed: {e}")
+            logger.warning("Continuing without cache. Add Redis for 30-50% cost savings.")
+    else:
+        logger.info(" Redis caching disabled (add REDIS_URL to enable cost savings)")
+    
+    # Off-loop CPU work (scoring, hashtags, platform optimization)
+    post_processor.start()
+    
+    # Opt-in request recording for replay benchmarks (TRAFFIC_CAPTURE_PATH)
+    await traffic_capture.start()
+    
+    # Opt-in span export (TRACING_ENABLED)
+    await tracer.start()
+    
+    # Event loop lag and blocking-call detection
+    await loop_monitor.start()
+    profiler.start()
+    
+    # FREE OPTIONAL ENHANCEMENT: Initialize services
+    await analytics.initialize()
+    await cost_controller.initialize()
+    await social_publisher.initialize()
+    await webhook_system.start()
+    
+    # Core: Publish scheduled posts as they come due
+    await post_dispatcher.start()
+    
+    # Log startup configuration
+    logger.info("=" * 60)
+    logger.info("CONFIGURATION:")
+    logger.info(f"  OpenAI: {' Configured' if OPENAI_API_KEY else ' Missing'}")
+    logger.info(f"  Anthropic (Multi-Model): {' Configured' if ANTHROPIC_API_KEY else ' Not configured (optional)'}")
+    logger.info(f"  Redis Caching: {' Enabled' if CACHE_ENABLED else ' Disabled (optional +$10/mo)'}")
+    logger.info(f"  Cost Control: {' Enabled ($' + str(MONTHLY_AI_BUDGET) + '/mo budget)' if MONTHLY_AI_BUDGET > 0 else ' Disabled'}")
+    logger.info(f"  Webhooks: {' Configured' if webhook_system.routes else ' Not configured (optional)'}")
+    logger.info("=" * 60)
+    logger.info("FREE ENHANCEMENTS ACTIVE:")
+    logger.info("  - Analytics Dashboard")
+    logger.info("  - A/B Testing")
+    logger.info("  - Content Templates")
+    logger.info("  - Smart Hashtags")
+    logger.info("  - Platform Optimization")
+    logger.info("=" * 60)
+    logger.info("SPLANTS Marketing Engine Ready")
+    logger.info("API Documentation: http://localhost:8080/docs")
+    logger.info("=" * 60)
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Graceful shutdown - close all connections"""
+    logger.info("Shutting down SPLANTS Marketing Engine...")
+    
+    await content_rescorer.stop()
+    await post_processor.stop()
+    await post_dispatcher.stop()
+    await social_publisher.close()
+    await webhook_system.stop()
+    await traffic_capture.stop()
+    await tracer.stop()
+    await loop_monitor.stop()
+    await profiler.stop()
+    
+    await read_replica.stop()
+    
+    if background_db_pool and background_db_pool is not db_pool:
+        await background_db_pool.close()
+    
+    if db_pool:
+        await db_pool.close()
+        logger.info("Database connection closed")
+    
+    if redis_cache:
+        # Uncomment when Redis is enabled
+        # await redis_cache.close()
+        logger.info("Redis cache connection closed")
+    
+    logger.info("Shutdown complete")
+    log_pipeline.stop()
+
+# ============================================
+# DATA MODELS (Core Feature)
+# ============================================
+
+class ContentType(str, Enum):
+    """Types of content that can be generated"""
+    BLOG = "blog"
     SOCIAL_POST = "social_post"
     EMAIL = "email"
     AD_COPY = "ad_copy"
@@ -582,13 +2922,13 @@ class ContentEngine:
         self.anthropic_client = None
         
         if OPENAI_API_KEY:
-            self.openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+            self.openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
             logger.info("OpenAI client initialized")
         else:
             logger.error("OpenAI API key missing - content generation will fail")
         
         if ANTHROPIC_API_KEY:
-            self.anthropic_client = AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
+            self.anthropic_client = AsyncAnthropic(api_key=ANTHROPIC_API_KEY, base_url=ANTHROPIC_BASE_URL)
             logger.info("Anthropic client initialized (premium multi-model available)")
         
         # FREE OPTIONAL ENHANCEMENT: Content templates
@@ -608,8 +2948,15 @@ class ContentEngine:
         """
         
         start_time = datetime.now()
+        started = stage_start = time.perf_counter()
         logger.info(f"Generating {request.content_type.value} content: {request.topic[:50]}...")
         
+        def finish_stage(stage: str):
+            nonlocal stage_start
+            now = time.perf_counter()
+            metrics.generate_stages.observe(now - stage_start, stage)
+            stage_start = now
+        
         # PAID OPTIONAL ENHANCEMENT: Cache Check
         cache_key = None
         cached_content = None
@@ -619,6 +2966,8 @@ class ContentEngine:
             # if cached_content:
             #     logger.info(f"Cache hit! Saved ~${cached_content.get('cost_saved', 0.03):.3f}")
             #     return ContentResponse(**cached_content, cached=True)
+            metrics.cache_requests.inc(1, "response", "hit" if cached_content else "miss")
+            finish_stage("cache_check")
         
         # FREE OPTIONAL ENHANCEMENT: Cost Control
         estimated_cost = self._estimate_cost(request)
@@ -630,6 +2979,7 @@ class ContentEngine:
                     detail=f"Monthly budget of ${MONTHLY_AI_BUDGET} would be exceeded. "
                            f"Current usage: ${await cost_controller.get_month_cost():.2f}"
                 )
+            finish_stage("budget_check")
         
         # Generate content
         model_used = "unknown"
@@ -642,8 +2992,10 @@ class ContentEngine:
                 # CORE: Standard GPT-4
                 content = await self._generate_standard_content(request)
                 model_used = "gpt-4"
+            finish_stage("provider")
                 
         except Exception as e:
+            finish_stage("provider")
             logger.error(f"Content generation failed: {e}")
             
             # Track failure
@@ -662,39 +3014,53 @@ class ContentEngine:
                        "Please check your API keys and try again."
             )
         
-        # FREE OPTIONAL ENHANCEMENT: Calculate quality scores
-        quality_score = self._assess_quality(content, request)
-        seo_score = self._calculate_seo_score(content, request.keywords) if request.seo_optimize else 0.5
-        
-        # FREE OPTIONAL ENHANCEMENT: Smart hashtags for social media
-        if request.include_hashtags and request.platform in [Platform.TWITTER, Platform.INSTAGRAM, Platform.LINKEDIN]:
-            content = await self._add_smart_hashtags(content, request.keywords, request.platform)
-        
-        # FREE OPTIONAL ENHANCEMENT: Platform optimization
-        content = self._optimize_for_platform(content, request.platform, request)
-        
-        # Store in database
+        # FREE OPTIONAL ENHANCEMENT: Quality scores, smart hashtags and platform
+        # optimization (off the event loop for long documents)
+        with tracer.span("post_processing", attributes={"splants.content_chars": len(content)}):
+            processed = await post_processor.process(content, request, score_seo=request.seo_optimize)
+        content = processed["content"]
+        quality_score = processed["quality_score"]
+        seo_score = processed["seo_score"]
+        for stage, elapsed_ms in processed["timings"].items():
+            metrics.generate_stages.observe(elapsed_ms / 1000, stage)
+        stage_start = time.perf_counter()
+        
+        # Store in database (with its webhook, in one transaction)
         async with db_pool.acquire() as conn:
-            result = await conn.fetchrow('''
-                INSERT INTO content 
-                (content_type, topic, content, metadata, quality_score, seo_score, status)
-                VALUES ($1, $2, $3, $4, $5, $6, $7)
-                RETURNING id, created_at
-            ''', request.content_type.value, request.topic, content, 
-                json.dumps({
-                    "keywords": request.keywords,
-                    "tone": request.tone.value,
-                    "platform": request.platform.value,
-                    "model": model_used,
-                    "target_audience": request.target_audience,
-                    "premium": request.use_premium
-                }),
-                quality_score, seo_score, 'ready')
+            async with conn.transaction():
+                result = await query_registry.fetchrow(
+                    conn, "insert_content", request.content_type.value, request.topic, content, 
+                    json.dumps({
+                        "keywords": request.keywords,
+                        "tone": request.tone.value,
+                        "platform": request.platform.value,
+                        "model": model_used,
+                        "target_audience": request.target_audience,
+                        "length": request.length,
+                        "seo_optimize": request.seo_optimize,
+                        "post_processed": processed["post_processed"],
+                        "premium": request.use_premium
+                    }),
+                    quality_score, seo_score, 'ready')
+                
+                # FREE OPTIONAL ENHANCEMENT: Webhooks
+                if webhook_system.has_subscribers('content_generated'):
+                    await webhook_system.enqueue(
+                        conn,
+                        'content_generated',
+                        {
+                            'content_id': result['id'],
+                            'type': request.content_type.value,
+                            'quality_score': quality_score,
+                            'topic': request.topic
+                        }
+                    )
         
         content_id = result['id']
+        finish_stage("db_insert")
         
         # Calculate actual cost and processing time
-        word_count = len(content.split())
+        word_count = processed["word_count"]
         processing_time = (datetime.now() - start_time).total_seconds()
         
         # FREE OPTIONAL ENHANCEMENT: Generate recommendations
@@ -707,9 +3073,10 @@ class ContentEngine:
             seo_score=seo_score,
             metadata={
                 "word_count": word_count,
-                "reading_time": max(1, word_count // 200),
+                "reading_time": processed["reading_time"],
                 "platform_optimized": request.platform.value,
                 "processing_time": round(processing_time, 2),
+                "post_processing_ms": {stage: round(ms, 2) for stage, ms in processed["timings"].items()},
                 "model": model_used
             },
             generated_at=result['created_at'],
@@ -719,7 +3086,8 @@ class ContentEngine:
         )
         
         # Background tasks for non-blocking operations
-        background_tasks.add_task(
+        metrics.add_background_task(
+            background_tasks,
             self._track_api_usage,
             model=model_used,
             tokens=word_count,  # Rough estimate
@@ -730,7 +3098,8 @@ class ContentEngine:
         )
         
         # FREE OPTIONAL ENHANCEMENT: Track analytics
-        background_tasks.add_task(
+        metrics.add_background_task(
+            background_tasks,
             analytics.track_event,
             'content_generated',
             {
@@ -744,23 +3113,10 @@ class ContentEngine:
             }
         )
         
-        # FREE OPTIONAL ENHANCEMENT: Webhooks
-        if WEBHOOK_CONTENT_GENERATED:
-            background_tasks.add_task(
-                webhook_system.trigger_webhook,
-                'content_generated',
-                {
-                    'content_id': content_id,
-                    'type': request.content_type.value,
-                    'quality_score': quality_score,
-                    'topic': request.topic
-                },
-                WEBHOOK_CONTENT_GENERATED
-            )
-        
         # FREE OPTIONAL ENHANCEMENT: A/B Testing variants
         if request.generate_variants:
-            background_tasks.add_task(
+            metrics.add_background_task(
+                background_tasks,
                 self._generate_ab_variants,
                 request,
                 content_id
@@ -771,6 +3127,7 @@ class ContentEngine:
             # background_tasks.add_task(self._cache_content, cache_key, response)
             pass
         
+        metrics.generate_stages.observe(time.perf_counter() - started, "total")
         logger.info(f" Content generated (ID: {content_id}, Quality: {quality_score:.2f}, Cost: ${estimated_cost:.3f})")
         
         return response
@@ -787,17 +3144,19 @@ class ContentEngine:
         user_prompt = self._build_user_prompt(request)
         
         try:
-            completion = await self.openai_client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.7,
-                max_tokens=self._calculate_max_tokens(request.length),
-                presence_penalty=0.1,  # Encourages diverse vocabulary
-                frequency_penalty=0.1  # Reduces repetition
-            )
+            with provider_call("openai", "generate", "gpt-4-turbo-preview") as span:
+                completion = await self.openai_client.chat.completions.create(
+                    model="gpt-4-turbo-preview",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.7,
+                    max_tokens=self._calculate_max_tokens(request.length),
+                    presence_penalty=0.1,  # Encourages diverse vocabulary
+                    frequency_penalty=0.1  # Reduces repetition
+                )
+                self._record_openai_usage(span, completion)
             
             return completion.choices[0].message.content.strip()
             
@@ -866,15 +3225,17 @@ Guidelines:
 Create the best possible synthesis:"""
         
         try:
-            synthesis = await self.openai_client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {"role": "system", "content": "You are an expert at synthesizing content from multiple sources."},
-                    {"role": "user", "content": synthesis_prompt}
-                ],
-                temperature=0.5,
-                max_tokens=self._calculate_max_tokens(request.length)
-            )
+            with provider_call("openai", "synthesis", "gpt-4-turbo-preview") as span:
+                synthesis = await self.openai_client.chat.completions.create(
+                    model="gpt-4-turbo-preview",
+                    messages=[
+                        {"role": "system", "content": "You are an expert at synthesizing content from multiple sources."},
+                        {"role": "user", "content": synthesis_prompt}
+                    ],
+                    temperature=0.5,
+                    max_tokens=self._calculate_max_tokens(request.length)
+                )
+                self._record_openai_usage(span, synthesis)
             
             return synthesis.choices[0].message.content.strip()
             
@@ -888,15 +3249,17 @@ Create the best possible synthesis:"""
         system_prompt = self._build_system_prompt(request)
         user_prompt = self._build_user_prompt(request)
         
-        completion = await self.openai_client.chat.completions.create(
-            model="gpt-4-turbo-preview",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=self._calculate_max_tokens(request.length)
-        )
+        with provider_call("openai", "premium", "gpt-4-turbo-preview") as span:
+            completion = await self.openai_client.chat.completions.create(
+                model="gpt-4-turbo-preview",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0.7,
+                max_tokens=self._calculate_max_tokens(request.length)
+            )
+            self._record_openai_usage(span, completion)
         
         return completion.choices[0].message.content.strip()
     
@@ -905,15 +3268,25 @@ Create the best possible synthesis:"""
         system_prompt = self._build_system_prompt(request)
         user_prompt = self._build_user_prompt(request)
         
-        message = await self.anthropic_client.messages.create(
-            model="claude-3-sonnet-20240229",
-            max_tokens=self._calculate_max_tokens(request.length),
-            system=system_prompt,
-            messages=[{"role": "user", "content": user_prompt}]
-        )
+        with provider_call("anthropic", "premium", "claude-3-sonnet-20240229") as span:
+            message = await self.anthropic_client.messages.create(
+                model="claude-3-sonnet-20240229",
+                max_tokens=self._calculate_max_tokens(request.length),
+                system=system_prompt,
+                messages=[{"role": "user", "content": user_prompt}]
+            )
+            span.set_attribute("gen_ai.usage.input_tokens", message.usage.input_tokens)
+            span.set_attribute("gen_ai.usage.output_tokens", message.usage.output_tokens)
         
         return message.content[0].text.strip()
     
+    @staticmethod
+    def _record_openai_usage(span: Span, completion):
+        """Token usage of an OpenAI completion onto its provider_call() span"""
+        if completion.usage:
+            span.set_attribute("gen_ai.usage.input_tokens", completion.usage.prompt_tokens)
+            span.set_attribute("gen_ai.usage.output_tokens", completion.usage.completion_tokens)
+    
     def _build_system_prompt(self, request: ContentRequest) -> str:
         """
         Build intelligent system prompt based on content type
@@ -1065,419 +3438,19 @@ Structure: Headline, dateline, lead paragraph, body, boilerplate, contact info."
 **SEO Optimization Requirements:**
 - Include a compelling meta description suggestion (150-160 characters)
 - Use headers (H2, H3) to structure content
-- Suggest opportunities for internal linking
-- Use lists and bullet points for readability
-- Include a strong conclusion with CTA
-""")
-        
-        return "\n\n".join(parts)
-    
-    def _optimize_for_platform(self, content: str, platform: Platform, request: ContentRequest) -> str:
-        """
-        FREE OPTIONAL ENHANCEMENT: Platform-specific optimization
-        
-        Automatically adjusts content to meet platform requirements and best practices
-        """
-        
-        if platform == Platform.TWITTER:
-            # Twitter: 280 character limit
-            if len(content) > 280:
-                # Smart truncation - try to end at sentence or word boundary
-                truncated = content[:277]
-                
-                # Try to find last sentence ending
-                last_period = max(truncated.rfind('.'), truncated.rfind('!'), truncated.rfind('?'))
-                if last_period > 200:  # Keep if it's not too short
-                    content = truncated[:last_period + 1]
-                else:
-                    # Find last word boundary
-                    last_space = truncated.rfind(' ')
-                    if last_space > 250:
-                        content = truncated[:last_space] + "..."
-                    else:
-                        content = truncated + "..."
-        
-        elif platform == Platform.LINKEDIN:
-            # LinkedIn: First 140 characters show without "see more"
-            # Ensure strong hook in first sentence
-            if len(content) > 140:
-                first_period = content.find('.')
-                if first_period == -1 or first_period > 140:
-                    # Add line break after ~140 chars for better mobile display
-                    space_pos = content.find(' ', 130)
-                    if space_pos != -1 and space_pos < 150:
-                        content = content[:space_pos] + '\n\n' + content[space_pos + 1:]
-        
-        elif platform == Platform.INSTAGRAM:
-            # Instagram: 2200 character caption limit
-            if len(content) > 2200:
-                content = content[:2197] + "..."
-            
-            # Ensure hashtags are at the end
-            if '#' in content:
-                # Move all hashtags to the end
-                lines = content.split('\n')
-                hashtag_lines = [line for line in lines if '#' in line]
-                content_lines = [line for line in lines if '#' not in line]
-                
-                if hashtag_lines:
-                    content = '\n'.join(content_lines) + '\n\n' + '\n'.join(hashtag_lines)
-        
-        elif platform == Platform.FACEBOOK:
-            # Facebook: Optimal post length is 40-80 characters for max engagement
-            # But can be up to 63,206 characters
-            # Add paragraph breaks for readability
-            if len(content) > 200 and '\n\n' not in content[:200]:
-                # Add a line break after first sentence if missing
-                first_period = content.find('.')
-                if first_period != -1 and first_period < 200:
-                    content = content[:first_period + 1] + '\n\n' + content[first_period + 2:]
-        
-        elif platform == Platform.YOUTUBE:
-            # YouTube: Description should have key info in first 157 characters
-            # Add timestamps if this is a video script
-            if request.content_type == ContentType.VIDEO_SCRIPT:
-                # Suggest timestamp structure
-                if '[00:00]' not in content and '0:00' not in content:
-                    content = "📍 Timestamps:\n0:00 - Intro\n\n" + content
-        
-        elif platform == Platform.TIKTOK:
-            # TikTok: 150 character caption, 2200 for video description
-            # Keep it punchy and use emojis
-            if len(content) > 150:
-                content = content[:147] + "..."
-            
-            # Ensure at least one emoji for engagement
-            if not any(char for char in content if ord(char) > 127):
-                # Add relevant emoji at start
-                emoji_map = {
-                    'tip': '',
-                    'business': '💼',
-                    'marketing': '',
-                    'ai': '',
-                    'money': '',
-                    'success': ''
-                }
-                
-                for keyword, emoji in emoji_map.items():
-                    if keyword in content.lower():
-                        content = f"{emoji} {content}"
-                        break
-        
-        return content.strip()
-    
-    async def _add_smart_hashtags(
-        self,
-        content: str,
-        keywords: List[str],
-        platform: Platform
-    ) -> str:
-        """
-        FREE OPTIONAL ENHANCEMENT: Smart hashtag generation
-        
-        Automatically generates optimized hashtags based on:
-        - Content keywords
-        - Platform best practices
-        - Trending topics (when available)
-        - Hashtag performance data
-        """
-        
-        if not keywords:
-            return content
-        
-        # Already has hashtags? Skip
-        if '#' in content:
-            return content
-        
-        # Platform-specific hashtag strategy
-        hashtag_config = {
-            Platform.TWITTER: {
-                'max': 2,
-                'placement': 'inline',
-                'style': 'capitalize_first'
-            },
-            Platform.INSTAGRAM: {
-                'max': 10,
-                'placement': 'end',
-                'style': 'capitalize_all'
-            },
-            Platform.LINKEDIN: {
-                'max': 5,
-                'placement': 'end',
-                'style': 'capitalize_first'
-            },
-            Platform.FACEBOOK: {
-                'max': 2,
-                'placement': 'inline',
-                'style': 'capitalize_first'
-            },
-            Platform.TIKTOK: {
-                'max': 5,
-                'placement': 'inline',
-                'style': 'lowercase'
-            },
-            Platform.PINTEREST: {
-                'max': 5,
-                'placement': 'end',
-                'style': 'capitalize_first'
-            }
-        }
-        
-        config = hashtag_config.get(platform)
-        if not config:
-            return content
-        
-        # Generate hashtags from keywords
-        hashtags = []
-        for keyword in keywords[:config['max']]:
-            # Clean and format hashtag
-            hashtag = keyword.replace(' ', '').replace('-', '').replace('_', '')
-            
-            # Apply styling
-            if config['style'] == 'capitalize_first':
-                hashtag = hashtag.capitalize()
-            elif config['style'] == 'capitalize_all':
-                # CamelCase for multi-word hashtags
-                words = keyword.split()
-                hashtag = ''.join(word.capitalize() for word in words)
-            elif config['style'] == 'lowercase':
-                hashtag = hashtag.lower()
-            
-            # Validate hashtag length (max 30 characters per platform standard)
-            if len(hashtag) <= 30 and len(hashtag) >= 3:
-                hashtags.append('#' + hashtag)
-        
-        if not hashtags:
-            return content
-        
-        # Add hashtags based on platform preference
-        hashtag_string = ' '.join(hashtags)
-        
-        if config['placement'] == 'inline':
-            # Add at the end of the first line or paragraph
-            lines = content.split('\n')
-            lines[0] = f"{lines[0]} {hashtag_string}"
-            content = '\n'.join(lines)
-        else:  # 'end'
-            # Add at the very end with spacing
-            content = f"{content}\n\n{hashtag_string}"
-        
-        return content
-    
-    def _assess_quality(self, content: str, request: ContentRequest) -> float:
-        """
-        FREE OPTIONAL ENHANCEMENT: Advanced quality assessment
-        
-        Evaluates content quality across multiple dimensions:
-        - Length appropriateness
-        - Keyword integration
-        - Readability
-        - Engagement indicators
-        - Structure and formatting
-        """
-        
-        score = 0.0
-        word_count = len(content.split())
-        
-        # 1. Length appropriateness (25% of score)
-        if request.length:
-            ratio = word_count / request.length
-            # Ideal is within 10% of target
-            if 0.9 <= ratio <= 1.1:
-                score += 0.25
-            elif 0.8 <= ratio <= 1.2:
-                score += 0.20
-            elif 0.7 <= ratio <= 1.3:
-                score += 0.15
-            else:
-                score += 0.10
-        else:
-            # Default good range
-            if 100 <= word_count <= 2000:
-                score += 0.25
-            elif 50 <= word_count <= 3000:
-                score += 0.15
-            else:
-                score += 0.10
-        
-        # 2. Keyword integration (25% of score)
-        if request.keywords:
-            content_lower = content.lower()
-            keyword_count = sum(1 for kw in request.keywords if kw.lower() in content_lower)
-            keyword_ratio = keyword_count / len(request.keywords)
-            
-            # Perfect: All keywords present
-            if keyword_ratio >= 0.9:
-                score += 0.25
-            elif keyword_ratio >= 0.7:
-                score += 0.20
-            elif keyword_ratio >= 0.5:
-                score += 0.15
-            else:
-                score += 0.10
-        else:
-            score += 0.25  # No penalty if no keywords specified
-        
-        # 3. Readability (20% of score)
-        sentences = content.count('.') + content.count('!') + content.count('?')
-        if sentences > 0:
-            avg_sentence_length = word_count / sentences
-            
-            # Ideal: 15-20 words per sentence
-            if 15 <= avg_sentence_length <= 20:
-                score += 0.20
-            elif 10 <= avg_sentence_length <= 25:
-                score += 0.15
-            elif 8 <= avg_sentence_length <= 30:
-                score += 0.10
-            else:
-                score += 0.05
-        
-        # 4. Engagement indicators (15% of score)
-        engagement_score = 0
-        
-        # Questions (engages reader)
-        if '?' in content:
-            engagement_score += 0.05
-        
-        # Numbers/statistics (adds credibility)
-        if any(char.isdigit() for char in content):
-            engagement_score += 0.04
-        
-        # Call-to-action phrases
-        cta_phrases = ['click', 'visit', 'learn', 'discover', 'join', 'get', 'try', 'start', 'explore']
-        if any(cta in content.lower() for cta in cta_phrases):
-            engagement_score += 0.03
-        
-        # Lists/bullets (improves scannability)
-        if any(marker in content for marker in ['•', '-', '1.', '2.', '*']):
-            engagement_score += 0.03
-        
-        score += min(engagement_score, 0.15)
-        
-        # 5. Structure and formatting (15% of score)
-        structure_score = 0
-        
-        # Paragraphs (good readability)
-        paragraph_count = content.count('\n\n') + 1
-        if 3 <= paragraph_count <= 10:
-            structure_score += 0.05
-        elif paragraph_count > 1:
-            structure_score += 0.03
-        
-        # Headers/sections (good organization)
-        if any(header in content for header in ['##', 'H2:', 'H3:', '**']):
-            structure_score += 0.05
-        
-        # Strong opening (first sentence quality)
-        first_sentence = content.split('.')[0] if '.' in content else content[:100]
-        if len(first_sentence.split()) >= 8 and len(first_sentence.split()) <= 20:
-            structure_score += 0.03
-        
-        # Clear conclusion
-        last_paragraph = content.split('\n\n')[-1] if '\n\n' in content else content[-200:]
-        if any(conclusion in last_paragraph.lower() for conclusion in ['conclusion', 'in summary', 'to summarize', 'finally']):
-            structure_score += 0.02
-        
-        score += min(structure_score, 0.15)
-        
-        return min(score, 1.0)
-    
-    def _calculate_seo_score(self, content: str, keywords: List[str]) -> float:
-        """
-        FREE OPTIONAL ENHANCEMENT: Comprehensive SEO scoring
-        
-        Evaluates SEO optimization across:
-        - Keyword presence and placement
-        - Keyword density
-        - Content structure
-        - Meta elements suggestions
-        """
-        
-        if not keywords:
-            return 0.5  # Neutral score if no keywords
-        
-        score = 0.0
-        content_lower = content.lower()
-        word_count = len(content.split())
-        
-        # 1. Keyword presence (35% of SEO score)
-        keyword_count = sum(1 for kw in keywords if kw.lower() in content_lower)
-        presence_ratio = keyword_count / len(keywords)
-        
-        if presence_ratio >= 0.9:
-            score += 0.35
-        elif presence_ratio >= 0.7:
-            score += 0.28
-        elif presence_ratio >= 0.5:
-            score += 0.20
-        else:
-            score += 0.10
-        
-        # 2. Keyword density (25% of SEO score)
-        # Optimal density: 1-3% of total words
-        if word_count > 0:
-            total_keyword_occurrences = sum(
-                content_lower.count(kw.lower()) for kw in keywords
-            )
-            density = (total_keyword_occurrences / word_count) * 100
-            
-            if 1 <= density <= 3:
-                score += 0.25  # Perfect density
-            elif 0.5 <= density < 1:
-                score += 0.20  # A bit low
-            elif 3 < density <= 5:
-                score += 0.15  # A bit high
-            else:
-                score += 0.05  # Too high or too low
-        
-        # 3. Keyword placement (20% of SEO score)
-        placement_score = 0
-        
-        # First 100 words (important for SEO)
-        first_100 = ' '.join(content.split()[:100]).lower()
-        if any(kw.lower() in first_100 for kw in keywords):
-            placement_score += 0.07
-        
-        # Headers/titles (high importance)
-        headers = [line for line in content.split('\n') if line.strip().startswith('#') or '**' in line]
-        if headers and any(kw.lower() in ' '.join(headers).lower() for kw in keywords):
-            placement_score += 0.07
-        
-        # Last paragraph (conclusion)
-        last_para = content.split('\n\n')[-1].lower() if '\n\n' in content else content[-200:].lower()
-        if any(kw.lower() in last_para for kw in keywords):
-            placement_score += 0.06
-        
-        score += min(placement_score, 0.20)
-        
-        # 4. Content structure (20% of SEO score)
-        structure_score = 0
-        
-        # Good length (500-2500 words is ideal for SEO)
-        if 500 <= word_count <= 2500:
-            structure_score += 0.08
-        elif 300 <= word_count <= 3000:
-            structure_score += 0.05
-        else:
-            structure_score += 0.02
-        
-        # Headers present (H2, H3, etc.)
-        header_markers = ['##', 'H2:', 'H3:', '###']
-        if any(marker in content for marker in header_markers):
-            structure_score += 0.06
-        
-        # Lists/bullets (good for featured snippets)
-        if any(marker in content for marker in ['•', '-', '1.', '2.', '*']):
-            structure_score += 0.04
-        
-        # Internal linking suggestions (if present)
-        if '[' in content and ']' in content:
-            structure_score += 0.02
-        
-        score += min(structure_score, 0.20)
+- Suggest opportunities for internal linking
+- Use lists and bullet points for readability
+- Include a strong conclusion with CTA
+""")
         
-        return min(score, 1.0)
+        return "\n\n".join(parts)
+    
+    # Scoring and platform optimization live in scoring.py, which the
+    # post-processing pool imports instead of this module
+    _optimize_for_platform = staticmethod(optimize_for_platform)
+    _add_smart_hashtags = staticmethod(add_smart_hashtags)
+    _assess_quality = staticmethod(assess_quality)
+    _calculate_seo_score = staticmethod(calculate_seo_score)
     
     def _generate_recommendations(
         self,
@@ -1568,145 +3541,738 @@ Structure: Headline, dateline, lead paragraph, body, boilerplate, contact info."
         # Cap at model maximum
         return min(tokens, 4000)
     
-    def _generate_cache_key(self, request: ContentRequest) -> str:
-        """Generate cache key for request"""
-        
-        # Include all relevant parameters that affect output
-        key_parts = [
-            request.content_type.value,
-            request.topic,
-            request.tone.value,
-            request.platform.value,
-            str(request.length or 'auto'),
-            str(request.use_premium),
-            '-'.join(sorted(request.keywords))
-        ]
-        
-        key_string = ':'.join(key_parts)
-        return f"content:{hashlib.md5(key_string.encode()).hexdigest()}"
+    def _generate_cache_key(self, request: ContentRequest) -> str:
+        """Generate cache key for request"""
+        
+        # Include all relevant parameters that affect output
+        key_parts = [
+            request.content_type.value,
+            request.topic,
+            request.tone.value,
+            request.platform.value,
+            str(request.length or 'auto'),
+            str(request.use_premium),
+            '-'.join(sorted(request.keywords))
+        ]
+        
+        key_string = ':'.join(key_parts)
+        return f"content:{hashlib.md5(key_string.encode()).hexdigest()}"
+    
+    async def _track_api_usage(
+        self,
+        model: str,
+        tokens: int,
+        cost: float,
+        request_type: str,
+        content_id: Optional[int] = None,
+        success: bool = True,
+        error_message: Optional[str] = None
+    ):
+        """
+        FREE OPTIONAL ENHANCEMENT: Track API usage for cost monitoring
+        """
+        
+        try:
+            async with background_db_pool.acquire("track_api_usage") as conn:
+                await query_registry.execute(
+                    conn, "insert_api_usage",
+                    model, tokens, cost, request_type, content_id, success, error_message
+                )
+        except Exception as e:
+            logger.error(f"Failed to track API usage: {e}")
+    
+    async def _generate_ab_variants(
+        self,
+        request: ContentRequest,
+        original_content_id: int
+    ):
+        """
+        FREE OPTIONAL ENHANCEMENT: Generate A/B test variants
+        
+        Creates 2 additional variants with different approaches:
+        1. Different tone
+        2. Different structure/angle
+        """
+        
+        try:
+            logger.info(f"Generating A/B test variants for content {original_content_id}")
+            
+            # Get original content
+            async with background_db_pool.acquire("ab_variants") as conn:
+                original = await query_registry.fetchrow(conn, "get_content", original_content_id)
+            
+            if not original:
+                logger.error("Original content not found for A/B testing")
+                return
+            
+            # Define variant strategies
+            variants = []
+            
+            # Variant 1: Different tone
+            if request.tone != ContentTone.ENTHUSIASTIC:
+                variant1_request = request.copy(deep=True)
+                variant1_request.tone = ContentTone.ENTHUSIASTIC
+                variants.append(("tone", variant1_request))
+            
+            # Variant 2: Different approach (if professional, try casual)
+            if request.tone == ContentTone.PROFESSIONAL:
+                variant2_request = request.copy(deep=True)
+                variant2_request.tone = ContentTone.CONVERSATIONAL
+                variants.append(("approach", variant2_request))
+            else:
+                # Otherwise try professional
+                variant2_request = request.copy(deep=True)
+                variant2_request.tone = ContentTone.PROFESSIONAL
+                variants.append(("approach", variant2_request))
+            
+            variant_ids = [original_content_id]
+            
+            # Generate variants
+            for variant_type, variant_request in variants[:2]:  # Max 2 variants
+                try:
+                    # Generate variant content
+                    if variant_request.use_premium and self.anthropic_client:
+                        content = await self._generate_premium_content(variant_request)
+                    else:
+                        content = await self._generate_standard_content(variant_request)
+                    
+                    # Calculate scores (variants always get an SEO score)
+                    processed = await post_processor.process(content, variant_request, optimize=False)
+                    quality_score = processed["quality_score"]
+                    seo_score = processed["seo_score"]
+                    
+                    # Save variant
+                    async with background_db_pool.acquire("ab_variants") as conn:
+                        variant_id = await query_registry.fetchval(
+                            conn, "insert_content", variant_request.content_type.value, variant_request.topic, content,
+                            json.dumps({
+                                "keywords": variant_request.keywords,
+                                "tone": variant_request.tone.value,
+                                "platform": variant_request.platform.value,
+                                "length": variant_request.length,
+                                "variant_type": variant_type,
+                                "original_id": original_content_id,
+                                "is_variant": True
+                            }),
+                            quality_score, seo_score, 'variant')
+                    
+                    variant_ids.append(variant_id)
+                    logger.info(f"Created variant {variant_id} (type: {variant_type})")
+                    
+                except Exception as e:
+                    logger.error(f"Failed to generate variant {variant_type}: {e}")
+            
+            # Create A/B test record
+            if len(variant_ids) > 1:
+                async with background_db_pool.acquire("ab_variants") as conn:
+                    await query_registry.execute(
+                        conn, "insert_ab_test",
+                        f"AB Test: {request.topic[:50]}", variant_ids, "tone", "active"
+                    )
+                
+                logger.info(f"A/B test created with {len(variant_ids)} variants")
+        
+        except Exception as e:
+            logger.error(f"A/B variant generation failed: {e}")
+
+# ============================================
+# CONTENT LIBRARY RE-SCORING
+# ============================================
+
+class ContentRescorer:
+    """
+    Re-scores the stored content library with the current scoring rules
+    
+    Streams content rows in id order, RESCORE_CHUNK_SIZE at a time, scores
+    each chunk with BatchScorer and writes the new scores back with one
+    bulk UPDATE per chunk (rows whose scores did not change are skipped).
+    Only one run at a time across all workers (advisory lock).
+    
+    Each document is scored with the settings it was generated with
+    (metadata length and seo_optimize), or the ContentRequest defaults (no
+    target length, SEO scored) for rows stored before those were recorded.
+    Rows whose stored text was changed by hashtags or platform optimization
+    after scoring (metadata post_processed) are skipped: the text that was
+    scored is gone.
+    
+    Start a run with POST /v1/system/rescore or scripts/rescore_content.py.
+    """
+    
+    LOCK_ID = 7_265_003  # Advisory lock for re-scoring runs
+    
+    def __init__(self):
+        self.scorer = BatchScorer()
+        self.running = False
+        self.progress: Dict[str, Any] = {}
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._task = None
+    
+    def start(self, chunk_size: int = None, dry_run: bool = False) -> bool:
+        """Run in the background; False if this worker is already re-scoring"""
+        if self.running:
+            return False
+        self.running = True
+        self._task = asyncio.create_task(self._run_in_background(chunk_size, dry_run))
+        return True
+    
+    async def _run_in_background(self, chunk_size: int, dry_run: bool):
+        try:
+            await self.run(chunk_size, dry_run)
+        except Exception:
+            pass  # Already logged and recorded in last_run
+    
+    async def stop(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+    
+    @staticmethod
+    def _documents(rows) -> Tuple[List[int], List[Tuple[str, List[str], Optional[int]]], List[bool]]:
+        """Ids, (text, keywords, target_length) and seo_optimize of the rows that can be re-scored"""
+        ids, documents, score_seo = [], [], []
+        for row in rows:
+            metadata = row['metadata']
+            if isinstance(metadata, str):
+                metadata = json.loads(metadata)
+            metadata = metadata or {}
+            if metadata.get('post_processed'):
+                continue  # Stored text isn't the text that was scored
+            ids.append(row['id'])
+            documents.append((row['content'], metadata.get('keywords') or [], metadata.get('length')))
+            score_seo.append(bool(metadata.get('seo_optimize', True)))
+        return ids, documents, score_seo
+    
+    async def run(self, chunk_size: int = None, dry_run: bool = False) -> Dict[str, Any]:
+        """Re-score every content row; returns a summary of the run"""
+        chunk_size = chunk_size or RESCORE_CHUNK_SIZE
+        self.running = True
+        self.progress = {
+            "started_at": datetime.utcnow().isoformat(),
+            "dry_run": dry_run,
+            "scored": 0,
+            "skipped": 0,
+            "updated": 0,
+            "last_id": 0
+        }
+        start = time.perf_counter()
+        
+        try:
+            async with background_db_pool.acquire("content_rescoring") as conn:
+                if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", self.LOCK_ID):
+                    raise RuntimeError("Another worker is already re-scoring the content library")
+                
+                try:
+                    last_id = 0
+                    while True:
+                        rows = await query_registry.fetch(conn, "content_for_rescoring", last_id, chunk_size)
+                        if not rows:
+                            break
+                        
+                        ids, documents, score_seo = self._documents(rows)
+                        
+                        if documents:
+                            # Feature extraction is CPU-bound; keep the event loop responsive
+                            quality, seo = await post_processor.offload(self.scorer.score_documents, documents, score_seo)
+                            
+                            if not dry_run:
+                                status = await query_registry.execute(
+                                    conn, "update_content_scores", ids, quality.tolist(), seo.tolist()
+                                )
+                                self.progress["updated"] += int(status.split()[-1])
+                        
+                        last_id = rows[-1]['id']
+                        self.progress["scored"] += len(documents)
+                        self.progress["skipped"] += len(rows) - len(documents)
+                        self.progress["last_id"] = last_id
+                finally:
+                    await conn.execute("SELECT pg_advisory_unlock($1)", self.LOCK_ID)
+            
+            elapsed = time.perf_counter() - start
+            self.last_run = {
+                **self.progress,
+                "status": "completed",
+                "elapsed_seconds": round(elapsed, 2),
+                "documents_per_second": round(self.progress["scored"] / elapsed, 1) if elapsed else 0
+            }
+            logger.info(
+                f"Re-scored {self.progress['scored']} document(s), {self.progress['updated']} updated, "
+                f"{self.progress['skipped']} skipped, in {elapsed:.1f}s"
+            )
+            return self.last_run
+        except Exception as e:
+            self.last_run = {**self.progress, "status": "failed", "error": str(e)}
+            logger.error(f"Content re-scoring failed: {e}")
+            raise
+        finally:
+            self.running = False
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "progress": self.progress if self.running else None,
+            "last_run": self.last_run
+        }
+
+# ============================================
+# POST-PROCESSING (Off-loop CPU Work)
+# ============================================
+
+class ContentPostProcessor:
+    """
+    Runs CPU-bound post-processing off the event loop
+    
+    Scoring, hashtags and platform optimization are pure CPU work; on a long
+    document they stall every other request in the worker. Documents of at
+    least POSTPROCESS_OFFLOAD_CHARS characters go to a process pool
+    (POSTPROCESS_EXECUTOR=process) or thread pool (thread); smaller ones run
+    inline, where dispatching would cost more than the work itself.
+    POSTPROCESS_EXECUTOR=inline keeps everything on the event loop.
+    
+    Pool workers run functions from scoring.py and import only that
+    module, never this one (see PostProcessRequest).
+    
+    Per-stage timings (including pool dispatch) are in get_status().
+    """
+    
+    def __init__(self):
+        self.mode = POSTPROCESS_EXECUTOR
+        self.inline = 0
+        self.offloaded = 0
+        self.pool_restarts = 0
+        self.stages = defaultdict(lambda: {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        self._executor = None
+    
+    def start(self):
+        if self.mode == "process":
+            # spawn, not fork: the parent has a running event loop and open connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=POSTPROCESS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            # Spawn the workers now rather than on the first long document
+            for _ in range(POSTPROCESS_WORKERS):
+                self._executor.submit(os.getpid)
+        elif self.mode == "thread":
+            self._executor = ThreadPoolExecutor(max_workers=POSTPROCESS_WORKERS, thread_name_prefix="postprocess")
+        else:
+            logger.info(" Post-processing runs inline (POSTPROCESS_EXECUTOR=inline)")
+            return
+        
+        logger.info(
+            f" Post-processing offloaded to a {self.mode} pool ({POSTPROCESS_WORKERS} workers, "
+            f"documents >= {POSTPROCESS_OFFLOAD_CHARS} chars)"
+        )
+    
+    async def stop(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    async def offload(self, func, *args):
+        """Run func(*args) in the pool - or a thread if there is none - and await the result"""
+        executor = self._executor
+        if executor is None:
+            return await asyncio.to_thread(func, *args)
+        
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # A worker process died (OOM-killed, for example); replace the pool
+            if self._executor is executor:
+                logger.error("Post-processing pool broke; starting a new one")
+                self.pool_restarts += 1
+                executor.shutdown(wait=False)
+                self.start()
+            return await asyncio.to_thread(func, *args)
+    
+    async def process(
+        self,
+        content: str,
+        request: ContentRequest,
+        score_seo: bool = True,
+        optimize: bool = True
+    ) -> Dict[str, Any]:
+        """run_post_processing(), offloaded for large documents"""
+        if self._executor is None or len(content) < POSTPROCESS_OFFLOAD_CHARS:
+            result = run_post_processing(content, request, score_seo, optimize)
+            self.inline += 1
+        else:
+            start = time.perf_counter()
+            # Plain values: unpickling a ContentRequest would import main.py in the worker
+            plain = PostProcessRequest(
+                request.content_type.value, request.platform.value, list(request.keywords),
+                request.length, request.include_hashtags
+            )
+            result = await self.offload(run_post_processing, content, plain, score_seo, optimize)
+            self.offloaded += 1
+            # Queueing plus shipping arguments and results to and from the pool
+            elapsed = (time.perf_counter() - start) * 1000
+            result["timings"]["dispatch"] = max(0.0, elapsed - sum(result["timings"].values()))
+        
+        for stage, elapsed in result["timings"].items():
+            stats = self.stages[stage]
+            stats["count"] += 1
+            stats["total_ms"] += elapsed
+            stats["max_ms"] = max(stats["max_ms"], elapsed)
+        
+        return result
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "executor": self.mode if self._executor else "inline",
+            "workers": POSTPROCESS_WORKERS if self._executor else 0,
+            "offload_threshold_chars": POSTPROCESS_OFFLOAD_CHARS,
+            "inline": self.inline,
+            "offloaded": self.offloaded,
+            "pool_restarts": self.pool_restarts,
+            "stages": {
+                stage: {
+                    "count": stats["count"],
+                    "avg_ms": round(stats["total_ms"] / stats["count"], 3),
+                    "max_ms": round(stats["max_ms"], 3)
+                }
+                for stage, stats in self.stages.items()
+            }
+        }
+
+# ============================================
+# PLATFORM RATE LIMITING (Core Feature)
+# ============================================
+
+class TokenBucket:
+    """
+    Token bucket for one platform (or one account on a platform)
+    
+    Holds up to `burst` tokens, refilled at `rate` tokens per `per` seconds.
+    Waiters are served in arrival order (asyncio.Lock is FIFO), so a batch
+    of posts drains at exactly the allowed rate instead of racing.
+    """
+    
+    def __init__(self, rate: int, per: float, burst: int):
+        self.rate = rate
+        self.per = per
+        self.capacity = max(1, burst)
+        self.refill_rate = rate / per  # tokens per second
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.waiting = 0
+        self.granted = 0
+        self.total_wait = 0.0
+        self._lock = asyncio.Lock()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+    
+    async def acquire(self) -> float:
+        """Wait for a token; returns the seconds spent waiting"""
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    
+                    if now < self.blocked_until:
+                        delay = self.blocked_until - now
+                    elif self.tokens >= 1:
+                        self.tokens -= 1
+                        break
+                    else:
+                        delay = (1 - self.tokens) / self.refill_rate
+                    
+                    await asyncio.sleep(delay)
+        finally:
+            self.waiting -= 1
+        
+        waited = time.monotonic() - start
+        self.granted += 1
+        self.total_wait += waited
+        return waited
+    
+    def penalize(self, retry_after: float):
+        """The platform answered 429 - stop sending until it says we may"""
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.blocked_until = max(self.blocked_until, self.updated + retry_after)
+    
+    def backlog_seconds(self) -> float:
+        """Estimated time until everything queued on this bucket has been sent"""
+        now = time.monotonic()
+        self._refill(now)
+        queued = max(0.0, self.waiting - self.tokens)
+        return max(0.0, self.blocked_until - now) + queued / self.refill_rate
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "limit": f"{self.rate}/{self.per:g}s",
+            "burst": self.capacity,
+            "tokens": round(self.tokens, 2),
+            "waiting": self.waiting,
+            "granted": self.granted,
+            "avg_wait_seconds": round(self.total_wait / self.granted, 3) if self.granted else 0,
+            "backlog_seconds": round(self.backlog_seconds(), 1)
+        }
+
+class PlatformRateLimiter:
+    """
+    Keeps outbound publishing inside each platform's API quota
+    
+    - One bucket per platform (the app-wide quota)
+    - Optionally one bucket per (platform, account) for per-user quotas
+    - Smoothing mode (default) sets the burst to 1, so posts are spaced
+      evenly at the allowed rate - a batch of due posts is spread across
+      the window instead of burst-then-stall
+    - A 429 from the platform blocks the bucket for its Retry-After
+    
+    Limits are per worker process: with several workers, divide the
+    configured limits between them.
+    """
+    
+    # Conservative defaults: (requests, per seconds)
+    DEFAULT_LIMITS = {
+        Platform.TWITTER: (300, 10800),  # 300 posts per 3 hours
+        Platform.LINKEDIN: (150, 86400),  # 150 shares per day
+        Platform.INSTAGRAM: (50, 86400),  # 50 API-published posts per day
+        Platform.FACEBOOK: (200, 3600),  # 200 calls per hour
+        Platform.TIKTOK: (15, 86400),
+        Platform.PINTEREST: (1000, 3600),
+        Platform.YOUTUBE: (6, 86400),  # Default upload quota
+    }
+    
+    def __init__(self):
+        self.limits = self._parse_limits(PLATFORM_RATE_LIMITS, dict(self.DEFAULT_LIMITS))
+        self.account_limits = self._parse_limits(PLATFORM_ACCOUNT_RATE_LIMITS, {})
+        self.buckets: Dict[Any, TokenBucket] = {}
+    
+    @staticmethod
+    def _parse_limits(spec: str, limits: Dict) -> Dict:
+        """Parse "twitter=300/10800,linkedin=100/86400" over the given defaults"""
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            try:
+                name, limit = item.split("=")
+                rate, per = limit.split("/")
+                limits[Platform(name.strip().lower())] = (int(rate), float(per))
+            except ValueError:
+                logger.warning(f"Ignoring invalid platform rate limit '{item}' (expected platform=requests/seconds)")
+        return limits
+    
+    def _bucket(self, key, limit) -> TokenBucket:
+        if key not in self.buckets:
+            rate, per = limit
+            self.buckets[key] = TokenBucket(rate, per, 1 if PLATFORM_RATE_LIMIT_SMOOTHING else rate)
+        return self.buckets[key]
+    
+    def _buckets_for(self, platform: Platform, account: Optional[str]) -> List[TokenBucket]:
+        buckets = []
+        if account and platform in self.account_limits:
+            buckets.append(self._bucket((platform, account), self.account_limits[platform]))
+        if platform in self.limits:
+            buckets.append(self._bucket(platform, self.limits[platform]))
+        return buckets
+    
+    async def acquire(self, platform: Platform, account: Optional[str] = None) -> float:
+        """Wait until a post to this platform (and account) is allowed"""
+        waited = 0.0
+        for bucket in self._buckets_for(platform, account):
+            waited += await bucket.acquire()
+        return waited
+    
+    def penalize(self, platform: Platform, retry_after: float, account: Optional[str] = None):
+        for bucket in self._buckets_for(platform, account):
+            bucket.penalize(retry_after)
+    
+    def saturated_platforms(self, horizon: float) -> List[str]:
+        """Platforms whose queue will take longer than `horizon` seconds to drain"""
+        return [
+            platform.value for platform in self.limits
+            if platform in self.buckets and self.buckets[platform].backlog_seconds() > horizon
+        ]
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "smoothing": PLATFORM_RATE_LIMIT_SMOOTHING,
+            "buckets": {
+                key.value if isinstance(key, Platform) else f"{key[0].value}:{key[1]}": bucket.get_status()
+                for key, bucket in self.buckets.items()
+            }
+        }
+
+# ============================================
+# PLATFORM ADAPTERS (Core Feature)
+# ============================================
+
+class PlatformRateLimited(Exception):
+    """Raised by an adapter when the platform answers 429 Too Many Requests"""
+    
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limited by platform (retry after {retry_after:g}s)")
+        self.retry_after = retry_after
+
+class PlatformAdapter:
+    """
+    Publishing backend for one platform
+    
+    To add real posting for a platform, subclass this and register it
+    with social_publisher.register_adapter(platform, adapter).
+    
+    - publish() returns {'status': 'published', 'platform_post_id': ...}
+      (or another final status such as 'needs_manual_posting') and raises
+      on failure - PlatformRateLimited for a 429
+    - Adapters that can send several posts in one API call set
+      max_batch_size and override publish_batch()
+    - start()/close() open and close pooled connections
+    
+    Suggested libraries: tweepy (Twitter, OAuth 1.0a), linkedin-api
+    (LinkedIn, OAuth 2.0), instagrapi (Instagram), facebook-sdk (Facebook
+    Graph API), and the TikTok API (requires approval).
+    """
+    
+    name = "base"
+    max_batch_size = 1
+    
+    def __init__(self, platform: Platform):
+        self.platform = platform
+        self.published = 0
+        self.errors = 0
+    
+    async def start(self):
+        pass
+    
+    async def close(self):
+        pass
+    
+    async def publish(self, content: str, account: Optional[str] = None) -> Dict[str, Any]:
+        raise NotImplementedError
+    
+    async def publish_batch(self, contents: List[str], account: Optional[str] = None) -> List[Any]:
+        """Publish several posts; returns a result dict or an exception per post"""
+        return await asyncio.gather(
+            *(self.publish(content, account) for content in contents),
+            return_exceptions=True
+        )
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "adapter": self.name,
+            "max_batch_size": self.max_batch_size,
+            "published": self.published,
+            "errors": self.errors
+        }
+
+class ManualPostingAdapter(PlatformAdapter):
+    """Default adapter: posts are stored for someone to publish by hand"""
+    
+    name = "manual"
+    
+    async def publish(self, content: str, account: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            'status': 'needs_manual_posting',
+            'note': 'Auto-posting not configured. Please add platform API keys.'
+        }
+
+class HTTPPlatformAdapter(PlatformAdapter):
+    """
+    Posts to an HTTP API over one pooled, keep-alive client per platform
+    
+    Used for the local mock platform server (MOCK_PLATFORM_URL) and a
+    starting point for real platform APIs.
+    """
     
-    async def _track_api_usage(
-        self,
-        model: str,
-        tokens: int,
-        cost: float,
-        request_type: str,
-        content_id: Optional[int] = None,
-        success: bool = True,
-        error_message: Optional[str] = None
-    ):
-        """
-        FREE OPTIONAL ENHANCEMENT: Track API usage for cost monitoring
-        """
-        
-        try:
-            async with db_pool.acquire() as conn:
-                await conn.execute('''
-                    INSERT INTO api_usage 
-                    (model, tokens, cost, request_type, content_id, success, error_message)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7)
-                ''', model, tokens, cost, request_type, content_id, success, error_message)
-        except Exception as e:
-            logger.error(f"Failed to track API usage: {e}")
+    name = "mock_server"
     
-    async def _generate_ab_variants(
-        self,
-        request: ContentRequest,
-        original_content_id: int
-    ):
-        """
-        FREE OPTIONAL ENHANCEMENT: Generate A/B test variants
-        
-        Creates 2 additional variants with different approaches:
-        1. Different tone
-        2. Different structure/angle
-        """
+    def __init__(self, platform: Platform, base_url: str, max_connections: int = 20):
+        super().__init__(platform)
+        self.base_url = base_url.rstrip('/')
+        self.max_connections = max_connections
+        self.client = None
+    
+    async def start(self):
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=10,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections
+            )
+        )
+    
+    async def close(self):
+        if self.client:
+            await self.client.aclose()
+    
+    async def publish(self, content: str, account: Optional[str] = None) -> Dict[str, Any]:
+        response = await self.client.post(
+            f"/{self.platform.value}/posts",
+            json={"content": content, "account": account or "default"}
+        )
         
-        try:
-            logger.info(f"Generating A/B test variants for content {original_content_id}")
-            
-            # Get original content
-            async with db_pool.acquire() as conn:
-                original = await conn.fetchrow(
-                    "SELECT * FROM content WHERE id = $1",
-                    original_content_id
-                )
-            
-            if not original:
-                logger.error("Original content not found for A/B testing")
-                return
-            
-            # Define variant strategies
-            variants = []
-            
-            # Variant 1: Different tone
-            if request.tone != ContentTone.ENTHUSIASTIC:
-                variant1_request = request.copy(deep=True)
-                variant1_request.tone = ContentTone.ENTHUSIASTIC
-                variants.append(("tone", variant1_request))
-            
-            # Variant 2: Different approach (if professional, try casual)
-            if request.tone == ContentTone.PROFESSIONAL:
-                variant2_request = request.copy(deep=True)
-                variant2_request.tone = ContentTone.CONVERSATIONAL
-                variants.append(("approach", variant2_request))
-            else:
-                # Otherwise try professional
-                variant2_request = request.copy(deep=True)
-                variant2_request.tone = ContentTone.PROFESSIONAL
-                variants.append(("approach", variant2_request))
-            
-            variant_ids = [original_content_id]
-            
-            # Generate variants
-            for variant_type, variant_request in variants[:2]:  # Max 2 variants
-                try:
-                    # Generate variant content
-                    if variant_request.use_premium and self.anthropic_client:
-                        content = await self._generate_premium_content(variant_request)
-                    else:
-                        content = await self._generate_standard_content(variant_request)
-                    
-                    # Calculate scores
-                    quality_score = self._assess_quality(content, variant_request)
-                    seo_score = self._calculate_seo_score(content, variant_request.keywords)
-                    
-                    # Save variant
-                    async with db_pool.acquire() as conn:
-                        variant_id = await conn.fetchval('''
-                            INSERT INTO content 
-                            (content_type, topic, content, metadata, quality_score, seo_score, status)
-                            VALUES ($1, $2, $3, $4, $5, $6, $7)
-                            RETURNING id
-                        ''', variant_request.content_type.value, variant_request.topic, content,
-                            json.dumps({
-                                "keywords": variant_request.keywords,
-                                "tone": variant_request.tone.value,
-                                "platform": variant_request.platform.value,
-                                "variant_type": variant_type,
-                                "original_id": original_content_id,
-                                "is_variant": True
-                            }),
-                            quality_score, seo_score, 'variant')
-                    
-                    variant_ids.append(variant_id)
-                    logger.info(f"Created variant {variant_id} (type: {variant_type})")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to generate variant {variant_type}: {e}")
-            
-            # Create A/B test record
-            if len(variant_ids) > 1:
-                async with db_pool.acquire() as conn:
-                    await conn.execute('''
-                        INSERT INTO ab_tests (test_name, variant_ids, test_parameter, status)
-                        VALUES ($1, $2, $3, $4)
-                    ''', f"AB Test: {request.topic[:50]}", variant_ids, "tone", "active")
-                
-                logger.info(f"A/B test created with {len(variant_ids)} variants")
+        if response.status_code == 429:
+            raise PlatformRateLimited(float(response.headers.get("Retry-After", "60")))
         
-        except Exception as e:
-            logger.error(f"A/B variant generation failed: {e}")
+        response.raise_for_status()
+        return {'status': 'published', 'platform_post_id': str(response.json().get('id'))}
+
+class SimulatedPlatformAdapter(PlatformAdapter):
+    """
+    In-process mock platform - no network, no credentials
+    
+    Simulates API latency (MOCK_PLATFORM_LATENCY_MS, +/-50% jitter), a
+    random error rate (MOCK_PLATFORM_ERROR_RATE) and optional batching
+    (MOCK_PLATFORM_BATCH_SIZE posts per simulated call). Use it to size
+    the publishing path before wiring real credentials.
+    """
+    
+    name = "simulated"
+    
+    def __init__(self, platform: Platform, latency_ms: float, error_rate: float, max_batch_size: int = 1):
+        super().__init__(platform)
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.max_batch_size = max(1, max_batch_size)
+    
+    async def _simulate_call(self):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms * random.uniform(0.5, 1.5) / 1000)
+    
+    def _result(self) -> Dict[str, Any]:
+        if random.random() < self.error_rate:
+            raise RuntimeError(f"Simulated {self.platform.value} API error")
+        return {
+            'status': 'published',
+            'platform_post_id': f"sim-{self.platform.value}-{random.getrandbits(48):x}"
+        }
+    
+    async def publish(self, content: str, account: Optional[str] = None) -> Dict[str, Any]:
+        await self._simulate_call()
+        return self._result()
+    
+    async def publish_batch(self, contents: List[str], account: Optional[str] = None) -> List[Any]:
+        # One simulated API call for the whole batch; errors are per post
+        await self._simulate_call()
+        results = []
+        for _ in contents:
+            try:
+                results.append(self._result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+def create_platform_adapter(platform: Platform, kind: str) -> PlatformAdapter:
+    """Build the adapter named in PLATFORM_ADAPTER / PLATFORM_ADAPTERS"""
+    if kind == SimulatedPlatformAdapter.name:
+        return SimulatedPlatformAdapter(
+            platform, MOCK_PLATFORM_LATENCY_MS, MOCK_PLATFORM_ERROR_RATE, MOCK_PLATFORM_BATCH_SIZE
+        )
+    if kind == HTTPPlatformAdapter.name:
+        if not MOCK_PLATFORM_URL:
+            raise ValueError("MOCK_PLATFORM_URL is required for the mock_server adapter")
+        return HTTPPlatformAdapter(platform, MOCK_PLATFORM_URL)
+    if kind != ManualPostingAdapter.name:
+        logger.warning(f"Unknown platform adapter '{kind}' for {platform.value}, using manual posting")
+    return ManualPostingAdapter(platform)
 
 # ============================================
 # SOCIAL MEDIA PUBLISHER (Core Feature)
@@ -1724,6 +4290,9 @@ class SocialPublisher:
     Optional: Actual API posting (requires platform API keys)
     """
     
+    def __init__(self):
+        self.adapters: Dict[Platform, PlatformAdapter] = {}
+    
     async def publish(
         self,
         content_id: int,
@@ -1739,16 +4308,14 @@ class SocialPublisher:
         PAID OPTIONAL ENHANCEMENT: Auto-posting (requires API keys)
         """
         
+        platforms = list(dict.fromkeys(platforms))  # Ignore duplicate platforms
         logger.info(f"Publishing content {content_id} to {len(platforms)} platform(s)")
         
-        # Get content from database
+        # Get content text from database (only the column we need)
         async with db_pool.acquire() as conn:
-            content = await conn.fetchrow(
-                "SELECT * FROM content WHERE id = $1",
-                content_id
-            )
+            content_text = await query_registry.fetchval(conn, "get_content_text", content_id)
         
-        if not content:
+        if content_text is None:
             raise HTTPException(404, "Content not found")
         
         # FREE OPTIONAL ENHANCEMENT: Auto-optimize timing
@@ -1758,49 +4325,12 @@ class SocialPublisher:
         
         results = {}
         
+        # Validate content for every platform first - a validation error only
+        # affects its own platform
+        validated = {}
         for platform in platforms:
             try:
-                # Validate content for platform
-                validated_content = self._validate_for_platform(
-                    content['content'],
-                    platform
-                )
-                
-                # Store in database
-                async with db_pool.acquire() as conn:
-                    post_id = await conn.fetchval('''
-                        INSERT INTO social_posts 
-                        (platform, content_id, post_content, status, scheduled_for)
-                        VALUES ($1, $2, $3, $4, $5)
-                        RETURNING id
-                    ''', platform.value, content_id, validated_content,
-                        'scheduled' if schedule_time else 'ready',
-                        schedule_time)
-                
-                results[platform.value] = {
-                    'post_id': post_id,
-                    'status': 'scheduled' if schedule_time else 'ready_to_publish',
-                    'scheduled_for': schedule_time.isoformat() if schedule_time else None,
-                    'content_preview': validated_content[:100] + '...' if len(validated_content) > 100 else validated_content,
-                    'auto_posting': self._is_auto_posting_available(platform)
-                }
-                
-                # PAID OPTIONAL ENHANCEMENT: Auto-post to platform
-                # This requires platform API keys (costs vary by platform)
-                if background_tasks and not schedule_time:
-                    if self._is_auto_posting_available(platform):
-                        # background_tasks.add_task(
-                        #     self._publish_to_platform,
-                        #     post_id,
-                        #     platform,
-                        #     validated_content
-                        # )
-                        results[platform.value]['note'] = "Auto-posting available but not enabled (add API keys)"
-                    else:
-                        results[platform.value]['note'] = "Manual posting required (add API keys for auto-posting)"
-                
-                logger.info(f"Content prepared for {platform.value} (post_id: {post_id})")
-                
+                validated[platform] = self._validate_for_platform(content_text, platform)
             except Exception as e:
                 logger.error(f"Failed to prepare content for {platform.value}: {e}")
                 results[platform.value] = {
@@ -1808,9 +4338,97 @@ class SocialPublisher:
                     'error': str(e)
                 }
         
+        # Immediate posts with an auto-posting adapter are stored as due now:
+        # the dispatcher claims them (dispatch_now below, or its next poll if
+        # that never runs), within its in-flight and per-platform limits
+        auto_platforms = set()
+        if background_tasks and not schedule_time:
+            auto_platforms = {
+                platform for platform in validated
+                if self.get_adapter(platform).name != ManualPostingAdapter.name
+            }
+        now = datetime.utcnow()
+        
+        # Store all posts with one multi-row INSERT - a single statement,
+        # so either every platform's post is stored or none are
+        post_ids = {}
+        if validated:
+            try:
+                async with db_pool.acquire() as conn:
+                    async with conn.transaction():
+                        rows = await query_registry.fetch(
+                            conn, "insert_social_posts",
+                            [platform.value for platform in validated],
+                            content_id,
+                            list(validated.values()),
+                            [
+                                'scheduled' if schedule_time or platform in auto_platforms else 'ready'
+                                for platform in validated
+                            ],
+                            [
+                                schedule_time or (now if platform in auto_platforms else None)
+                                for platform in validated
+                            ]
+                        )
+                        post_ids = {row['platform']: row['id'] for row in rows}
+                        
+                        for platform, validated_content in validated.items():
+                            results[platform.value] = {
+                                'post_id': post_ids[platform.value],
+                                'status': 'scheduled' if schedule_time else 'ready_to_publish',
+                                'scheduled_for': schedule_time.isoformat() if schedule_time else None,
+                                'content_preview': validated_content[:100] + '...' if len(validated_content) > 100 else validated_content,
+                                'auto_posting': self._is_auto_posting_available(platform)
+                            }
+                        
+                        # FREE OPTIONAL ENHANCEMENT: Webhook notification (committed with the posts)
+                        if webhook_system.has_subscribers('content_published') and background_tasks:
+                            await webhook_system.enqueue(
+                                conn,
+                                'content_published',
+                                {
+                                    'content_id': content_id,
+                                    'platforms': [p.value for p in platforms],
+                                    'results': {p.value: results[p.value] for p in platforms}
+                                }
+                            )
+            except Exception as e:
+                logger.error(f"Failed to store posts for content {content_id}: {e}")
+                for platform in validated:
+                    results[platform.value] = {
+                        'status': 'error',
+                        'error': str(e)
+                    }
+                validated = {}
+        
+        auto_post_ids = []
+        for platform, validated_content in validated.items():
+            post_id = post_ids[platform.value]
+            
+            # PAID OPTIONAL ENHANCEMENT: Auto-post to platform
+            # This requires platform API keys (costs vary by platform)
+            if background_tasks and not schedule_time:
+                if platform in auto_platforms:
+                    auto_post_ids.append(post_id)
+                    results[platform.value]['note'] = f"Auto-posting via {self.get_adapter(platform).name} adapter"
+                elif self._is_auto_posting_available(platform):
+                    results[platform.value]['note'] = "Auto-posting available but not enabled (add API keys)"
+                else:
+                    results[platform.value]['note'] = "Manual posting required (add API keys for auto-posting)"
+            
+            logger.info(f"Content prepared for {platform.value} (post_id: {post_id})")
+        
+        # Publish right away rather than at the dispatcher's next poll
+        if auto_post_ids:
+            metrics.add_background_task(background_tasks, post_dispatcher.dispatch_now, auto_post_ids)
+        
+        # Report results in the order the platforms were requested
+        results = {platform.value: results[platform.value] for platform in platforms}
+        
         # FREE OPTIONAL ENHANCEMENT: Track analytics
         if background_tasks:
-            background_tasks.add_task(
+            metrics.add_background_task(
+                background_tasks,
                 analytics.track_event,
                 'content_published',
                 {
@@ -1820,19 +4438,6 @@ class SocialPublisher:
                 }
             )
         
-        # FREE OPTIONAL ENHANCEMENT: Webhook notification
-        if WEBHOOK_CONTENT_PUBLISHED and background_tasks:
-            background_tasks.add_task(
-                webhook_system.trigger_webhook,
-                'content_published',
-                {
-                    'content_id': content_id,
-                    'platforms': [p.value for p in platforms],
-                    'results': results
-                },
-                WEBHOOK_CONTENT_PUBLISHED
-            )
-        
         return {
             'content_id': content_id,
             'total_platforms': len(platforms),
@@ -1912,6 +4517,9 @@ class SocialPublisher:
         PAID OPTIONAL ENHANCEMENT: Requires platform API keys
         """
         
+        if self.get_adapter(platform).name != ManualPostingAdapter.name:
+            return True
+        
         availability = {
             Platform.TWITTER: bool(TWITTER_API_KEY and TWITTER_ACCESS_TOKEN),
             Platform.LINKEDIN: bool(LINKEDIN_CLIENT_ID and LINKEDIN_CLIENT_SECRET),
@@ -1920,77 +4528,337 @@ class SocialPublisher:
         
         return availability.get(platform, False)
     
-    async def _publish_to_platform(
+    async def initialize(self):
+        """Create and start the publishing adapter for every platform"""
+        overrides = {}
+        for item in filter(None, (part.strip() for part in PLATFORM_ADAPTERS.split(","))):
+            try:
+                name, kind = item.split("=")
+                overrides[Platform(name.strip().lower())] = kind.strip().lower()
+            except ValueError:
+                logger.warning(f"Ignoring invalid platform adapter '{item}' (expected platform=adapter)")
+        
+        for platform in Platform:
+            if platform not in self.adapters:
+                kind = overrides.get(platform, PLATFORM_ADAPTER)
+                self.adapters[platform] = create_platform_adapter(platform, kind)
+            await self.adapters[platform].start()
+        
+        active = sorted({adapter.name for adapter in self.adapters.values()})
+        logger.info(f" Publishing adapters: {', '.join(active)}")
+    
+    async def close(self):
+        for adapter in self.adapters.values():
+            await adapter.close()
+    
+    def register_adapter(self, platform: Platform, adapter: PlatformAdapter):
+        """Use a custom adapter for a platform (call before startup)"""
+        self.adapters[platform] = adapter
+    
+    def get_adapter(self, platform: Platform) -> PlatformAdapter:
+        if platform not in self.adapters:
+            self.adapters[platform] = ManualPostingAdapter(platform)
+        return self.adapters[platform]
+    
+    async def publish_posts(
         self,
-        post_id: int,
         platform: Platform,
-        content: str
-    ):
+        posts: List[tuple],
+        account: Optional[str] = None
+    ) -> Dict[str, int]:
         """
-        PAID OPTIONAL ENHANCEMENT: Actually post to social media
+        PAID OPTIONAL ENHANCEMENT: Publish (post_id, content) pairs to one platform
         
-        This is a placeholder for actual platform posting.
-        Implementation requires platform-specific API keys and SDKs.
+        Posting goes through the platform's adapter (see PlatformAdapter).
+        Without one, posts are marked needs_manual_posting.
         
-        Cost: Varies by platform (most are free, some have limits)
+        Posts are sent in batches of the adapter's max_batch_size, each post
+        waiting for a rate limit token. Results for a batch are written in
+        one statement. Returns a count per final status.
+        """
         
-        SUGGESTIONS for implementation:
-        - Twitter: Use tweepy library with TWITTER_API_KEY
-        - LinkedIn: Use linkedin-api library with LINKEDIN_CLIENT_ID
-        - Instagram: Use instagrapi (requires username/password)
-        - Facebook: Use facebook-sdk with Facebook Graph API
-        - TikTok: Use TikTok API (requires approval)
+        adapter = self.get_adapter(platform)
+        counts = defaultdict(int)
         
-        Each platform has different authentication requirements:
-        - Twitter: OAuth 1.0a (API key + secret + access token)
-        - LinkedIn: OAuth 2.0 (client ID + secret)
-        - Instagram: Username/password or Business API
-        - Facebook: Graph API (access token)
-        """
+        for start in range(0, len(posts), adapter.max_batch_size):
+            batch = posts[start:start + adapter.max_batch_size]
+            post_ids = [post_id for post_id, _ in batch]
+            
+            # Stay inside the platform's API quota (waits for a token per post)
+            waited = 0.0
+            for _ in batch:
+                waited += await rate_limiter.acquire(platform, account)
+            if waited >= 1:
+                logger.info(f"Rate limit: waited {waited:.1f}s for {platform.value} slot(s) (post_ids: {post_ids})")
+            
+            logger.info(f"Auto-posting to {platform.value} via {adapter.name} adapter (post_ids: {post_ids})")
+            
+            try:
+                async with background_db_pool.acquire("publish_to_platform") as conn:
+                    await query_registry.execute(
+                        conn, "mark_posts_publishing", post_ids, datetime.utcnow(), post_dispatcher.worker_id
+                    )
+                
+                with tracer.span(f"publish {platform.value}", "client", {
+                    "splants.platform": platform.value,
+                    "splants.adapter": adapter.name,
+                    "splants.posts": len(batch),
+                    "splants.rate_limit_wait_seconds": round(waited, 3)
+                }):
+                    if len(batch) == 1:
+                        try:
+                            outcomes = [await adapter.publish(batch[0][1], account)]
+                        except Exception as e:
+                            outcomes = [e]
+                    else:
+                        outcomes = await adapter.publish_batch([content for _, content in batch], account)
+                
+                await self._record_outcomes(platform, post_ids, outcomes, account, counts)
+                
+            except Exception as e:
+                logger.error(f"Failed to publish posts {post_ids}: {e}")
+                await self._record_outcomes(platform, post_ids, [e] * len(post_ids), account, counts)
+        
+        return dict(counts)
+    
+    async def _record_outcomes(
+        self,
+        platform: Platform,
+        post_ids: List[int],
+        outcomes: List[Any],
+        account: Optional[str],
+        counts: Dict[str, int]
+    ):
+        """Store adapter results; rate-limited posts go back on the schedule"""
         
-        logger.info(f"Auto-posting to {platform.value} (post_id: {post_id})")
+        adapter = self.get_adapter(platform)
+        ids, statuses, platform_post_ids, metadata = [], [], [], []
+        rescheduled, retry_after = [], 0.0
         
-        # Update database status
-        try:
-            async with db_pool.acquire() as conn:
-                await conn.execute('''
-                    UPDATE social_posts
-                    SET status = $1, published_at = $2
-                    WHERE id = $3
-                ''', 'publishing', datetime.utcnow(), post_id)
-            
-            # TODO: Implement actual platform posting
-            # Example structure:
-            # if platform == Platform.TWITTER:
-            #     await self._post_to_twitter(content)
-            # elif platform == Platform.LINKEDIN:
-            #     await self._post_to_linkedin(content)
-            # etc.
-            
-            # For now, mark as needs_manual_posting
-            async with db_pool.acquire() as conn:
-                await conn.execute('''
-                    UPDATE social_posts
-                    SET status = $1, metadata = $2
-                    WHERE id = $3
-                ''', 'needs_manual_posting',
-                    json.dumps({'note': 'Auto-posting not configured. Please add platform API keys.'}),
-                    post_id)
+        for post_id, outcome in zip(post_ids, outcomes):
+            if isinstance(outcome, PlatformRateLimited):
+                rescheduled.append(post_id)
+                retry_after = max(retry_after, outcome.retry_after)
+                continue
             
-            logger.info(f"Post {post_id} marked for manual publishing")
+            ids.append(post_id)
+            if isinstance(outcome, Exception):
+                adapter.errors += 1
+                logger.error(f"Failed to publish post {post_id}: {outcome}")
+                statuses.append('failed')
+                platform_post_ids.append(None)
+                metadata.append(json.dumps({'error': str(outcome)}))
+            else:
+                outcome = dict(outcome)
+                status = outcome.pop('status', 'published')
+                if status == 'published':
+                    adapter.published += 1
+                statuses.append(status)
+                platform_post_ids.append(outcome.pop('platform_post_id', None))
+                metadata.append(json.dumps(outcome))
+        
+        for status in statuses:
+            counts[status] += 1
+        
+        async with background_db_pool.acquire("publish_to_platform") as conn:
+            if ids:
+                await query_registry.execute(
+                    conn, "record_post_results", ids, statuses, platform_post_ids, metadata
+                )
             
-        except Exception as e:
-            logger.error(f"Failed to publish post {post_id}: {e}")
+            if rescheduled:
+                rate_limiter.penalize(platform, retry_after, account)
+                await query_registry.execute(
+                    conn, "reschedule_posts", datetime.utcnow() + timedelta(seconds=retry_after), rescheduled
+                )
+                counts['rescheduled'] += len(rescheduled)
+                logger.warning(f"{platform.value} rate limited posts {rescheduled}; retrying in {retry_after:g}s")
+        
+        if ids:
+            logger.info(f"Posts {ids} on {platform.value}: {', '.join(sorted(set(statuses)))}")
+
+# ============================================
+# SCHEDULED POST DISPATCHER (Core Feature)
+# ============================================
+
+class ScheduledPostDispatcher:
+    """
+    Publishes scheduled posts when they come due
+    
+    Every worker runs a dispatcher. Workers claim due posts in small batches
+    with FOR UPDATE SKIP LOCKED, so they share the work without ever claiming
+    the same post twice. Each batch is capped by free capacity (at most
+    SCHEDULER_MAX_IN_FLIGHT posts in flight per worker), and each platform
+    gets at most SCHEDULER_PLATFORM_CONCURRENCY concurrent publishes. A
+    top-of-hour slot with thousands of due posts drains steadily across
+    workers instead of flooding platforms.
+    
+    Immediate auto-posts are stored as scheduled for their creation time and
+    claimed by id right after the response (dispatch_now), up to the free
+    capacity. Anything dispatch_now doesn't claim - over capacity, or its
+    background task never ran - is due, and the next poll picks it up.
+    Claimed posts move to status 'publishing'. If a worker dies
+    mid-publish, its claims are returned to 'scheduled' after
+    SCHEDULER_CLAIM_TIMEOUT.
+    """
+    
+    def __init__(self):
+        # Per-boot suffix: a restarted container reuses its hostname and usually PID 1,
+        # and must not renew (and so keep orphaned) the claims of the process it replaced
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.in_flight = 0
+        self.claimed = 0
+        self.dispatched = 0
+        self.failed = 0
+        self.reclaimed = 0
+        self.last_poll = None
+        self._platform_limits = defaultdict(lambda: asyncio.Semaphore(SCHEDULER_PLATFORM_CONCURRENCY))
+        self._tasks = set()
+        self._loop_task = None
+        self._last_reclaim = 0.0
+        self._last_renew = time.monotonic()
+    
+    async def start(self):
+        if not SCHEDULER_ENABLED:
+            logger.info(" Scheduled post dispatcher disabled (SCHEDULER_ENABLED=false)")
+            return
+        
+        self._loop_task = asyncio.create_task(self._run())
+        logger.info(f" Scheduled post dispatcher started (worker {self.worker_id})")
+    
+    async def stop(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+        
+        # Let in-flight publishes finish; anything left is reclaimed later
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=10)
+    
+    async def _run(self):
+        # Spread the first poll so workers booted together don't poll in lockstep
+        await asyncio.sleep(random.uniform(0, SCHEDULER_POLL_INTERVAL))
+        
+        while True:
+            claimed = 0
+            try:
+                await self._renew_claims()
+                await self._reclaim_stale()
+                claimed = await self.dispatch_due()
+            except Exception as e:
+                logger.error(f"Scheduled post dispatch failed: {e}")
             
-            # Update status to failed
-            async with db_pool.acquire() as conn:
-                await conn.execute('''
-                    UPDATE social_posts
-                    SET status = $1, metadata = $2
-                    WHERE id = $3
-                ''', 'failed',
-                    json.dumps({'error': str(e)}),
-                    post_id)
+            # A full batch means more posts are probably due - go again right away
+            if claimed and claimed >= SCHEDULER_BATCH_SIZE:
+                await asyncio.sleep(0)
+            else:
+                await asyncio.sleep(SCHEDULER_POLL_INTERVAL * random.uniform(0.8, 1.2))
+    
+    async def dispatch_due(self) -> int:
+        """Claim a batch of due posts and start publishing them; returns the number claimed"""
+        self.last_poll = datetime.utcnow()
+        
+        capacity = min(SCHEDULER_BATCH_SIZE, SCHEDULER_MAX_IN_FLIGHT - self.in_flight)
+        if capacity <= 0:
+            return 0
+        
+        # Leave posts for rate-limited platforms in the table (for this or
+        # another worker to claim later) rather than queueing them here
+        saturated = rate_limiter.saturated_platforms(SCHEDULER_POLL_INTERVAL)
+        
+        async with background_db_pool.acquire("scheduler_claim") as conn:
+            posts = await query_registry.fetch(
+                conn, "claim_due_posts", capacity, self.worker_id, datetime.utcnow(), saturated
+            )
+        
+        self._start(posts)
+        if posts:
+            self.claimed += len(posts)
+            logger.info(f"Claimed {len(posts)} due post(s) for publishing")
+        
+        return len(posts)
+    
+    async def dispatch_now(self, post_ids: List[int]) -> int:
+        """Claim due posts by id and start publishing them, up to free capacity; returns the number claimed"""
+        capacity = SCHEDULER_MAX_IN_FLIGHT - self.in_flight
+        if capacity <= 0:
+            return 0  # Left for the polling loop
+        
+        async with background_db_pool.acquire("scheduler_claim") as conn:
+            posts = await query_registry.fetch(
+                conn, "claim_posts_by_id", post_ids[:capacity], self.worker_id, datetime.utcnow()
+            )
+        
+        self._start(posts)
+        self.claimed += len(posts)
+        return len(posts)
+    
+    def _start(self, posts: List[Any]):
+        """Start one task per adapter-sized batch of claimed posts for the same platform"""
+        by_platform = defaultdict(list)
+        for post in posts:
+            by_platform[Platform(post['platform'])].append((post['id'], post['post_content']))
+        
+        for platform, platform_posts in by_platform.items():
+            batch_size = social_publisher.get_adapter(platform).max_batch_size
+            for start in range(0, len(platform_posts), batch_size):
+                batch = platform_posts[start:start + batch_size]
+                self.in_flight += len(batch)
+                task = asyncio.create_task(self._dispatch(platform, batch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+    
+    async def _dispatch(self, platform: Platform, posts: List[tuple]):
+        try:
+            async with self._platform_limits[platform]:
+                counts = await social_publisher.publish_posts(platform, posts)
+            self.dispatched += len(posts) - counts.get('failed', 0) - counts.get('rescheduled', 0)
+            self.failed += counts.get('failed', 0)
+        except Exception as e:
+            self.failed += len(posts)
+            logger.error(f"Failed to dispatch scheduled posts {[post_id for post_id, _ in posts]}: {e}")
+        finally:
+            self.in_flight -= len(posts)
+    
+    async def _renew_claims(self):
+        """
+        Keep claims alive while posts wait for a rate limit slot
+        
+        Without this a post queued behind a slow platform quota would look
+        abandoned after SCHEDULER_CLAIM_TIMEOUT and be published twice.
+        """
+        if not self.in_flight or time.monotonic() - self._last_renew < SCHEDULER_CLAIM_TIMEOUT / 3:
+            return
+        self._last_renew = time.monotonic()
+        
+        async with background_db_pool.acquire("scheduler_renew") as conn:
+            await query_registry.execute(conn, "renew_claims", self.worker_id, datetime.utcnow())
+    
+    async def _reclaim_stale(self):
+        """Return posts claimed by a crashed worker to the schedule (at most once a minute)"""
+        if time.monotonic() - self._last_reclaim < 60:
+            return
+        self._last_reclaim = time.monotonic()
+        
+        cutoff = datetime.utcnow() - timedelta(seconds=SCHEDULER_CLAIM_TIMEOUT)
+        async with background_db_pool.acquire("scheduler_reclaim") as conn:
+            status = await query_registry.execute(conn, "reclaim_stale_posts", cutoff)
+        
+        reclaimed = int(status.split()[-1])
+        if reclaimed:
+            self.reclaimed += reclaimed
+            logger.warning(f"Returned {reclaimed} stale claimed post(s) to the schedule")
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "enabled": SCHEDULER_ENABLED,
+            "worker_id": self.worker_id,
+            "in_flight": self.in_flight,
+            "claimed": self.claimed,
+            "dispatched": self.dispatched,
+            "failed": self.failed,
+            "reclaimed": self.reclaimed,
+            "last_poll": self.last_poll.isoformat() if self.last_poll else None
+        }
 
 # ============================================
 # FREE OPTIONAL ENHANCEMENT: Analytics Dashboard
@@ -2019,80 +4887,24 @@ class AnalyticsDashboard:
         Returns all key metrics for the specified time period
         """
         
-        async with db_pool.acquire() as conn:
+        async with read_replica.acquire() as conn:
             # Content generation metrics
-            content_metrics = await conn.fetchrow('''
-                SELECT 
-                    COUNT(*) as total_generated,
-                    AVG(quality_score) as avg_quality,
-                    AVG(seo_score) as avg_seo,
-                    COUNT(DISTINCT DATE(created_at)) as active_days,
-                    COUNT(CASE WHEN quality_score > 0.8 THEN 1 END) as high_quality_count,
-                    COUNT(CASE WHEN metadata->>'is_variant' = 'true' THEN 1 END) as variant_count
-                FROM content
-                WHERE created_at > NOW() - INTERVAL '%s days'
-                  AND status != 'variant'
-            ''' % days)
+            content_metrics = await query_registry.fetchrow(conn, "dashboard_content_metrics", days)
             
             # Content type distribution
-            content_types = await conn.fetch('''
-                SELECT 
-                    content_type,
-                    COUNT(*) as count,
-                    AVG(quality_score) as avg_quality
-                FROM content
-                WHERE created_at > NOW() - INTERVAL '%s days'
-                  AND status != 'variant'
-                GROUP BY content_type
-                ORDER BY count DESC
-            ''' % days)
+            content_types = await query_registry.fetch(conn, "dashboard_content_types", days)
             
             # Platform distribution
-            platform_dist = await conn.fetch('''
-                SELECT 
-                    metadata->>'platform' as platform,
-                    COUNT(*) as count,
-                    AVG(quality_score) as avg_quality
-                FROM content
-                WHERE created_at > NOW() - INTERVAL '%s days'
-                  AND metadata->>'platform' IS NOT NULL
-                  AND status != 'variant'
-                GROUP BY metadata->>'platform'
-                ORDER BY count DESC
-            ''' % days)
+            platform_dist = await query_registry.fetch(conn, "dashboard_platforms", days)
             
             # Cost tracking
-            cost_metrics = await conn.fetchrow('''
-                SELECT 
-                    SUM(cost) as total_cost,
-                    AVG(cost) as avg_cost_per_request,
-                    COUNT(*) as total_requests,
-                    COUNT(CASE WHEN success = true THEN 1 END) as successful_requests,
-                    SUM(CASE WHEN model = 'multi-model' THEN cost END) as premium_cost
-                FROM api_usage
-                WHERE created_at > NOW() - INTERVAL '%s days'
-            ''' % days)
+            cost_metrics = await query_registry.fetchrow(conn, "dashboard_cost_metrics", days)
             
             # Publishing metrics
-            publish_metrics = await conn.fetchrow('''
-                SELECT 
-                    COUNT(*) as total_posts,
-                    COUNT(DISTINCT platform) as platforms_used,
-                    COUNT(CASE WHEN status = 'published' THEN 1 END) as published_count,
-                    COUNT(CASE WHEN status = 'scheduled' THEN 1 END) as scheduled_count
-                FROM social_posts
-                WHERE created_at > NOW() - INTERVAL '%s days'
-            ''' % days)
+            publish_metrics = await query_registry.fetchrow(conn, "dashboard_publish_metrics", days)
             
             # A/B test metrics
-            ab_test_metrics = await conn.fetchrow('''
-                SELECT 
-                    COUNT(*) as total_tests,
-                    COUNT(CASE WHEN status = 'active' THEN 1 END) as active_tests,
-                    COUNT(CASE WHEN winner_id IS NOT NULL THEN 1 END) as completed_tests
-                FROM ab_tests
-                WHERE created_at > NOW() - INTERVAL '%s days'
-            ''' % days)
+            ab_test_metrics = await query_registry.fetchrow(conn, "dashboard_ab_test_metrics", days)
         
         # Calculate derived metrics
         total_cost = float(cost_metrics['total_cost'] or 0)
@@ -2107,13 +4919,8 @@ class AnalyticsDashboard:
             'needs_improvement': 0
         }
         
-        async with db_pool.acquire() as conn:
-            quality_data = await conn.fetch('''
-                SELECT quality_score
-                FROM content
-                WHERE created_at > NOW() - INTERVAL '%s days'
-                  AND status != 'variant'
-            ''' % days)
+        async with read_replica.acquire() as conn:
+            quality_data = await query_registry.fetch(conn, "dashboard_quality_scores", days)
             
             for row in quality_data:
                 score = row['quality_score']
@@ -2217,21 +5024,9 @@ class AnalyticsDashboard:
     async def _calculate_trends(self, days: int) -> Dict[str, Any]:
         """Calculate trends over time"""
         
-        async with db_pool.acquire() as conn:
+        async with read_replica.acquire() as conn:
             # Get weekly trends
-            weekly_data = await conn.fetch('''
-                SELECT 
-                    DATE_TRUNC('week', created_at) as week,
-                    COUNT(*) as count,
-                    AVG(quality_score) as avg_quality,
-                    AVG(seo_score) as avg_seo
-                FROM content
-                WHERE created_at > NOW() - INTERVAL '%s days'
-                  AND status != 'variant'
-                GROUP BY DATE_TRUNC('week', created_at)
-                ORDER BY week DESC
-                LIMIT 4
-            ''' % days)
+            weekly_data = await query_registry.fetch(conn, "dashboard_weekly_trends", days)
         
         trends = {
             'weekly': [
@@ -2271,11 +5066,11 @@ class AnalyticsDashboard:
         """
         
         try:
-            async with db_pool.acquire() as conn:
-                await conn.execute('''
-                    INSERT INTO analytics_events (event_type, event_data, user_id, session_id)
-                    VALUES ($1, $2, $3, $4)
-                ''', event_type, json.dumps(event_data), user_id, session_id)
+            async with background_db_pool.acquire("track_event") as conn:
+                await query_registry.execute(
+                    conn, "insert_analytics_event",
+                    event_type, json.dumps(event_data), user_id, session_id
+                )
         except Exception as e:
             logger.error(f"Failed to track event {event_type}: {e}")
 
@@ -2322,12 +5117,7 @@ class CostController:
         
         async with db_pool.acquire() as conn:
             # Get current month's spending
-            result = await conn.fetchrow('''
-                SELECT SUM(cost) as month_cost
-                FROM api_usage
-                WHERE created_at >= date_trunc('month', CURRENT_DATE)
-                  AND success = true
-            ''')
+            result = await query_registry.fetchrow(conn, "month_cost")
             
             current_cost = float(result['month_cost'] or 0)
             
@@ -2340,12 +5130,7 @@ class CostController:
                 return False
             
             # Check daily limit
-            daily_result = await conn.fetchrow('''
-                SELECT SUM(cost) as today_cost
-                FROM api_usage
-                WHERE created_at >= CURRENT_DATE
-                  AND success = true
-            ''')
+            daily_result = await query_registry.fetchrow(conn, "today_cost")
             
             today_cost = float(daily_result['today_cost'] or 0)
             
@@ -2358,11 +5143,7 @@ class CostController:
             
             # Check daily API call limit
             if self.daily_api_limit > 0:
-                api_count_result = await conn.fetchrow('''
-                    SELECT COUNT(*) as today_count
-                    FROM api_usage
-                    WHERE created_at >= CURRENT_DATE
-                ''')
+                api_count_result = await query_registry.fetchrow(conn, "today_api_count")
                 
                 today_count = int(api_count_result['today_count'] or 0)
                 
@@ -2377,13 +5158,8 @@ class CostController:
     async def get_month_cost(self) -> float:
         """Get current month's total cost"""
         
-        async with db_pool.acquire() as conn:
-            result = await conn.fetchrow('''
-                SELECT SUM(cost) as month_cost
-                FROM api_usage
-                WHERE created_at >= date_trunc('month', CURRENT_DATE)
-                  AND success = true
-            ''')
+        async with read_replica.acquire() as conn:
+            result = await query_registry.fetchrow(conn, "month_cost")
             
             return float(result['month_cost'] or 0)
     
@@ -2394,41 +5170,15 @@ class CostController:
         Includes projections and alerts
         """
         
-        async with db_pool.acquire() as conn:
+        async with read_replica.acquire() as conn:
             # Monthly usage
-            monthly = await conn.fetchrow('''
-                SELECT 
-                    COUNT(*) as requests,
-                    SUM(cost) as total_cost,
-                    AVG(cost) as avg_cost,
-                    SUM(CASE WHEN model = 'multi-model' THEN cost END) as premium_cost
-                FROM api_usage
-                WHERE created_at >= date_trunc('month', CURRENT_DATE)
-                  AND success = true
-            ''')
+            monthly = await query_registry.fetchrow(conn, "monthly_usage")
             
             # Daily usage
-            daily = await conn.fetchrow('''
-                SELECT 
-                    COUNT(*) as requests,
-                    SUM(cost) as total_cost
-                FROM api_usage
-                WHERE created_at >= CURRENT_DATE
-                  AND success = true
-            ''')
+            daily = await query_registry.fetchrow(conn, "daily_usage")
             
             # Weekly trend
-            weekly_trend = await conn.fetch('''
-                SELECT 
-                    DATE(created_at) as date,
-                    SUM(cost) as daily_cost,
-                    COUNT(*) as daily_requests
-                FROM api_usage
-                WHERE created_at >= CURRENT_DATE - INTERVAL '7 days'
-                  AND success = true
-                GROUP BY DATE(created_at)
-                ORDER BY date DESC
-            ''')
+            weekly_trend = await query_registry.fetch(conn, "weekly_cost_trend")
         
         month_cost = float(monthly['total_cost'] or 0)
         today_cost = float(daily['total_cost'] or 0)
@@ -2774,80 +5524,666 @@ class WebhookSystem:
     - IFTTT (if-this-then-that)
     - Custom integrations
     
+    Delivery uses a transactional outbox: events are written to
+    webhook_outbox in the same transaction as the write that caused them,
+    and a dispatcher in every worker delivers them. Nothing is lost on
+    restart, request handlers never wait on a slow endpoint, and failed
+    deliveries are retried with exponential backoff (next_attempt_at)
+    until WEBHOOK_MAX_ATTEMPTS, then dead-lettered.
+    
+    Batched endpoints (WEBHOOK_BATCH_URLS) get one request with a JSON
+    array of events per window (WEBHOOK_BATCH_WINDOW_SECONDS), or sooner
+    once WEBHOOK_BATCH_MAX_SIZE events are waiting.
+    
     Cost: Free (you just need webhook URLs)
     """
     
-    async def trigger_webhook(
+    COMPACTION_LOCK_ID = 7_265_002  # Advisory lock for log compaction
+    
+    def __init__(self):
+        self.in_flight = 0
+        self.delivered = 0
+        self.failed_attempts = 0
+        self.dead_lettered = 0
+        self.last_poll = None
+        self.client = None
+        self._endpoint_limits = defaultdict(lambda: asyncio.Semaphore(WEBHOOK_ENDPOINT_CONCURRENCY))
+        self._endpoint_waiting = defaultdict(int)
+        self.routes: Dict[str, List[str]] = {}
+        self.batch_urls = set()
+        self.routes_loaded_at = None
+        self._listen_conn = None
+        self._batch_pending = defaultdict(int)
+        self._flush_urls = set()
+        self._wakeup = asyncio.Event()
+        self._routes_lock = asyncio.Lock()
+        self._tasks = set()
+        self._loop_task = None
+        self._last_housekeeping = 0.0
+        self._last_compaction = 0.0
+        self._compaction_task = None
+    
+    async def start(self):
+        """Start the outbox dispatcher (one pooled HTTP client for all deliveries)"""
+        self.client = httpx.AsyncClient(
+            timeout=WEBHOOK_TIMEOUT,
+            headers={
+                "Content-Type": "application/json",
+                "User-Agent": "SPLANTS-Marketing-Engine/2.1"
+            }
+        )
+        await self.load_routes()
+        await self._listen_for_changes()
+        
+        self._loop_task = asyncio.create_task(self._run())
+        logger.info(" Webhook outbox dispatcher started")
+    
+    async def stop(self):
+        if self._loop_task:
+            self._loop_task.cancel()
+        
+        # Compaction commits each batch, so it can stop anywhere
+        if self._compaction_task:
+            self._compaction_task.cancel()
+        
+        # Let in-flight deliveries finish; anything left is retried after restart
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=10)
+        
+        if self.client:
+            await self.client.aclose()
+        
+        if self._listen_conn:
+            await self._listen_conn.close()
+    
+    async def enqueue(
         self,
+        conn,
         event_type: str,
         data: Dict[str, Any],
-        webhook_url: str,
-        retry_count: int = 0
+        webhook_url: Optional[str] = None
     ):
         """
-        Trigger a webhook with event data
+        Add a webhook to the outbox for every subscriber of the event
         
-        Includes automatic retry logic for failed deliveries
+        Call inside the transaction that makes the triggering write, so the
+        event is stored if and only if that write commits. Subscribers come
+        from the in-memory routing table - no lookup query per event. Pass
+        webhook_url to send to one specific URL instead.
         """
         
-        if not webhook_url:
+        urls = [webhook_url] if webhook_url else self.routes.get(event_type, [])
+        if not urls:
             return
         
+        now = datetime.utcnow()
         payload = {
             "event": event_type,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": now.isoformat(),
             "data": data
         }
         
+        # Batched endpoints: events in the same window share a due time, so
+        # they are claimed and sent together
+        dues = []
+        for url in urls:
+            due = now
+            if url in self.batch_urls and WEBHOOK_BATCH_WINDOW_SECONDS > 0:
+                midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+                elapsed = (now - midnight).total_seconds()
+                due = midnight + timedelta(seconds=(elapsed // WEBHOOK_BATCH_WINDOW_SECONDS + 1) * WEBHOOK_BATCH_WINDOW_SECONDS)
+                
+                # A full batch is sent without waiting for the window to close
+                self._batch_pending[url] += 1
+                if self._batch_pending[url] >= WEBHOOK_BATCH_MAX_SIZE:
+                    self._flush_urls.add(url)
+            dues.append(due)
+        
+        # One row per subscriber, in a single statement
+        await query_registry.execute(
+            conn, "insert_webhook_outbox", event_type, urls, json.dumps(payload, default=str), now, dues
+        )
+        
+        # Wake the dispatchers once the rows are visible - NOTIFY is held until commit
+        if now in dues or self._flush_urls:
+            await query_registry.execute(conn, "notify_webhook_outbox")
+    
+    async def trigger_webhook(
+        self,
+        event_type: str,
+        data: Dict[str, Any],
+        webhook_url: Optional[str] = None
+    ):
+        """
+        Queue a webhook that isn't tied to a database write
+        
+        Delivery and retries happen in the outbox dispatcher.
+        """
+        
+        if not webhook_url and not self.has_subscribers(event_type):
+            return
+        
+        async with background_db_pool.acquire("webhook_enqueue") as conn:
+            await self.enqueue(conn, event_type, data, webhook_url)
+    
+    def has_subscribers(self, event_type: str) -> bool:
+        return bool(self.routes.get(event_type))
+    
+    async def load_routes(self):
+        """
+        Rebuild the routing table (event type -> webhook URLs)
+        
+        Sources: active rows in the webhooks table plus the WEBHOOK_*_URL
+        environment variables. The new table replaces the old one in a
+        single assignment, so enqueue() never sees a half-built table.
+        Reloads are serialized, so a slow reload can't overwrite a newer one.
+        """
+        
+        async with self._routes_lock:
+            await self._load_routes()
+    
+    async def _load_routes(self):
+        routes = defaultdict(list)
+        batch_urls = {url.strip() for url in WEBHOOK_BATCH_URLS.split(",") if url.strip()}
+        
+        for event_type, url in (
+            ('content_generated', WEBHOOK_CONTENT_GENERATED),
+            ('content_published', WEBHOOK_CONTENT_PUBLISHED),
+            ('daily_report', WEBHOOK_DAILY_REPORT)
+        ):
+            if url:
+                routes[event_type].append(url)
+        
+        async with db_pool.acquire("webhook_routes") as conn:
+            rows = await query_registry.fetch(conn, "active_webhooks")
+        
+        for row in rows:
+            if row['url'] not in routes[row['event_type']]:
+                routes[row['event_type']].append(row['url'])
+            if row['batch_mode']:
+                batch_urls.add(row['url'])
+        
+        self.routes, self.batch_urls = dict(routes), batch_urls
+        self.routes_loaded_at = datetime.utcnow()
+        logger.info(f"Webhook routes loaded: {sum(len(urls) for urls in self.routes.values())} subscription(s)")
+    
+    async def _listen_for_changes(self):
+        """
+        Reload the routing table whenever the webhooks table changes, and
+        deliver as soon as due events are committed
+        
+        A trigger on webhooks sends NOTIFY webhooks_changed; enqueue() sends
+        NOTIFY webhook_outbox. LISTEN needs a connection of its own, outside
+        the pools. If it drops, the periodic refresh in _housekeeping() keeps
+        routes from going stale and new events wait for the next poll.
+        """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    webhook_url,
-                    json=payload,
-                    timeout=10,
-                    headers={
-                        "Content-Type": "application/json",
-                        "User-Agent": "SPLANTS-Marketing-Engine/2.1"
-                    }
-                )
+            self._listen_conn = await asyncpg.connect(DATABASE_URL)
+            await self._listen_conn.add_listener('webhooks_changed', self._on_webhooks_changed)
+            await self._listen_conn.add_listener('webhook_outbox', self._on_outbox_ready)
+        except Exception as e:
+            self._listen_conn = None
+            logger.warning(f"Webhook change notifications unavailable ({e}); routes refresh every {WEBHOOK_ROUTES_REFRESH_SECONDS:g}s")
+    
+    def _on_webhooks_changed(self, connection, pid, channel, payload):
+        task = asyncio.create_task(self.load_routes())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    def _on_outbox_ready(self, connection, pid, channel, payload):
+        self._wakeup.set()
+    
+    async def _run(self):
+        while True:
+            claimed = 0
+            try:
+                await self._housekeeping()
+                claimed = await self.deliver_due()
+            except Exception as e:
+                logger.error(f"Webhook dispatch failed: {e}")
+            
+            # A full batch means more are probably due - go again right away
+            if claimed >= WEBHOOK_CLAIM_BATCH_SIZE:
+                await asyncio.sleep(0)
+                continue
+            
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=WEBHOOK_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def deliver_due(self) -> int:
+        """Claim due outbox rows and start delivering them; returns the number claimed"""
+        self.last_poll = datetime.utcnow()
+        
+        capacity = min(WEBHOOK_CLAIM_BATCH_SIZE, WEBHOOK_MAX_IN_FLIGHT - self.in_flight)
+        if capacity <= 0:
+            return 0
+        
+        # Leave rows for endpoints that are already at their concurrency cap
+        busy = [url for url, waiting in self._endpoint_waiting.items() if waiting >= WEBHOOK_ENDPOINT_CONCURRENCY]
+        now = datetime.utcnow()
+        
+        async with background_db_pool.acquire("webhook_claim") as conn:
+            rows = list(await query_registry.fetch(conn, "claim_webhook_outbox", capacity, now, busy))
+            
+            # Full batches go out before their window closes
+            for url in list(self._flush_urls):
+                self._flush_urls.discard(url)
+                rows.extend(await query_registry.fetch(
+                    conn, "claim_webhook_batch", url, WEBHOOK_BATCH_MAX_SIZE, now
+                ))
+        
+        # One delivery per event, or per batch for batched endpoints
+        deliveries = []
+        batched = defaultdict(list)
+        for row in rows:
+            if row['webhook_url'] in self.batch_urls:
+                batched[row['webhook_url']].append(row)
+            else:
+                deliveries.append((row['webhook_url'], [row]))
+        
+        for url, batch_rows in batched.items():
+            self._batch_pending[url] = 0
+            for start in range(0, len(batch_rows), WEBHOOK_BATCH_MAX_SIZE):
+                deliveries.append((url, batch_rows[start:start + WEBHOOK_BATCH_MAX_SIZE]))
+        
+        for url, delivery_rows in deliveries:
+            self.in_flight += len(delivery_rows)
+            task = asyncio.create_task(self._deliver(url, delivery_rows))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        
+        return len(rows)
+    
+    async def _deliver(self, url: str, rows: List[Any]):
+        """Send one event (or one batch to a batched endpoint) and record the outcome"""
+        events = ", ".join(sorted({row['event_type'] for row in rows}))
+        self._endpoint_waiting[url] += 1
+        try:
+            async with self._endpoint_limits[url]:
+                self._endpoint_waiting[url] -= 1
                 
-                success = 200 <= response.status_code < 300
+                if url in self.batch_urls:
+                    payload = "[" + ",".join(row['payload'] for row in rows) + "]"
+                else:
+                    payload = rows[0]['payload']
                 
-                # Log webhook delivery
-                async with db_pool.acquire() as conn:
-                    await conn.execute('''
-                        INSERT INTO webhook_logs
-                        (event_type, webhook_url, payload, status_code, response_body, success, retry_count)
-                        VALUES ($1, $2, $3, $4, $5, $6, $7)
-                    ''', event_type, webhook_url, json.dumps(payload),
-                        response.status_code, response.text[:1000], success, retry_count)
+                post_start = time.perf_counter()
+                with tracer.span("webhook POST", "client", {
+                    "server.address": urlparse(url).hostname or "",
+                    "splants.event_types": events,
+                    "splants.events": len(rows)
+                }) as span:
+                    status_code, response_body = await self._post(url, payload, span)
+                    span.set_attribute("http.response.status_code", status_code)
+                    if not 200 <= status_code < 300:
+                        span.error = f"HTTP {status_code}" if status_code else response_body[:200]
+            
+            success = 200 <= status_code < 300
+            metrics.webhook_posts.observe(time.perf_counter() - post_start, "success" if success else "failure")
+            async with background_db_pool.acquire("webhook_log") as conn:
+                # One log row per event, written with a single multi-row insert
+                await query_registry.execute(
+                    conn, "insert_webhook_logs",
+                    [row['event_type'] for row in rows], url, [row['payload'] for row in rows],
+                    status_code, response_body[:1000], success, [row['attempts'] - 1 for row in rows]
+                )
                 
                 if success:
-                    logger.info(f"Webhook delivered: {event_type} -> {webhook_url[:50]}... (Status: {response.status_code})")
+                    await query_registry.execute(
+                        conn, "mark_webhooks_delivered", [row['id'] for row in rows], datetime.utcnow()
+                    )
                 else:
-                    logger.warning(f"Webhook failed: {event_type} -> {webhook_url[:50]}... (Status: {response.status_code})")
-                    
-                    # Retry logic
-                    if retry_count < 3:
-                        await asyncio.sleep(2 ** retry_count)  # Exponential backoff
-                        await self.trigger_webhook(event_type, data, webhook_url, retry_count + 1)
-                
-        except Exception as e:
-            logger.error(f"Webhook error: {event_type} -> {webhook_url[:50]}... (Error: {e})")
+                    await self._schedule_retry(conn, url, rows, f"HTTP {status_code}" if status_code else response_body)
             
-            # Log failure
-            async with db_pool.acquire() as conn:
-                await conn.execute('''
-                    INSERT INTO webhook_logs
-                    (event_type, webhook_url, payload, status_code, response_body, success, retry_count)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7)
-                ''', event_type, webhook_url, json.dumps(payload),
-                    0, str(e)[:1000], False, retry_count)
+            if success:
+                self.delivered += len(rows)
+                delivered_at = datetime.utcnow()
+                for row in rows:
+                    metrics.webhook_event_latency.observe((delivered_at - row['created_at']).total_seconds())
+                logger.info(f"Webhook delivered: {events} x{len(rows)} -> {url[:50]}... (Status: {status_code})")
+        
+        except Exception as e:
+            logger.error(f"Webhook delivery error: {events} -> {url[:50]}... (Error: {e})")
+        finally:
+            if self._endpoint_waiting[url] <= 0:
+                self._endpoint_waiting.pop(url, None)
+            self.in_flight -= len(rows)
+    
+    async def _post(self, url: str, payload: str, span: Optional[Span] = None):
+        """POST one payload; returns (status code, response body) - status 0 on a connection error"""
+        headers = {"traceparent": span.traceparent} if span is not None and span.sampled else None
+        try:
+            response = await self.client.post(url, content=payload, headers=headers)
+            return response.status_code, response.text
+        except Exception as e:
+            return 0, str(e)
+    
+    async def _schedule_retry(self, conn, url: str, rows: List[Any], error: str):
+        """Back off exponentially; dead-letter after WEBHOOK_MAX_ATTEMPTS"""
+        self.failed_attempts += 1
+        
+        now = datetime.utcnow()
+        jitter = random.uniform(0.8, 1.2)  # Shared, so a batch stays together on retry
+        statuses, next_attempts = [], []
+        for row in rows:
+            if row['attempts'] >= WEBHOOK_MAX_ATTEMPTS:
+                statuses.append('dead')
+                next_attempts.append(now)
+            else:
+                delay = min(WEBHOOK_RETRY_BASE_SECONDS * 2 ** (row['attempts'] - 1), WEBHOOK_RETRY_MAX_SECONDS)
+                statuses.append('pending')
+                next_attempts.append(now + timedelta(seconds=delay * jitter))
+        
+        await query_registry.execute(
+            conn, "retry_webhooks", [row['id'] for row in rows], statuses, next_attempts, error[:1000]
+        )
+        
+        dead = statuses.count('dead')
+        if dead:
+            self.dead_lettered += dead
+            logger.error(f"{dead} webhook(s) dead-lettered after {WEBHOOK_MAX_ATTEMPTS} attempts -> {url[:50]}...")
+        if dead < len(rows):
+            retry_in = (min(t for t, status in zip(next_attempts, statuses) if status == 'pending') - now).total_seconds()
+            logger.warning(f"Webhook failed -> {url[:50]}... ({error[:100]}); retrying in {retry_in:.1f}s")
+    
+    async def _housekeeping(self):
+        """Requeue deliveries abandoned by a crashed worker and prune old rows (once a minute)"""
+        if time.monotonic() - self._last_housekeeping < 60:
+            return
+        self._last_housekeeping = time.monotonic()
+        
+        now = datetime.utcnow()
+        async with background_db_pool.acquire("webhook_housekeeping") as conn:
+            await query_registry.execute(
+                conn, "reclaim_stale_webhooks", now - timedelta(seconds=WEBHOOK_CLAIM_TIMEOUT)
+            )
+            # Delivered rows are only kept briefly - webhook_logs has the history
+            await query_registry.execute(conn, "prune_delivered_webhooks", now - timedelta(days=1))
+        
+        # Webhook log retention (hourly) - a large backlog takes minutes, so it
+        # runs as a task of its own instead of holding up deliveries
+        compacting = self._compaction_task is not None and not self._compaction_task.done()
+        if not compacting and time.monotonic() - self._last_compaction >= 3600:
+            self._last_compaction = time.monotonic()
+            self._compaction_task = asyncio.create_task(self.compact_logs())
+            self._compaction_task.add_done_callback(self._on_compaction_done)
+        
+        # Safety net for missed change notifications
+        if (now - self.routes_loaded_at).total_seconds() >= WEBHOOK_ROUTES_REFRESH_SECONDS:
+            if self._listen_conn is None or self._listen_conn.is_closed():
+                await self._listen_for_changes()
+            await self.load_routes()
+    
+    async def compact_logs(self) -> int:
+        """
+        Compact expired webhook_logs rows into webhook_log_daily
+        
+        Successful deliveries older than WEBHOOK_LOG_RETENTION_DAYS and
+        failures older than WEBHOOK_LOG_FAILURE_RETENTION_DAYS are replaced
+        by per-day counts. Works in small transactions so it never holds
+        locks for long; an advisory lock keeps workers from racing each other.
+        """
+        
+        now = datetime.utcnow()
+        success_cutoff = now - timedelta(days=WEBHOOK_LOG_RETENTION_DAYS)
+        failure_cutoff = now - timedelta(days=max(WEBHOOK_LOG_FAILURE_RETENTION_DAYS, WEBHOOK_LOG_RETENTION_DAYS))
+        total = 0
+        
+        while True:
+            async with background_db_pool.acquire("webhook_log_compaction") as conn:
+                async with conn.transaction():
+                    if not await conn.fetchval("SELECT pg_try_advisory_xact_lock($1)", self.COMPACTION_LOCK_ID):
+                        break
+                    compacted = await query_registry.fetchval(
+                        conn, "compact_webhook_logs", WEBHOOK_LOG_COMPACTION_BATCH, success_cutoff, failure_cutoff
+                    )
             
-            # Retry logic
-            if retry_count < 3:
-                await asyncio.sleep(2 ** retry_count)
-                await self.trigger_webhook(event_type, data, webhook_url, retry_count + 1)
+            total += compacted
+            if compacted < WEBHOOK_LOG_COMPACTION_BATCH:
+                break
+            await asyncio.sleep(0)
+        
+        if total:
+            logger.info(f"Compacted {total} webhook log row(s) into daily summaries")
+        return total
+    
+    def _on_compaction_done(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            logger.error(f"Webhook log compaction failed: {task.exception()}")
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "delivered": self.delivered,
+            "failed_attempts": self.failed_attempts,
+            "dead_lettered": self.dead_lettered,
+            "busy_endpoints": len(self._endpoint_waiting),
+            "subscriptions": {event_type: len(urls) for event_type, urls in self.routes.items()},
+            "routes_loaded_at": self.routes_loaded_at.isoformat() if self.routes_loaded_at else None,
+            "change_notifications": self._listen_conn is not None and not self._listen_conn.is_closed(),
+            "last_poll": self.last_poll.isoformat() if self.last_poll else None
+        }
+
+# ============================================
+# TRAFFIC CAPTURE (Performance Regression Testing)
+# ============================================
+
+# Body and query fields never written to a capture file: credentials, and URLs
+# (webhook and callback URLs often carry a token in their path, query or userinfo)
+CAPTURE_REDACTED_FIELDS = re.compile(
+    r"(^|[_-])(api_?key|key|token|secret|password|passwd|authorization|credentials?|url|uri|callback|webhook)$",
+    re.IGNORECASE
+)
+CAPTURE_CREATED_ID = re.compile(rb'^\{"id":\s*(\d+)')
+
+class TrafficCapture:
+    """
+    Opt-in recorder of /v1/* traffic for scripts/replay_traffic.py
+    
+    Enabled by TRAFFIC_CAPTURE_PATH. Each request becomes one JSON line:
+    arrival time, method, path, query, JSON body, status, latency and - for
+    requests that create something - the new id, so a replay can map later
+    references (publish content_id=...) onto the ids its own run creates.
+    
+    Headers are never recorded and fields whose names look like credentials
+    or URLs are redacted (replays point webhooks at their own sink).
+    /v1/system/* is skipped. Records are buffered in memory and appended by
+    a background task every TRAFFIC_CAPTURE_FLUSH_SECONDS, one write() per
+    flush, so workers can share a file and capture adds no file I/O to the
+    request path.
+    """
+    
+    def __init__(self):
+        self.path = TRAFFIC_CAPTURE_PATH
+        self.buffer = deque()
+        self.captured = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self._flush_task = None
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+    
+    def wants(self, path: str) -> bool:
+        return (
+            path.startswith("/v1/")
+            and not path.startswith("/v1/system/")
+            and (TRAFFIC_CAPTURE_SAMPLE_RATE >= 1 or random.random() < TRAFFIC_CAPTURE_SAMPLE_RATE)
+        )
+    
+    @classmethod
+    def sanitize(cls, value):
+        """Copy of a JSON value with credential-like fields redacted"""
+        if isinstance(value, dict):
+            return {
+                key: "[redacted]" if CAPTURE_REDACTED_FIELDS.search(key) else cls.sanitize(item)
+                for key, item in value.items()
+            }
+        if isinstance(value, list):
+            return [cls.sanitize(item) for item in value]
+        return value
+    
+    def record(
+        self,
+        arrived: float,
+        method: str,
+        path: str,
+        query: str,
+        body: Optional[bytes],
+        status: int,
+        elapsed_ms: float,
+        created_id: Optional[int]
+    ):
+        if len(self.buffer) >= TRAFFIC_CAPTURE_BUFFER:
+            self.dropped += 1  # Disk too slow to keep up; never block requests on it
+            return
+        
+        entry = {"t": round(arrived, 3), "method": method, "path": path}
+        if query:
+            entry["query"] = [
+                [key, "[redacted]" if CAPTURE_REDACTED_FIELDS.search(key) else value]
+                for key, value in parse_qsl(query, keep_blank_values=True)
+            ]
+        if body is None:
+            entry["body_omitted"] = True  # Larger than TRAFFIC_CAPTURE_MAX_BODY_BYTES
+        elif body:
+            try:
+                entry["body"] = self.sanitize(json.loads(body))
+            except ValueError:
+                entry["body_omitted"] = True  # Not JSON
+        entry["status"] = status
+        entry["ms"] = round(elapsed_ms, 2)
+        if created_id is not None:
+            entry["created_id"] = created_id
+        
+        self.buffer.append(entry)
+        self.captured += 1
+    
+    async def start(self):
+        if not self.enabled:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(f" Traffic capture enabled: /v1/* requests appended to {self.path}")
+    
+    async def stop(self):
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(TRAFFIC_CAPTURE_FLUSH_SECONDS)
+            await self.flush()
+    
+    async def flush(self):
+        if not self.buffer:
+            return
+        lines = []
+        while self.buffer:
+            lines.append(json.dumps(self.buffer.popleft(), separators=(",", ":"), default=str))
+        try:
+            await asyncio.to_thread(self._append, ("\n".join(lines) + "\n").encode())
+        except OSError as e:
+            self.write_errors += 1
+            logger.error(f"Traffic capture write failed ({len(lines)} records lost): {e}")
+    
+    def _append(self, data: bytes):
+        # O_APPEND and a single write keep concurrent workers' lines whole
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+    
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": self.path or None,
+            "sample_rate": TRAFFIC_CAPTURE_SAMPLE_RATE,
+            "captured": self.captured,
+            "dropped": self.dropped,
+            "buffered": len(self.buffer),
+            "write_errors": self.write_errors
+        }
+
+class TrafficCaptureMiddleware:
+    """
+    ASGI middleware feeding TrafficCapture
+    
+    Pure ASGI rather than @app.middleware("http"): it tees the request body
+    as the endpoint reads it and sees the status and first bytes of the
+    response without buffering either.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not traffic_capture.wants(scope["path"]):
+            return await self.app(scope, receive, send)
+        
+        arrived = time.time()
+        start = time.perf_counter()
+        chunks = []
+        size = 0
+        oversized = False
+        response = {"status": 500, "created_id": None, "recorded": False}
+        
+        def record():
+            # At the end of the response body: BackgroundTasks run after it and are not request latency
+            response["recorded"] = True
+            traffic_capture.record(
+                arrived,
+                scope["method"],
+                scope["path"],
+                scope.get("query_string", b"").decode("latin-1"),
+                None if oversized else b"".join(chunks),
+                response["status"],
+                (time.perf_counter() - start) * 1000,
+                response["created_id"] or None
+            )
+        
+        async def capture_receive():
+            nonlocal size, oversized
+            message = await receive()
+            if message["type"] == "http.request" and not oversized:
+                size += len(message.get("body", b""))
+                if size > TRAFFIC_CAPTURE_MAX_BODY_BYTES:
+                    oversized = True
+                    chunks.clear()
+                else:
+                    chunks.append(message.get("body", b""))
+            return message
+        
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                if response["created_id"] is None and scope["method"] == "POST" and 200 <= response["status"] < 300:
+                    match = CAPTURE_CREATED_ID.match(message.get("body", b""))
+                    response["created_id"] = int(match.group(1)) if match else 0
+                if not message.get("more_body", False) and not response["recorded"]:
+                    record()
+            await send(message)
+        
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            if not response["recorded"]:
+                record()  # Failed before a complete response
+
+if TRAFFIC_CAPTURE_PATH:
+    app.add_middleware(TrafficCaptureMiddleware)
 
 # ============================================
 # INITIALIZE SERVICES
@@ -2858,6 +6194,19 @@ social_publisher = SocialPublisher()
 analytics = AnalyticsDashboard()
 cost_controller = CostController()
 webhook_system = WebhookSystem()
+schema_migrator = SchemaMigrator()
+query_registry = QueryRegistry()
+read_replica = ReadReplicaRouter()
+rate_limiter = PlatformRateLimiter()
+post_dispatcher = ScheduledPostDispatcher()
+content_rescorer = ContentRescorer()
+post_processor = ContentPostProcessor()
+traffic_capture = TrafficCapture()
+metrics = MetricsRegistry()
+KeywordMatcher.on_cache_lookup = lambda hit: metrics.cache_requests.inc(1, "keyword_matcher", "hit" if hit else "miss")
+tracer = Tracer()
+loop_monitor = EventLoopMonitor()
+profiler = SamplingProfiler()
 
 # ============================================
 # API ENDPOINTS
@@ -2924,7 +6273,7 @@ async def root():
             "anthropic": "Configured" if ANTHROPIC_API_KEY else "Not configured (optional)",
             "redis_cache": "Enabled" if CACHE_ENABLED else "Disabled (optional)",
             "cost_control": "Enabled" if MONTHLY_AI_BUDGET > 0 else "Disabled (optional)",
-            "webhooks": "Configured" if any([WEBHOOK_CONTENT_GENERATED, WEBHOOK_CONTENT_PUBLISHED]) else "Not configured (optional)"
+            "webhooks": "Configured" if webhook_system.routes else "Not configured (optional)"
         },
         "setup_steps": {
             "step_1": "Configure OpenAI API key in .env file (OPENAI_API_KEY)",
@@ -3049,7 +6398,7 @@ async def list_content(
     
     Use this to browse your content library.
     """
-    async with db_pool.acquire() as conn:
+    async with read_replica.acquire() as conn:
         query = "SELECT * FROM content WHERE status != 'variant'"
         params = []
         
@@ -3148,7 +6497,7 @@ async def list_posts(
     
     View all your social media posts across platforms.
     """
-    async with db_pool.acquire() as conn:
+    async with read_replica.acquire() as conn:
         query = "SELECT * FROM social_posts WHERE 1=1"
         params = []
         
@@ -3330,7 +6679,8 @@ async def create_ab_test(
         original = await content_engine.generate_content(request, background_tasks)
         
         # Generate variants in background
-        background_tasks.add_task(
+        metrics.add_background_task(
+            background_tasks,
             content_engine._generate_ab_variants,
             request,
             original.id
@@ -3420,6 +6770,8 @@ async def get_cost_usage(
 async def register_webhook(
     event: str = Query(..., description="Event type (e.g., 'content_generated', 'content_published')"),
     url: str = Query(..., description="Webhook URL to call"),
+    batch_mode: bool = Query(False, description="Receive events in batches (JSON array per request)"),
+    description: Optional[str] = Query(None, description="Note for your own reference"),
     api_key: str = Depends(verify_api_key)
 ):
     """
@@ -3443,15 +6795,19 @@ async def register_webhook(
     Set `WEBHOOK_CONTENT_GENERATED_URL` in your .env file, or use this endpoint
     to register webhooks dynamically.
     
-    Note: In production, you'd want to store these in the database
-    and validate webhook URLs.
+    Registrations are stored in the database and take effect in every
+    worker immediately. Registering the same event and URL again updates
+    the existing registration.
     """
-    # In production, store this in database
-    # For now, just validate and return success
     
     if not url.startswith('http'):
         raise HTTPException(400, "Webhook URL must start with http:// or https://")
     
+    async with db_pool.acquire() as conn:
+        webhook = await query_registry.fetchrow(conn, "upsert_webhook", event, url, batch_mode, description)
+    
+    await webhook_system.load_routes()
+    
     # Test the webhook
     try:
         test_payload = {
@@ -3460,37 +6816,92 @@ async def register_webhook(
             "message": "This is a test webhook delivery"
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url,
-                json=test_payload,
-                timeout=5
-            )
+        response = await webhook_system.client.post(
+            url,
+            json=[test_payload] if batch_mode else test_payload,
+            timeout=5
+        )
         
         success = 200 <= response.status_code < 300
         
         return {
             "status": "registered" if success else "warning",
-            "event": event,
-            "url": url,
+            "webhook": dict(webhook),
             "test_status": response.status_code,
-            "message": "Webhook registered successfully" if success else "Webhook registered but test delivery failed",
-            "note": "Webhook will be triggered on future events. Store this URL in your .env file for persistence."
+            "message": "Webhook registered successfully" if success else "Webhook registered but test delivery failed"
         }
         
     except Exception as e:
         return {
             "status": "registered_with_warning",
-            "event": event,
-            "url": url,
+            "webhook": dict(webhook),
             "message": f"Webhook registered but test failed: {str(e)}",
             "note": "Webhook will still be triggered on future events"
         }
 
+@app.get("/v1/webhook/subscriptions", tags=["FREE Enhancement - Webhooks"])
+async def list_webhooks(
+    event_type: Optional[str] = Query(None, description="Filter by event type"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    FREE OPTIONAL ENHANCEMENT: Registered Webhooks
+    
+    Lists webhooks registered through /v1/webhook/register. Webhooks set
+    with WEBHOOK_*_URL environment variables are listed separately.
+    """
+    async with read_replica.acquire() as conn:
+        webhooks = await query_registry.fetch(conn, "list_webhooks", event_type)
+    
+    return {
+        "total": len(webhooks),
+        "webhooks": [dict(webhook) for webhook in webhooks],
+        "environment": {
+            event_type: url for event_type, url in (
+                ('content_generated', WEBHOOK_CONTENT_GENERATED),
+                ('content_published', WEBHOOK_CONTENT_PUBLISHED),
+                ('daily_report', WEBHOOK_DAILY_REPORT)
+            ) if url
+        }
+    }
+
+@app.patch("/v1/webhook/subscriptions/{webhook_id}", tags=["FREE Enhancement - Webhooks"])
+async def update_webhook(
+    webhook_id: int,
+    active: Optional[bool] = Query(None, description="Pause (false) or resume (true) deliveries"),
+    batch_mode: Optional[bool] = Query(None, description="Switch batched delivery on or off"),
+    api_key: str = Depends(verify_api_key)
+):
+    """Pause, resume or change the delivery mode of a registered webhook"""
+    async with db_pool.acquire() as conn:
+        webhook = await query_registry.fetchrow(conn, "update_webhook", webhook_id, active, batch_mode)
+    
+    if not webhook:
+        raise HTTPException(404, "Webhook not found")
+    
+    await webhook_system.load_routes()
+    return {"status": "updated", "webhook": dict(webhook)}
+
+@app.delete("/v1/webhook/subscriptions/{webhook_id}", tags=["FREE Enhancement - Webhooks"])
+async def delete_webhook(
+    webhook_id: int,
+    api_key: str = Depends(verify_api_key)
+):
+    """Remove a registered webhook (queued deliveries are still sent)"""
+    async with db_pool.acquire() as conn:
+        deleted = await query_registry.fetchval(conn, "delete_webhook", webhook_id)
+    
+    if not deleted:
+        raise HTTPException(404, "Webhook not found")
+    
+    await webhook_system.load_routes()
+    return {"status": "deleted", "id": webhook_id}
+
 @app.get("/v1/webhook/logs", tags=["FREE Enhancement - Webhooks"])
 async def get_webhook_logs(
     limit: int = Query(50, ge=1, le=100),
     event_type: Optional[str] = Query(None, description="Filter by event type"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     api_key: str = Depends(verify_api_key)
 ):
     """
@@ -3501,28 +6912,129 @@ async def get_webhook_logs(
     - Failed deliveries
     - Retry attempts
     - Response status codes
+    
+    Newest first. Pass `next_cursor` back as `cursor` for the next page.
+    Deliveries older than the retention period are only available as
+    daily totals (/v1/webhook/logs/daily).
     """
-    async with db_pool.acquire() as conn:
-        query = "SELECT * FROM webhook_logs WHERE 1=1"
-        params = []
-        
+    
+    before_time, before_id = datetime.max, 0
+    if cursor:
+        try:
+            timestamp, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            before_time, before_id = datetime.fromisoformat(timestamp), int(log_id)
+        except ValueError:
+            raise HTTPException(400, "Invalid cursor")
+    
+    async with read_replica.acquire() as conn:
         if event_type:
-            params.append(event_type)
-            query += f" AND event_type = ${len(params)}"
-        
-        query += f" ORDER BY created_at DESC LIMIT {limit}"
-        
-        logs = await conn.fetch(query, *params)
+            logs = await query_registry.fetch(
+                conn, "webhook_logs_page_by_event", before_time, before_id, limit, event_type
+            )
+        else:
+            logs = await query_registry.fetch(conn, "webhook_logs_page", before_time, before_id, limit)
+    
+    next_cursor = None
+    if len(logs) == limit:
+        last = logs[-1]
+        next_cursor = base64.urlsafe_b64encode(
+            f"{last['created_at'].isoformat()}|{last['id']}".encode()
+        ).decode()
     
     return {
         "total": len(logs),
-        "logs": [dict(log) for log in logs]
+        "logs": [dict(log) for log in logs],
+        "next_cursor": next_cursor
+    }
+
+@app.get("/v1/webhook/logs/daily", tags=["FREE Enhancement - Webhooks"])
+async def get_webhook_log_summaries(
+    days: int = Query(30, ge=1, le=365),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    FREE OPTIONAL ENHANCEMENT: Compacted Webhook History
+    
+    Per-day delivery totals for deliveries that have aged out of
+    /v1/webhook/logs.
+    """
+    async with read_replica.acquire() as conn:
+        summaries = await query_registry.fetch(
+            conn, "webhook_log_daily", (datetime.utcnow() - timedelta(days=days)).date()
+        )
+    
+    return {
+        "days": days,
+        "summaries": [dict(summary) for summary in summaries]
+    }
+
+@app.get("/v1/webhook/dead-letters", tags=["FREE Enhancement - Webhooks"])
+async def get_dead_letter_webhooks(
+    limit: int = Query(50, ge=1, le=100),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    FREE OPTIONAL ENHANCEMENT: Dead-Lettered Webhooks
+    
+    Deliveries that failed WEBHOOK_MAX_ATTEMPTS times and were given up on.
+    Fix the receiving endpoint, then retry them with
+    POST /v1/webhook/dead-letters/{id}/retry.
+    """
+    async with read_replica.acquire() as conn:
+        counts = await query_registry.fetch(conn, "webhook_outbox_counts")
+        dead = await query_registry.fetch(conn, "list_dead_webhooks", limit)
+    
+    return {
+        "outbox": {row['status']: row['count'] for row in counts},
+        "total": len(dead),
+        "dead_letters": [dict(row) for row in dead]
     }
 
+@app.post("/v1/webhook/dead-letters/{outbox_id}/retry", tags=["FREE Enhancement - Webhooks"])
+async def retry_dead_letter_webhook(
+    outbox_id: int,
+    api_key: str = Depends(verify_api_key)
+):
+    """Put a dead-lettered webhook back in the outbox for immediate delivery"""
+    async with db_pool.acquire() as conn:
+        requeued = await query_registry.fetchval(conn, "requeue_dead_webhook", outbox_id, datetime.utcnow())
+    
+    if not requeued:
+        raise HTTPException(404, "Dead-lettered webhook not found")
+    
+    return {"status": "requeued", "id": outbox_id}
+
 # ============================================
 # SYSTEM ENDPOINTS
 # ============================================
 
+@app.get("/metrics", tags=["System"], include_in_schema=False)
+async def get_metrics(request: Request):
+    """
+    Prometheus metrics (text exposition format)
+    
+    Scrape config:
+        - job_name: splants
+          static_configs:
+            - targets: ["localhost:8080"]
+    
+    Send METRICS_TOKEN (or the admin key, if no token is set) as X-API-Key
+    or as a bearer token (Prometheus `authorization: {credentials: ...}`).
+    METRICS_PUBLIC=true serves metrics without credentials.
+    """
+    if not METRICS_ENABLED:
+        raise HTTPException(404, "Metrics are disabled (METRICS_ENABLED=false)")
+    if not METRICS_PUBLIC:
+        bearer = request.headers.get("authorization", "")
+        supplied = request.headers.get("x-api-key") or (bearer[7:] if bearer.lower().startswith("bearer ") else None)
+        if not METRICS_TOKEN:
+            await verify_admin_key(supplied)
+        elif supplied != METRICS_TOKEN:
+            logger.warning(f"Invalid metrics token attempt: {supplied[:10] if supplied else 'None'}...")
+            raise HTTPException(403, "Invalid metrics token")
+    
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/v1/system/status", tags=["System"])
 async def get_system_status(
     api_key: str = Depends(verify_api_key)
@@ -3540,7 +7052,7 @@ async def get_system_status(
     # Get current usage
     month_cost = await cost_controller.get_month_cost() if MONTHLY_AI_BUDGET > 0 else 0
     
-    async with db_pool.acquire() as conn:
+    async with read_replica.acquire() as conn:
         # Content stats
         content_stats = await conn.fetchrow('''
             SELECT 
@@ -3565,7 +7077,27 @@ async def get_system_status(
         "services": {
             "database": {
                 "status": "connected",
-                "type": "PostgreSQL"
+                "type": "PostgreSQL",
+                "schema_version": schema_migrator.current_version,
+                "pools": {
+                    "interactive": db_pool.get_stats(),
+                    "background": background_db_pool.get_stats() if background_db_pool is not db_pool else "shared"
+                },
+                "read_replica": read_replica.get_status()
+            },
+            "scheduler": post_dispatcher.get_status(),
+            "rate_limits": rate_limiter.get_status(),
+            "webhooks": webhook_system.get_status(),
+            "rescoring": content_rescorer.get_status(),
+            "post_processing": post_processor.get_status(),
+            "traffic_capture": traffic_capture.get_status(),
+            "tracing": tracer.get_status(),
+            "event_loop": loop_monitor.get_status(),
+            "profiler": profiler.get_status(),
+            "logging": log_pipeline.get_status(),
+            "publishing_adapters": {
+                platform.value: adapter.get_status()
+                for platform, adapter in social_publisher.adapters.items()
             },
             "ai_models": {
                 "gpt4": {
@@ -3594,7 +7126,7 @@ async def get_system_status(
                 "ab_testing": True,
                 "content_templates": True,
                 "cost_control": MONTHLY_AI_BUDGET > 0,
-                "webhooks": bool(WEBHOOK_CONTENT_GENERATED or WEBHOOK_CONTENT_PUBLISHED),
+                "webhooks": bool(webhook_system.routes),
                 "smart_hashtags": True,
                 "platform_optimization": True
             },
@@ -3624,10 +7156,108 @@ async def get_system_status(
             "monthly_budget": MONTHLY_AI_BUDGET if MONTHLY_AI_BUDGET > 0 else None,
             "daily_api_limit": DAILY_API_LIMIT if DAILY_API_LIMIT > 0 else None,
             "max_content_length": MAX_CONTENT_LENGTH,
-            "cache_enabled": CACHE_ENABLED
+            "cache_enabled": CACHE_ENABLED,
+            "db_pool_size": f"{DB_POOL_MIN_SIZE}-{DB_POOL_MAX_SIZE}",
+            "db_background_pool_size": DB_BACKGROUND_POOL_MAX_SIZE if DB_BACKGROUND_POOL_MAX_SIZE > 0 else "shared"
         }
     }
 
+@app.post("/v1/system/rescore", tags=["System"])
+async def start_rescoring(
+    chunk_size: int = Query(RESCORE_CHUNK_SIZE, ge=100, le=50000),
+    dry_run: bool = Query(False, description="Score without writing back"),
+    api_key: str = Depends(verify_admin_key)
+):
+    """
+    Re-score the content library (admin key)
+    
+    Recomputes quality and SEO scores for every stored document with the
+    current scoring rules (after changing weights, for example) and writes
+    back the ones that changed. Documents changed by hashtags or platform
+    optimization after they were scored are skipped. Runs in the background; poll
+    GET /v1/system/rescore for progress.
+    """
+    if not content_rescorer.start(chunk_size, dry_run):
+        raise HTTPException(409, "Re-scoring is already running")
+    
+    return {
+        "status": "started",
+        "chunk_size": chunk_size,
+        "dry_run": dry_run
+    }
+
+@app.get("/v1/system/rescore", tags=["System"])
+async def get_rescoring_status(
+    api_key: str = Depends(verify_admin_key)
+):
+    """Progress of the current re-scoring run, and the result of the last one (admin key)"""
+    return content_rescorer.get_status()
+
+@app.get("/v1/system/queries", tags=["System"])
+async def get_query_stats(
+    sort: Literal["total_ms", "avg_ms", "p95_ms", "max_ms", "calls", "rows", "errors"] = Query("total_ms"),
+    limit: int = Query(50, ge=1, le=QUERY_STATS_MAX_STATEMENTS),
+    api_key: str = Depends(verify_admin_key)
+):
+    """
+    Database query statistics and the slow-query log (admin key)
+
+    queries: every SQL statement run on the pools, registered (with its
+    registry name) or inline, normalized (literals replaced by ?) with
+    calls, rows returned and p50/p95 timings, sorted by `sort`. The pool's
+    connection reset query isn't counted. slow_queries: the
+    latest queries over SLOW_QUERY_THRESHOLD_MS, parameters redacted to
+    their types. This worker only, since startup.
+    """
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "registered_statements": len(query_registry.statements),
+        "tracked_queries": len(query_registry.queries),
+        "untracked_calls": query_registry.untracked_calls,
+        "queries": query_registry.get_query_stats(sort, limit),
+        "slow_query_threshold_ms": SLOW_QUERY_THRESHOLD_MS,
+        "slow_queries": list(reversed(query_registry.slow_queries))
+    }
+
+@app.get("/v1/system/profile", tags=["System"])
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=3600, description="Live: how long to sample. Continuous: how far back to look"),
+    hz: float = Query(100, ge=1, le=1000, description="Samples per second (live only)"),
+    source: Literal["live", "continuous"] = Query("live"),
+    idle: bool = Query(False, description="Include threads waiting for work (idle event loop, executor threads)"),
+    api_key: str = Depends(verify_admin_key)
+):
+    """
+    Sampling profile of this worker as collapsed stacks (admin key)
+    
+    Samples every thread's Python stack for `seconds` and returns one line
+    per distinct stack with its sample count - the input format of
+    flamegraph.pl, speedscope (https://www.speedscope.app) and inferno:
+    
+        curl -H "X-API-Key: ..." "http://localhost:8080/v1/system/profile?seconds=30" > profile.folded
+        flamegraph.pl profile.folded > profile.svg
+    
+    source=continuous returns the rolling window kept when
+    PROFILER_CONTINUOUS is on, without waiting. Only the worker that
+    answers is profiled; X-Profile-Worker names it.
+    """
+    if source == "continuous":
+        if not PROFILER_CONTINUOUS:
+            raise HTTPException(404, "Continuous profiling is disabled (PROFILER_CONTINUOUS=false)")
+        counts, samples = profiler.recent(seconds)
+    else:
+        if seconds > PROFILER_MAX_SECONDS:
+            raise HTTPException(400, f"seconds must be at most {PROFILER_MAX_SECONDS:g} (PROFILER_MAX_SECONDS)")
+        if profiler.running:
+            raise HTTPException(409, "A profile is already running on this worker")
+        counts, samples = await profiler.profile(seconds, hz, idle)
+    
+    return PlainTextResponse(profiler.render(counts), headers={
+        "X-Profile-Worker": str(os.getpid()),
+        "X-Profile-Samples": str(samples),
+        "X-Profile-Stacks": str(len(counts))
+    })
+
 @app.get("/v1/system/health/detailed", tags=["System"])
 async def detailed_health_check(
     api_key: str = Depends(verify_api_key)
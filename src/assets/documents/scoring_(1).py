@@ -0,0 +1,842 @@
+"""
+SPLANTS Marketing Engine - Content Scoring
+
+Text analysis, quality and SEO scoring, hashtags and platform optimization:
+the CPU-bound post-processing of a generated document, plus the vectorized
+BatchScorer used to re-score the content library.
+
+main.py imports everything from here. Its post-processing process pool
+runs run_post_processing() and BatchScorer from this module, so a spawned
+worker imports only this file - not the application, its pools, logging
+pipeline and background services. Keep it that way: nothing here may
+import main.py or do work at import time.
+"""
+
+import bisect
+import itertools
+import re
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+class PostProcessRequest(NamedTuple):
+    """
+    The ContentRequest fields post-processing reads, as plain values
+    
+    A ContentRequest has the same attributes and can be passed directly
+    in-process; for a worker process build one of these, as unpickling a
+    ContentRequest would import main.py there.
+    """
+    content_type: str
+    platform: str
+    keywords: List[str]
+    length: Optional[int]
+    include_hashtags: bool
+
+# ============================================
+# TEXT ANALYSIS (Shared by scoring and metadata)
+# ============================================
+
+def _is_word_char(char: str) -> bool:
+    """Word characters as the re module defines them (\\w)"""
+    return char.isalnum() or char == '_'
+
+class KeywordMatcher:
+    """
+    Whole-word matcher for a keyword set
+    
+    One precompiled alternation, longest keyword first, finds every
+    whole-word occurrence of every keyword in a single regex scan, so "AI"
+    no longer matches inside "maintain". Matching is case-insensitive (the
+    text passed to search() must already be lowercase); occurrences of the
+    same keyword never overlap, but different keywords may ("ai" inside
+    "ai marketing"). test_scoring.py holds these cases.
+    
+    Build with KeywordMatcher.compile() - patterns are cached per
+    keyword set, so A/B variants of a request reuse the same one.
+    """
+    
+    _cache: Dict[tuple, "KeywordMatcher"] = {}
+    _CACHE_SIZE = 256
+    on_cache_lookup: Optional[Callable[[bool], None]] = None  # Called with hit=True/False (main.py's metrics)
+    
+    @classmethod
+    def compile(cls, keywords: List[str]) -> "KeywordMatcher":
+        key = tuple(sorted({kw.lower() for kw in keywords if kw}))
+        matcher = cls._cache.get(key)
+        if cls.on_cache_lookup:
+            cls.on_cache_lookup(matcher is not None)
+        if matcher is None:
+            if len(cls._cache) >= cls._CACHE_SIZE:
+                cls._cache.clear()
+            matcher = cls._cache[key] = cls(key)
+        return matcher
+    
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(kw.lower() for kw in keywords if kw))
+        ordered = sorted(self.keywords, key=len, reverse=True)
+        
+        # A lookahead, so the scan still stops at every word start and finds
+        # keywords that begin inside a longer match ("marketing" in "ai marketing")
+        self._pattern = re.compile(
+            r'(?<!\w)(?=(' + '|'.join(map(re.escape, ordered)) + r')(?!\w))'
+        ) if ordered else None
+        
+        # The alternation reports only the longest keyword at a position, so
+        # shorter keywords it starts with ("ai" in "ai tools") are added here
+        self._prefixes = {
+            keyword: [
+                other for other in ordered
+                if len(other) < len(keyword) and keyword.startswith(other)
+                and not _is_word_char(keyword[len(other)])
+            ]
+            for keyword in self.keywords
+        }
+    
+    def search(self, text: str) -> Dict[str, List[int]]:
+        """Start offsets of whole-word occurrences of each keyword in text"""
+        found: Dict[str, List[int]] = {keyword: [] for keyword in self.keywords}
+        if self._pattern is None:
+            return found
+        
+        last_end = dict.fromkeys(self.keywords, 0)
+        for match in self._pattern.finditer(text):
+            start = match.start()
+            longest = match.group(1)
+            for keyword in (longest, *self._prefixes[longest]):
+                if start >= last_end[keyword]:
+                    found[keyword].append(start)
+                    last_end[keyword] = start + len(keyword)
+        
+        return found
+
+class TextAnalysis:
+    """
+    Everything the scorers need to know about a document, computed once
+    
+    Quality scoring, SEO scoring and the response metadata used to split,
+    lowercase and scan the same text independently - dozens of passes over
+    a long article per request. Build one TextAnalysis per document and
+    hand it to all of them; they also get identical tokenization.
+    
+    Keyword queries go through a KeywordMatcher. Pass the request's
+    keywords up front so they are all found in a single pass; keywords
+    asked about later are matched on demand.
+    """
+    
+    def __init__(self, text: str, keywords: Optional[List[str]] = None):
+        self.text = text
+        self.lower = text.lower()  # All offsets below index into this
+        
+        # Tokens (whitespace-separated words)
+        self.words = text.split()
+        self.word_count = len(self.words)
+        opening = list(itertools.islice(re.finditer(r'\S+', self.lower), 99, 100))
+        self.opening_end = opening[0].end() if opening else len(self.lower)  # End of the first 100 words
+        
+        # Sentence boundaries
+        self.sentence_count = text.count('.') + text.count('!') + text.count('?')
+        self.first_sentence = text.partition('.')[0] if '.' in text else text[:100]
+        
+        # Paragraph boundaries
+        self.paragraph_count = self.lower.count('\n\n') + 1
+        if self.paragraph_count > 1:
+            self.last_paragraph_start = self.lower.rfind('\n\n') + 2
+        else:
+            self.last_paragraph_start = max(0, len(self.lower) - 200)
+        self.last_paragraph_lower = self.lower[self.last_paragraph_start:]
+        
+        # Header lines: markdown headings and bold lines, as (start, end) spans
+        self.header_spans: List[tuple] = []
+        offset = 0
+        for line in self.lower.split('\n'):
+            if line.lstrip().startswith('#') or '**' in line:
+                self.header_spans.append((offset, offset + len(line)))
+            offset += len(line) + 1
+        
+        self.has_question = '?' in text
+        self.has_digits = any(map(str.isdigit, text))
+        
+        self._keyword_positions: Dict[str, List[int]] = {}
+        if keywords:
+            self._keyword_positions.update(KeywordMatcher.compile(keywords).search(self.lower))
+    
+    @property
+    def reading_time(self) -> int:
+        """Minutes, at 200 words per minute"""
+        return max(1, self.word_count // 200)
+    
+    def keyword_positions(self, keyword: str) -> List[int]:
+        """Offsets of whole-word, case-insensitive occurrences of keyword"""
+        needle = keyword.lower()
+        if needle not in self._keyword_positions:
+            self._keyword_positions.update(KeywordMatcher.compile([needle]).search(self.lower))
+        return self._keyword_positions.get(needle, [])
+    
+    def contains(self, keyword: str) -> bool:
+        return bool(self.keyword_positions(keyword))
+    
+    def keyword_count(self, keyword: str) -> int:
+        return len(self.keyword_positions(keyword))
+    
+    def keyword_in_opening(self, keyword: str) -> bool:
+        """Keyword appears within the first 100 words"""
+        size = len(keyword.lower())
+        return any(start + size <= self.opening_end for start in self.keyword_positions(keyword))
+    
+    def keyword_in_headers(self, keyword: str) -> bool:
+        size = len(keyword.lower())
+        header_starts = [line_start for line_start, _ in self.header_spans]
+        for start in self.keyword_positions(keyword):
+            line = bisect.bisect_right(header_starts, start) - 1
+            if line >= 0 and start + size <= self.header_spans[line][1]:
+                return True
+        return False
+    
+    def keyword_in_last_paragraph(self, keyword: str) -> bool:
+        return any(start >= self.last_paragraph_start for start in self.keyword_positions(keyword))
+
+# ============================================
+# SCORING AND PLATFORM OPTIMIZATION
+# ============================================
+
+def optimize_for_platform(content: str, platform: str, request: PostProcessRequest) -> str:
+    """
+    FREE OPTIONAL ENHANCEMENT: Platform-specific optimization
+    
+    Automatically adjusts content to meet platform requirements and best practices
+    """
+    
+    if platform == "twitter":
+        # Twitter: 280 character limit
+        if len(content) > 280:
+            # Smart truncation - try to end at sentence or word boundary
+            truncated = content[:277]
+            
+            # Try to find last sentence ending
+            last_period = max(truncated.rfind('.'), truncated.rfind('!'), truncated.rfind('?'))
+            if last_period > 200:  # Keep if it's not too short
+                content = truncated[:last_period + 1]
+            else:
+                # Find last word boundary
+                last_space = truncated.rfind(' ')
+                if last_space > 250:
+                    content = truncated[:last_space] + "..."
+                else:
+                    content = truncated + "..."
+    
+    elif platform == "linkedin":
+        # LinkedIn: First 140 characters show without "see more"
+        # Ensure strong hook in first sentence
+        if len(content) > 140:
+            first_period = content.find('.')
+            if first_period == -1 or first_period > 140:
+                # Add line break after ~140 chars for better mobile display
+                space_pos = content.find(' ', 130)
+                if space_pos != -1 and space_pos < 150:
+                    content = content[:space_pos] + '\n\n' + content[space_pos + 1:]
+    
+    elif platform == "instagram":
+        # Instagram: 2200 character caption limit
+        if len(content) > 2200:
+            content = content[:2197] + "..."
+        
+        # Ensure hashtags are at the end
+        if '#' in content:
+            # Move all hashtags to the end
+            lines = content.split('\n')
+            hashtag_lines = [line for line in lines if '#' in line]
+            content_lines = [line for line in lines if '#' not in line]
+            
+            if hashtag_lines:
+                content = '\n'.join(content_lines) + '\n\n' + '\n'.join(hashtag_lines)
+    
+    elif platform == "facebook":
+        # Facebook: Optimal post length is 40-80 characters for max engagement
+        # But can be up to 63,206 characters
+        # Add paragraph breaks for readability
+        if len(content) > 200 and '\n\n' not in content[:200]:
+            # Add a line break after first sentence if missing
+            first_period = content.find('.')
+            if first_period != -1 and first_period < 200:
+                content = content[:first_period + 1] + '\n\n' + content[first_period + 2:]
+    
+    elif platform == "youtube":
+        # YouTube: Description should have key info in first 157 characters
+        # Add timestamps if this is a video script
+        if request.content_type == "video_script":
+            # Suggest timestamp structure
+            if '[00:00]' not in content and '0:00' not in content:
+                content = "📍 Timestamps:\n0:00 - Intro\n\n" + content
+    
+    elif platform == "tiktok":
+        # TikTok: 150 character caption, 2200 for video description
+        # Keep it punchy and use emojis
+        if len(content) > 150:
+            content = content[:147] + "..."
+        
+        # Ensure at least one emoji for engagement
+        if not any(char for char in content if ord(char) > 127):
+            # Add relevant emoji at start
+            emoji_map = {
+                'tip': '',
+                'business': '💼',
+                'marketing': '',
+                'ai': '',
+                'money': '',
+                'success': ''
+            }
+            
+            for keyword, emoji in emoji_map.items():
+                if keyword in content.lower():
+                    content = f"{emoji} {content}"
+                    break
+    
+    return content.strip()
+
+def add_smart_hashtags(
+    content: str,
+    keywords: List[str],
+    platform: str
+) -> str:
+    """
+    FREE OPTIONAL ENHANCEMENT: Smart hashtag generation
+    
+    Automatically generates optimized hashtags based on:
+    - Content keywords
+    - Platform best practices
+    - Trending topics (when available)
+    - Hashtag performance data
+    """
+    
+    if not keywords:
+        return content
+    
+    # Already has hashtags? Skip
+    if '#' in content:
+        return content
+    
+    # Platform-specific hashtag strategy
+    hashtag_config = {
+        "twitter": {
+            'max': 2,
+            'placement': 'inline',
+            'style': 'capitalize_first'
+        },
+        "instagram": {
+            'max': 10,
+            'placement': 'end',
+            'style': 'capitalize_all'
+        },
+        "linkedin": {
+            'max': 5,
+            'placement': 'end',
+            'style': 'capitalize_first'
+        },
+        "facebook": {
+            'max': 2,
+            'placement': 'inline',
+            'style': 'capitalize_first'
+        },
+        "tiktok": {
+            'max': 5,
+            'placement': 'inline',
+            'style': 'lowercase'
+        },
+        "pinterest": {
+            'max': 5,
+            'placement': 'end',
+            'style': 'capitalize_first'
+        }
+    }
+    
+    config = hashtag_config.get(platform)
+    if not config:
+        return content
+    
+    # Generate hashtags from keywords
+    hashtags = []
+    for keyword in keywords[:config['max']]:
+        # Clean and format hashtag
+        hashtag = keyword.replace(' ', '').replace('-', '').replace('_', '')
+        
+        # Apply styling
+        if config['style'] == 'capitalize_first':
+            hashtag = hashtag.capitalize()
+        elif config['style'] == 'capitalize_all':
+            # CamelCase for multi-word hashtags
+            words = keyword.split()
+            hashtag = ''.join(word.capitalize() for word in words)
+        elif config['style'] == 'lowercase':
+            hashtag = hashtag.lower()
+        
+        # Validate hashtag length (max 30 characters per platform standard)
+        if len(hashtag) <= 30 and len(hashtag) >= 3:
+            hashtags.append('#' + hashtag)
+    
+    if not hashtags:
+        return content
+    
+    # Add hashtags based on platform preference
+    hashtag_string = ' '.join(hashtags)
+    
+    if config['placement'] == 'inline':
+        # Add at the end of the first line or paragraph
+        lines = content.split('\n')
+        lines[0] = f"{lines[0]} {hashtag_string}"
+        content = '\n'.join(lines)
+    else:  # 'end'
+        # Add at the very end with spacing
+        content = f"{content}\n\n{hashtag_string}"
+    
+    return content
+
+def assess_quality(analysis: TextAnalysis, request: PostProcessRequest) -> float:
+    """
+    FREE OPTIONAL ENHANCEMENT: Advanced quality assessment
+    
+    Evaluates content quality across multiple dimensions:
+    - Length appropriateness
+    - Keyword integration
+    - Readability
+    - Engagement indicators
+    - Structure and formatting
+    """
+    
+    score = 0.0
+    content = analysis.text
+    word_count = analysis.word_count
+    
+    # 1. Length appropriateness (25% of score)
+    if request.length:
+        ratio = word_count / request.length
+        # Ideal is within 10% of target
+        if 0.9 <= ratio <= 1.1:
+            score += 0.25
+        elif 0.8 <= ratio <= 1.2:
+            score += 0.20
+        elif 0.7 <= ratio <= 1.3:
+            score += 0.15
+        else:
+            score += 0.10
+    else:
+        # Default good range
+        if 100 <= word_count <= 2000:
+            score += 0.25
+        elif 50 <= word_count <= 3000:
+            score += 0.15
+        else:
+            score += 0.10
+    
+    # 2. Keyword integration (25% of score)
+    if request.keywords:
+        keyword_count = sum(1 for kw in request.keywords if analysis.contains(kw))
+        keyword_ratio = keyword_count / len(request.keywords)
+        
+        # Perfect: All keywords present
+        if keyword_ratio >= 0.9:
+            score += 0.25
+        elif keyword_ratio >= 0.7:
+            score += 0.20
+        elif keyword_ratio >= 0.5:
+            score += 0.15
+        else:
+            score += 0.10
+    else:
+        score += 0.25  # No penalty if no keywords specified
+    
+    # 3. Readability (20% of score)
+    sentences = analysis.sentence_count
+    if sentences > 0:
+        avg_sentence_length = word_count / sentences
+        
+        # Ideal: 15-20 words per sentence
+        if 15 <= avg_sentence_length <= 20:
+            score += 0.20
+        elif 10 <= avg_sentence_length <= 25:
+            score += 0.15
+        elif 8 <= avg_sentence_length <= 30:
+            score += 0.10
+        else:
+            score += 0.05
+    
+    # 4. Engagement indicators (15% of score)
+    engagement_score = 0
+    
+    # Questions (engages reader)
+    if analysis.has_question:
+        engagement_score += 0.05
+    
+    # Numbers/statistics (adds credibility)
+    if analysis.has_digits:
+        engagement_score += 0.04
+    
+    # Call-to-action phrases
+    cta_phrases = ['click', 'visit', 'learn', 'discover', 'join', 'get', 'try', 'start', 'explore']
+    if any(cta in analysis.lower for cta in cta_phrases):
+        engagement_score += 0.03
+    
+    # Lists/bullets (improves scannability)
+    if any(marker in content for marker in ['•', '-', '1.', '2.', '*']):
+        engagement_score += 0.03
+    
+    score += min(engagement_score, 0.15)
+    
+    # 5. Structure and formatting (15% of score)
+    structure_score = 0
+    
+    # Paragraphs (good readability)
+    paragraph_count = analysis.paragraph_count
+    if 3 <= paragraph_count <= 10:
+        structure_score += 0.05
+    elif paragraph_count > 1:
+        structure_score += 0.03
+    
+    # Headers/sections (good organization)
+    if any(header in content for header in ['##', 'H2:', 'H3:', '**']):
+        structure_score += 0.05
+    
+    # Strong opening (first sentence quality)
+    if 8 <= len(analysis.first_sentence.split()) <= 20:
+        structure_score += 0.03
+    
+    # Clear conclusion
+    if any(conclusion in analysis.last_paragraph_lower for conclusion in ['conclusion', 'in summary', 'to summarize', 'finally']):
+        structure_score += 0.02
+    
+    score += min(structure_score, 0.15)
+    
+    return min(score, 1.0)
+
+def calculate_seo_score(analysis: TextAnalysis, keywords: List[str]) -> float:
+    """
+    FREE OPTIONAL ENHANCEMENT: Comprehensive SEO scoring
+    
+    Evaluates SEO optimization across:
+    - Keyword presence and placement
+    - Keyword density
+    - Content structure
+    - Meta elements suggestions
+    """
+    
+    if not keywords:
+        return 0.5  # Neutral score if no keywords
+    
+    score = 0.0
+    content = analysis.text
+    word_count = analysis.word_count
+    
+    # 1. Keyword presence (35% of SEO score)
+    keyword_count = sum(1 for kw in keywords if analysis.contains(kw))
+    presence_ratio = keyword_count / len(keywords)
+    
+    if presence_ratio >= 0.9:
+        score += 0.35
+    elif presence_ratio >= 0.7:
+        score += 0.28
+    elif presence_ratio >= 0.5:
+        score += 0.20
+    else:
+        score += 0.10
+    
+    # 2. Keyword density (25% of SEO score)
+    # Optimal density: 1-3% of total words
+    if word_count > 0:
+        total_keyword_occurrences = sum(analysis.keyword_count(kw) for kw in keywords)
+        density = (total_keyword_occurrences / word_count) * 100
+        
+        if 1 <= density <= 3:
+            score += 0.25  # Perfect density
+        elif 0.5 <= density < 1:
+            score += 0.20  # A bit low
+        elif 3 < density <= 5:
+            score += 0.15  # A bit high
+        else:
+            score += 0.05  # Too high or too low
+    
+    # 3. Keyword placement (20% of SEO score)
+    placement_score = 0
+    
+    # First 100 words (important for SEO)
+    if any(analysis.keyword_in_opening(kw) for kw in keywords):
+        placement_score += 0.07
+    
+    # Headers/titles (high importance)
+    if any(analysis.keyword_in_headers(kw) for kw in keywords):
+        placement_score += 0.07
+    
+    # Last paragraph (conclusion)
+    if any(analysis.keyword_in_last_paragraph(kw) for kw in keywords):
+        placement_score += 0.06
+    
+    score += min(placement_score, 0.20)
+    
+    # 4. Content structure (20% of SEO score)
+    structure_score = 0
+    
+    # Good length (500-2500 words is ideal for SEO)
+    if 500 <= word_count <= 2500:
+        structure_score += 0.08
+    elif 300 <= word_count <= 3000:
+        structure_score += 0.05
+    else:
+        structure_score += 0.02
+    
+    # Headers present (H2, H3, etc.)
+    header_markers = ['##', 'H2:', 'H3:', '###']
+    if any(marker in content for marker in header_markers):
+        structure_score += 0.06
+    
+    # Lists/bullets (good for featured snippets)
+    if any(marker in content for marker in ['•', '-', '1.', '2.', '*']):
+        structure_score += 0.04
+    
+    # Internal linking suggestions (if present)
+    if '[' in content and ']' in content:
+        structure_score += 0.02
+    
+    score += min(structure_score, 0.20)
+    
+    return min(score, 1.0)
+
+# ============================================
+# POST-PROCESSING (Run inline or in a worker process)
+# ============================================
+
+def run_post_processing(
+    content: str,
+    request: PostProcessRequest,
+    score_seo: bool = True,
+    optimize: bool = True
+) -> Dict[str, Any]:
+    """
+    Score, hashtag and platform-optimize generated content
+    
+    Pure CPU work with picklable arguments and result, so it can run in a
+    worker process (pass a PostProcessRequest there, not a ContentRequest).
+    Returns the final content, its scores, word count and reading time, and
+    how long each stage took (ms). Scores are for the generated text, before
+    hashtags and platform optimization; post_processed says whether those
+    changed it (the stored text is then not the text that was scored).
+    """
+    timings = {}
+    stage_start = time.perf_counter()
+    
+    def finish(stage: str):
+        nonlocal stage_start
+        now = time.perf_counter()
+        timings[stage] = (now - stage_start) * 1000
+        stage_start = now
+    
+    analysis = TextAnalysis(content, request.keywords)
+    finish("analysis")
+    
+    quality_score = assess_quality(analysis, request)
+    finish("quality")
+    
+    seo_score = calculate_seo_score(analysis, request.keywords) if score_seo else 0.5
+    finish("seo")
+    
+    post_processed = False
+    if optimize:
+        if request.include_hashtags and request.platform in ("twitter", "instagram", "linkedin"):
+            content = add_smart_hashtags(content, request.keywords, request.platform)
+            finish("hashtags")
+        
+        content = optimize_for_platform(content, request.platform, request)
+        finish("platform")
+        
+        if content != analysis.text:  # Hashtags or platform optimization changed it
+            post_processed = True
+            analysis = TextAnalysis(content)
+            finish("metadata")
+    
+    return {
+        "content": content,
+        "quality_score": quality_score,
+        "seo_score": seo_score,
+        "post_processed": post_processed,
+        "word_count": analysis.word_count,
+        "reading_time": analysis.reading_time,
+        "timings": timings
+    }
+
+# ============================================
+# BATCH SCORING (Content Library Re-scoring)
+# ============================================
+
+class BatchScorer:
+    """
+    Vectorized quality and SEO scoring for many documents at once
+    
+    Each document is reduced to one row of numeric features (through
+    TextAnalysis), and the scoring rules run as NumPy array operations over
+    the whole batch instead of once per document in Python.
+    
+    The rules mirror assess_quality() and calculate_seo_score() exactly -
+    change them together.
+    """
+    
+    FEATURES = (
+        "word_count", "target_length", "keywords", "keywords_present", "keyword_occurrences",
+        "sentences", "has_question", "has_digits", "has_cta", "has_list",
+        "paragraphs", "has_sections", "first_sentence_words", "has_conclusion",
+        "keyword_in_opening", "keyword_in_headers", "keyword_in_last_paragraph",
+        "has_seo_headers", "has_links",
+    )
+    
+    CTA_PHRASES = ['click', 'visit', 'learn', 'discover', 'join', 'get', 'try', 'start', 'explore']
+    LIST_MARKERS = ['•', '-', '1.', '2.', '*']
+    SECTION_MARKERS = ['##', 'H2:', 'H3:', '**']
+    SEO_HEADER_MARKERS = ['##', 'H2:', 'H3:', '###']
+    CONCLUSION_PHRASES = ['conclusion', 'in summary', 'to summarize', 'finally']
+    
+    def extract_features(
+        self,
+        text: str,
+        keywords: List[str],
+        target_length: Optional[int] = None
+    ) -> List[float]:
+        """One feature row (in FEATURES order) for a document"""
+        analysis = TextAnalysis(text, keywords)
+        return [
+            analysis.word_count,
+            target_length or 0,
+            len(keywords),
+            sum(1 for kw in keywords if analysis.contains(kw)),
+            sum(analysis.keyword_count(kw) for kw in keywords),
+            analysis.sentence_count,
+            analysis.has_question,
+            analysis.has_digits,
+            any(cta in analysis.lower for cta in self.CTA_PHRASES),
+            any(marker in text for marker in self.LIST_MARKERS),
+            analysis.paragraph_count,
+            any(marker in text for marker in self.SECTION_MARKERS),
+            len(analysis.first_sentence.split()),
+            any(phrase in analysis.last_paragraph_lower for phrase in self.CONCLUSION_PHRASES),
+            any(analysis.keyword_in_opening(kw) for kw in keywords),
+            any(analysis.keyword_in_headers(kw) for kw in keywords),
+            any(analysis.keyword_in_last_paragraph(kw) for kw in keywords),
+            any(marker in text for marker in self.SEO_HEADER_MARKERS),
+            '[' in text and ']' in text,
+        ]
+    
+    def score(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Quality and SEO scores for an (documents x FEATURES) array"""
+        f = dict(zip(self.FEATURES, features.T))
+        words = f["word_count"]
+        target = f["target_length"]
+        keywords = f["keywords"]
+        has_keywords = keywords > 0
+        keyword_ratio = f["keywords_present"] / np.maximum(keywords, 1)
+        
+        # Quality 1. Length appropriateness (25%)
+        ratio = words / np.where(target > 0, target, 1)
+        length_score = np.where(
+            target > 0,
+            np.select(
+                [(0.9 <= ratio) & (ratio <= 1.1), (0.8 <= ratio) & (ratio <= 1.2), (0.7 <= ratio) & (ratio <= 1.3)],
+                [0.25, 0.20, 0.15], 0.10
+            ),
+            np.select([(100 <= words) & (words <= 2000), (50 <= words) & (words <= 3000)], [0.25, 0.15], 0.10)
+        )
+        
+        # Quality 2. Keyword integration (25%)
+        keyword_score = np.where(
+            has_keywords,
+            np.select([keyword_ratio >= 0.9, keyword_ratio >= 0.7, keyword_ratio >= 0.5], [0.25, 0.20, 0.15], 0.10),
+            0.25
+        )
+        
+        # Quality 3. Readability (20%)
+        sentences = f["sentences"]
+        avg_sentence = words / np.maximum(sentences, 1)
+        readability = np.where(
+            sentences > 0,
+            np.select(
+                [(15 <= avg_sentence) & (avg_sentence <= 20), (10 <= avg_sentence) & (avg_sentence <= 25),
+                 (8 <= avg_sentence) & (avg_sentence <= 30)],
+                [0.20, 0.15, 0.10], 0.05
+            ),
+            0.0
+        )
+        
+        # Quality 4. Engagement (15%)
+        engagement = np.minimum(
+            0.05 * f["has_question"] + 0.04 * f["has_digits"] + 0.03 * f["has_cta"] + 0.03 * f["has_list"],
+            0.15
+        )
+        
+        # Quality 5. Structure (15%)
+        paragraphs = f["paragraphs"]
+        first_sentence = f["first_sentence_words"]
+        structure = np.minimum(
+            np.select([(3 <= paragraphs) & (paragraphs <= 10), paragraphs > 1], [0.05, 0.03], 0.0)
+            + 0.05 * f["has_sections"]
+            + 0.03 * ((8 <= first_sentence) & (first_sentence <= 20))
+            + 0.02 * f["has_conclusion"],
+            0.15
+        )
+        
+        quality = np.minimum(length_score + keyword_score + readability + engagement + structure, 1.0)
+        
+        # SEO 1. Keyword presence (35%)
+        presence = np.select([keyword_ratio >= 0.9, keyword_ratio >= 0.7, keyword_ratio >= 0.5], [0.35, 0.28, 0.20], 0.10)
+        
+        # SEO 2. Keyword density (25%)
+        density = f["keyword_occurrences"] / np.maximum(words, 1) * 100
+        density_score = np.where(
+            words > 0,
+            np.select(
+                [(1 <= density) & (density <= 3), (0.5 <= density) & (density < 1), (3 < density) & (density <= 5)],
+                [0.25, 0.20, 0.15], 0.05
+            ),
+            0.0
+        )
+        
+        # SEO 3. Keyword placement (20%)
+        placement = np.minimum(
+            0.07 * f["keyword_in_opening"] + 0.07 * f["keyword_in_headers"] + 0.06 * f["keyword_in_last_paragraph"],
+            0.20
+        )
+        
+        # SEO 4. Content structure (20%)
+        seo_structure = np.minimum(
+            np.select([(500 <= words) & (words <= 2500), (300 <= words) & (words <= 3000)], [0.08, 0.05], 0.02)
+            + 0.06 * f["has_seo_headers"]
+            + 0.04 * f["has_list"]
+            + 0.02 * f["has_links"],
+            0.20
+        )
+        
+        seo = np.where(
+            has_keywords,
+            np.minimum(presence + density_score + placement + seo_structure, 1.0),
+            0.5  # Neutral score if no keywords
+        )
+        
+        return quality, seo
+    
+    def score_documents(
+        self,
+        documents: List[Tuple[str, List[str], Optional[int]]],
+        score_seo: Optional[List[bool]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores for (text, keywords, target_length) tuples
+        
+        score_seo is per document, as in run_post_processing(): False gives
+        the 0.5 stored for content generated without SEO optimization.
+        """
+        if not documents:
+            return np.zeros(0), np.zeros(0)
+        
+        features = np.array(
+            [self.extract_features(text, keywords, target_length) for text, keywords, target_length in documents],
+            dtype=np.float64
+        )
+        quality, seo = self.score(features)
+        if score_seo is not None:
+            seo = np.where(score_seo, seo, 0.5)
+        return quality, seo
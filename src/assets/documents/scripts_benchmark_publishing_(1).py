@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+SPLANTS Marketing Engine - Publishing Throughput Benchmark
+
+Measures posts/second end-to-end through SocialPublisher: posts are
+scheduled with publish(), then claimed and published by the scheduled
+post dispatcher through the simulated platform adapter. No platform
+credentials are needed - only a PostgreSQL database.
+
+Usage (from the directory containing main.py):
+    DATABASE_URL=postgresql://... python scripts/benchmark_publishing.py --posts 2000
+    python scripts/benchmark_publishing.py --latency-ms 500 --error-rate 0.02 --batch-size 10
+
+Platform rate limits are lifted unless --respect-rate-limits is given, so
+the numbers show the capacity of the publishing path itself.
+
+The dispatcher claims every due post in the database, so the benchmark
+refuses to run while other scheduled posts are due (or come due within
+the hour) - point it at a scratch database, never at production.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the publishing path with a simulated platform")
+    parser.add_argument("--posts", type=int, default=1000, help="Total posts to publish")
+    parser.add_argument("--platforms", default="twitter,linkedin,facebook",
+                        help="Comma-separated platforms to spread posts over")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Simulated API latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Simulated API error rate (0.0 - 1.0)")
+    parser.add_argument("--batch-size", type=int, default=1, help="Posts per simulated API call")
+    parser.add_argument("--max-in-flight", type=int, default=100, help="SCHEDULER_MAX_IN_FLIGHT")
+    parser.add_argument("--platform-concurrency", type=int, default=5, help="SCHEDULER_PLATFORM_CONCURRENCY")
+    parser.add_argument("--respect-rate-limits", action="store_true",
+                        help="Keep the configured platform rate limits")
+    return parser.parse_args()
+
+def configure(args):
+    """Environment for main.py - must be set before it is imported"""
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ["PLATFORM_ADAPTER"] = "simulated"
+    os.environ["PLATFORM_ADAPTERS"] = ""
+    os.environ["MOCK_PLATFORM_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["MOCK_PLATFORM_ERROR_RATE"] = str(args.error_rate)
+    os.environ["MOCK_PLATFORM_BATCH_SIZE"] = str(args.batch_size)
+    os.environ["SCHEDULER_ENABLED"] = "false"  # The benchmark drives the dispatcher itself
+    os.environ["SCHEDULER_MAX_IN_FLIGHT"] = str(args.max_in_flight)
+    os.environ["SCHEDULER_PLATFORM_CONCURRENCY"] = str(args.platform_concurrency)
+    if not args.respect_rate_limits:
+        os.environ["PLATFORM_RATE_LIMITS"] = ",".join(
+            f"{platform}=1000000/1" for platform in args.platforms.split(",")
+        )
+
+async def run(args):
+    sys.path.insert(0, os.getcwd())
+    import main
+
+    platforms = [main.Platform(name.strip()) for name in args.platforms.split(",")]
+    rounds = max(1, args.posts // len(platforms))
+
+    await main.startup()
+    try:
+        async with main.db_pool.acquire() as conn:
+            other_due = await conn.fetchval(
+                "SELECT COUNT(*) FROM social_posts WHERE status = 'scheduled' AND scheduled_for <= $1",
+                main.datetime.utcnow() + main.timedelta(hours=1)
+            )
+            if other_due:
+                print(f"Refusing to run: {other_due} other scheduled post(s) are due within the hour "
+                      f"and would be published by the benchmark. Use a scratch database.")
+                return
+
+            content_id = await conn.fetchval(
+                "INSERT INTO content (content_type, topic, content, status) "
+                "VALUES ('social_post', 'publishing benchmark', $1, 'benchmark') RETURNING id",
+                "Benchmark post for the publishing path #marketing"
+            )
+
+        # Phase 1: schedule posts through SocialPublisher.publish()
+        start = time.perf_counter()
+        due = main.datetime.utcnow() - main.timedelta(seconds=1)
+        for _ in range(rounds):
+            await main.social_publisher.publish(content_id, platforms, schedule_time=due)
+        schedule_elapsed = time.perf_counter() - start
+        total = rounds * len(platforms)
+
+        # Phase 2: dispatcher claims and publishes until nothing is left
+        dispatcher = main.post_dispatcher
+        start = time.perf_counter()
+        while True:
+            claimed = await dispatcher.dispatch_due()
+            if not claimed:
+                if not dispatcher.in_flight:
+                    break
+                await asyncio.wait(dispatcher._tasks, return_when=asyncio.FIRST_COMPLETED)
+        publish_elapsed = time.perf_counter() - start
+
+        async with main.db_pool.acquire() as conn:
+            statuses = await conn.fetch(
+                "SELECT status, COUNT(*) AS count FROM social_posts WHERE content_id = $1 GROUP BY status",
+                content_id
+            )
+            await conn.execute("DELETE FROM content WHERE id = $1", content_id)
+
+        print("=" * 60)
+        print("Publishing benchmark")
+        print("=" * 60)
+        print(f"Platforms:          {', '.join(p.value for p in platforms)}")
+        print(f"Simulated latency:  {args.latency_ms:g} ms, error rate {args.error_rate:g}, batch size {args.batch_size}")
+        print(f"Posts:              {total}")
+        print(f"Schedule (publish): {schedule_elapsed:.2f}s  ({total / schedule_elapsed:.1f} posts/s)")
+        print(f"Dispatch + post:    {publish_elapsed:.2f}s  ({total / publish_elapsed:.1f} posts/s)")
+        print("Final statuses:     " + ", ".join(f"{row['status']}={row['count']}" for row in statuses))
+        print(f"Dispatcher:         {dispatcher.get_status()}")
+        print(f"DB pools:           {main.background_db_pool.get_stats()}")
+    finally:
+        await main.shutdown()
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    configure(arguments)
+    asyncio.run(run(arguments))
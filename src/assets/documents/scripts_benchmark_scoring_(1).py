@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+SPLANTS Marketing Engine - Scoring Microbenchmarks
+
+Times the CPU-bound parts of a generation request - text analysis, quality
+and SEO scoring, platform optimization, hashtags, cache keys and prompt
+building - on synthetic documents from 50 to 5,000 words, and compares the
+results with a committed baseline. No database or API keys are needed.
+
+Usage (from the directory containing main.py):
+    python scripts/benchmark_scoring.py                   # Run and print
+    python scripts/benchmark_scoring.py --check           # Fail if slower than the baseline
+    python scripts/benchmark_scoring.py --save-baseline   # After an intended change
+    python scripts/benchmark_scoring.py -k seo            # Only cases matching "seo"
+
+Timings are normalized by a fixed pure-Python calibration workload, so a
+baseline recorded on one machine stays meaningful on another. Each case's
+rounds alternate with rounds of the calibration workload and the case is
+compared by the median of the per-round ratios, so CPU frequency changes
+and noisy neighbours during the run affect both sides alike. --check fails
+(exit code 1) when any case is more than --threshold times its baseline
+(and at least --min-delta-us slower, to ignore timer noise on tiny cases).
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Tuple
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_scoring_baseline.json")
+
+DOCUMENT_WORDS = [50, 500, 2000, 5000]
+KEYWORD_COUNTS = [1, 5, 10]
+
+KEYWORDS = [
+    "ai marketing", "content strategy", "small business", "seo", "social media",
+    "email campaigns", "brand awareness", "lead generation", "analytics", "automation",
+]
+
+VOCABULARY = (
+    "the a of to and in for with your our that this is are can will more every "
+    "customers teams growth results data insights audience engagement campaign "
+    "budget channel conversion funnel traffic content posts video search ranking "
+    "strategy tools platform workflow quality value trust story offer launch "
+    "simple faster better proven practical measurable consistent personal local "
+    "build grow learn discover start try explore improve measure test share"
+).split()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scoring microbenchmarks with a regression check")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Record this run as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if any case regressed past --threshold")
+    parser.add_argument("--threshold", type=float, default=2.0,
+                        help="Allowed slowdown versus the baseline (2.0 = twice as slow)")
+    parser.add_argument("--min-delta-us", type=float, default=5.0,
+                        help="Ignore slowdowns smaller than this many microseconds per call (timer noise)")
+    parser.add_argument("--rounds", type=int, default=7, help="Timing rounds per case (the median is reported)")
+    parser.add_argument("--min-time", type=float, default=0.05, help="Seconds per round")
+    parser.add_argument("-k", dest="filter", default=None, help="Only run cases whose name contains this")
+    return parser.parse_args()
+
+def make_document(words: int, keywords, seed: int) -> str:
+    """Deterministic marketing-style document with headers, lists and ~1.5% keyword density"""
+    rng = random.Random(seed)
+    paragraphs = []
+    written = 0
+    while written < words:
+        if paragraphs and rng.random() < 0.2:
+            paragraphs.append(f"## {rng.choice(keywords).title()} {rng.choice(VOCABULARY)}")
+        sentences = []
+        for _ in range(rng.randint(2, 5)):
+            length = rng.randint(8, 22)
+            tokens = [rng.choice(VOCABULARY) for _ in range(length)]
+            if rng.random() < 0.3:
+                tokens[rng.randrange(length)] = rng.choice(keywords)
+            if rng.random() < 0.1:
+                tokens.append(str(rng.randint(2, 95)) + "%")
+            sentences.append(" ".join(tokens).capitalize() + rng.choice([".", ".", ".", "?", "!"]))
+            written += length
+        if rng.random() < 0.15:
+            sentences.append("\n- " + "\n- ".join(rng.choice(VOCABULARY) for _ in range(3)))
+        paragraphs.append(" ".join(sentences))
+    paragraphs.append("In summary, " + " ".join(rng.choice(keywords) for _ in range(2)) + " wins.")
+    return "\n\n".join(paragraphs)
+
+def calibration_workload():
+    """Fixed pure-Python workload (machine speed reference)"""
+    total = 0
+    for i in range(2000):
+        total += len(str(i)) * (i % 7)
+    return "-".join(sorted({str(i % 97) for i in range(200)}))
+
+def calls_per_round(func, min_time: float) -> int:
+    """How many calls of func take at least `min_time` seconds"""
+    func()  # Warm up caches (compiled regexes, keyword matchers)
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return number
+        number *= 2 if elapsed < min_time / 10 else max(2, int(min_time / elapsed) + 1)
+
+def time_round(func, number: int) -> float:
+    """Microseconds per call over one round of `number` calls"""
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return (time.perf_counter() - start) / number * 1e6
+
+def measure(func, rounds: int, min_time: float) -> Tuple[float, float, float]:
+    """
+    Median microseconds per call for func and for the calibration workload,
+    and the median of their per-round ratio
+
+    The rounds alternate (calibration, case, calibration, case, ...), so
+    each ratio compares the two under the same machine conditions.
+    """
+    number = calls_per_round(func, min_time)
+    calibration_number = calls_per_round(calibration_workload, min_time / 2)
+    timings, calibrations, ratios = [], [], []
+    for _ in range(rounds):
+        calibrations.append(time_round(calibration_workload, calibration_number))
+        timings.append(time_round(func, number))
+        ratios.append(timings[-1] / calibrations[-1])
+    return statistics.median(timings), statistics.median(calibrations), statistics.median(ratios)
+
+def build_cases(main):
+    """(name, callable) for every benchmark case"""
+    engine = main.content_engine
+    cases = []
+
+    for words in DOCUMENT_WORDS:
+        for keyword_count in KEYWORD_COUNTS:
+            keywords = KEYWORDS[:keyword_count]
+            text = make_document(words, keywords, seed=words * 100 + keyword_count)
+            request = main.ContentRequest(
+                content_type="blog",
+                topic="Marketing automation for small businesses",
+                keywords=keywords,
+                length=max(50, words),
+                platform="blog"
+            )
+            analysis = main.TextAnalysis(text, keywords)
+            suffix = f"[{words}w-{keyword_count}kw]"
+
+            cases += [
+                ("text_analysis" + suffix, lambda text=text, keywords=keywords: main.TextAnalysis(text, keywords)),
+                ("assess_quality" + suffix,
+                 lambda analysis=analysis, request=request: main.ContentEngine._assess_quality(analysis, request)),
+                ("calculate_seo_score" + suffix,
+                 lambda analysis=analysis, keywords=keywords: main.ContentEngine._calculate_seo_score(analysis, keywords)),
+                ("post_processing" + suffix,
+                 lambda text=text, request=request: main.run_post_processing(text, request)),
+            ]
+
+        text = make_document(words, KEYWORDS[:5], seed=words)
+        plain = text.replace("#", "")  # Hashtags are only added to content without any
+        for name in ("twitter", "linkedin", "instagram", "facebook", "tiktok"):
+            target = main.Platform(name)
+            request = main.ContentRequest(content_type="social_post", topic="Platform optimization", platform=name)
+            cases.append((
+                f"optimize_for_platform[{words}w-{name}]",
+                lambda text=text, target=target, request=request: main.ContentEngine._optimize_for_platform(text, target, request)
+            ))
+            cases.append((
+                f"add_smart_hashtags[{words}w-{name}]",
+                lambda plain=plain, target=target: main.ContentEngine._add_smart_hashtags(plain, KEYWORDS, target)
+            ))
+
+    for keyword_count in KEYWORD_COUNTS:
+        request = main.ContentRequest(
+            content_type="blog",
+            topic="Marketing automation for small businesses",
+            keywords=KEYWORDS[:keyword_count],
+            target_audience="owners of businesses with 5-50 employees",
+            length=1500
+        )
+        suffix = f"[{keyword_count}kw]"
+        cases += [
+            ("generate_cache_key" + suffix, lambda request=request: engine._generate_cache_key(request)),
+            ("build_system_prompt" + suffix, lambda request=request: engine._build_system_prompt(request)),
+            ("build_user_prompt" + suffix, lambda request=request: engine._build_user_prompt(request)),
+        ]
+
+    return cases
+
+def main_benchmark(args):
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    os.environ["POSTPROCESS_EXECUTOR"] = "inline"
+    sys.path.insert(0, os.getcwd())
+    import main
+
+    cases = [(name, func) for name, func in build_cases(main) if not args.filter or args.filter in name]
+    relative = {}  # Case time in calibration workloads
+    calibrations = []
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print("=" * 78)
+    print("Scoring microbenchmarks" + (" (baseline normalized to this machine)" if baseline else ""))
+    print("=" * 78)
+    print(f"{'case':<44} {'us/call':>10} {'baseline':>10} {'ratio':>8}")
+
+    regressions = []
+    for name, func in cases:
+        microseconds, calibration, relative[name] = measure(func, args.rounds, args.min_time)
+        calibrations.append(calibration)
+
+        reference = baseline["results"].get(name) if baseline else None
+        if reference:
+            # The baseline's time for this case at the current machine speed
+            expected = reference / baseline["calibration_us"] * calibration
+            ratio = relative[name] * calibration / expected
+            slower = ratio > args.threshold and (ratio - 1) * expected > args.min_delta_us
+            flag = "  << REGRESSION" if slower else ""
+            if flag:
+                regressions.append((name, ratio))
+            print(f"{name:<44} {microseconds:>10.1f} {expected:>10.1f} {ratio:>7.2f}x{flag}")
+        else:
+            print(f"{name:<44} {microseconds:>10.1f} {'-':>10} {'-':>8}")
+
+    if args.save_baseline:
+        # Stored in microseconds at the run's median calibration
+        calibration = baseline["calibration_us"] if baseline and args.filter else statistics.median(calibrations)
+        results = {name: round(value * calibration, 3) for name, value in relative.items()}
+        if baseline and args.filter:
+            results = {**baseline["results"], **results}
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "calibration_us": round(calibration, 3),
+                "results": results
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"\n{len(regressions)} case(s) more than {args.threshold:g}x slower than the baseline:")
+        for name, ratio in regressions:
+            print(f"  {name}: {ratio:.2f}x")
+    elif baseline:
+        print(f"\nNo case more than {args.threshold:g}x slower than the baseline")
+
+    return 1 if args.check and regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main_benchmark(parse_args()))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+SPLANTS Marketing Engine - Mock Social Platform Server
+
+Stands in for the social platform APIs when testing publishing throughput.
+Each platform enforces its own rate limit the way the real APIs do: posts
+over the limit get 429 with a Retry-After header.
+
+Usage:
+    python scripts/mock_platform.py --port 9100 --limit twitter=300/10800
+    MOCK_PLATFORM_URL=http://localhost:9100 docker-compose up
+
+    curl http://localhost:9100/stats      # accepted / rejected per platform
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Same defaults as PlatformRateLimiter in main.py: (requests, per seconds)
+DEFAULT_LIMITS = {
+    "twitter": (300, 10800),
+    "linkedin": (150, 86400),
+    "instagram": (50, 86400),
+    "facebook": (200, 3600),
+    "tiktok": (15, 86400),
+    "pinterest": (1000, 3600),
+    "youtube": (6, 86400),
+}
+
+app = FastAPI(title="SPLANTS Mock Platform")
+
+limits = dict(DEFAULT_LIMITS)
+latency_ms = 0
+sent = defaultdict(list)  # platform -> timestamps of accepted posts
+stats = defaultdict(lambda: {"accepted": 0, "rejected": 0})
+started = time.time()
+
+@app.post("/{platform}/posts")
+async def create_post(platform: str, request: Request):
+    """Accept a post unless the platform's sliding-window limit is used up"""
+    body = await request.json()
+
+    if latency_ms:
+        await asyncio.sleep(random.uniform(0.5, 1.5) * latency_ms / 1000)
+
+    now = time.time()
+    rate, per = limits.get(platform, (1000, 1))
+    window = sent[platform]
+    while window and window[0] <= now - per:
+        window.pop(0)
+
+    if len(window) >= rate:
+        stats[platform]["rejected"] += 1
+        retry_after = max(1, int(window[0] + per - now) + 1)
+        return JSONResponse(
+            {"error": "rate limit exceeded"},
+            status_code=429,
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    window.append(now)
+    stats[platform]["accepted"] += 1
+    return JSONResponse(
+        {"id": f"{platform}-{stats[platform]['accepted']}", "account": body.get("account")},
+        status_code=201
+    )
+
+@app.get("/stats")
+async def get_stats():
+    elapsed = time.time() - started
+    return {
+        "elapsed_seconds": round(elapsed, 1),
+        "platforms": {
+            platform: {
+                **counts,
+                "limit": f"{limits.get(platform, (1000, 1))[0]}/{limits.get(platform, (1000, 1))[1]:g}s",
+                "accepted_per_second": round(counts["accepted"] / elapsed, 3) if elapsed else 0
+            }
+            for platform, counts in stats.items()
+        }
+    }
+
+def main():
+    global latency_ms
+
+    parser = argparse.ArgumentParser(description="Mock social platform API with rate limits")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--limit", action="append", default=[],
+                        help="Override a limit, e.g. twitter=300/10800 (repeatable)")
+    parser.add_argument("--latency-ms", type=int, default=0, help="Average simulated API latency")
+    args = parser.parse_args()
+
+    for item in args.limit:
+        platform, limit = item.split("=")
+        rate, per = limit.split("/")
+        limits[platform] = (int(rate), float(per))
+    latency_ms = args.latency_ms
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+SPLANTS Marketing Engine - Traffic Replay
+
+Re-issues requests recorded by main.py's traffic capture
+(TRAFFIC_CAPTURE_PATH) against a fresh stack with stubbed providers - the
+same stack scripts/load_test.py starts - and compares latency per route
+with a previous replay, so a change can be benchmarked on a
+production-shaped request mix without production.
+
+Usage (from the directory containing main.py):
+    python scripts/replay_traffic.py logs/traffic.jsonl --save before.json          # Original pacing
+    python scripts/replay_traffic.py logs/traffic.jsonl --speed 10 --save after.json # 10x faster
+    python scripts/replay_traffic.py logs/traffic.jsonl --speed 10 --compare before.json --check
+    python scripts/replay_traffic.py logs/traffic*.jsonl --speed 0 --max-concurrency 50  # As fast as possible
+    python scripts/replay_traffic.py logs/traffic.jsonl --target http://staging:8080 --api-key ...
+
+Replay is deterministic: requests go out in captured order at captured
+offsets (divided by --speed). Ids created during capture are mapped onto
+the ids this run creates, and a request referring to one (publishing
+content_id=... or GET /v1/content/{id}) waits until the request that
+creates it has finished. Webhook registrations are pointed at the stack's
+webhook sink, or skipped with --target unless --webhook-url is given.
+
+Without --compare, replayed latencies are shown next to the captured ones;
+those include real provider time, so only the non-LLM routes are directly
+comparable. --check exits 1 when a route's p95 is more than --threshold
+times the --compare run's (and at least --min-delta-ms slower).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from load_test import API_KEY, Stack, add_stack_arguments, percentile, wait_until_healthy  # noqa: E402
+
+# Requests whose new id is a content id, and where content ids are referenced
+CONTENT_CREATORS = ("/v1/generate", "/v1/templates/generate")
+CONTENT_REFERENCE = re.compile(r"^/v1/(content|ab-test)/(\d+)$")
+NUMERIC_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay captured traffic and diff latency distributions")
+    parser.add_argument("files", nargs="+", help="Capture files (JSON lines); several are merged by time")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Pacing multiplier (1 = original, 10 = ten times faster, 0 = no pacing)")
+    parser.add_argument("--limit", type=int, default=None, help="Replay only the first N requests")
+    parser.add_argument("--include", action="append", default=[], help="Only paths starting with this (repeatable)")
+    parser.add_argument("--exclude", action="append", default=[], help="Skip paths starting with this (repeatable)")
+    parser.add_argument("--max-concurrency", type=int, default=200,
+                        help="Requests in flight; further requests wait (and the pacing lag is reported)")
+    parser.add_argument("--webhook-url", default=None, help="Where replayed webhook registrations point (--target)")
+    parser.add_argument("--save", default=None, help="Write this run's per-route results here")
+    parser.add_argument("--compare", default=None, help="Per-route results of a previous run (--save)")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if a route regressed versus --compare")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Allowed p95 ratio versus --compare")
+    parser.add_argument("--min-delta-ms", type=float, default=20, help="Ignore p95 regressions smaller than this")
+    parser.add_argument("--min-count", type=int, default=20, help="Routes with fewer requests are not checked")
+    add_stack_arguments(parser)
+    return parser.parse_args()
+
+def route_of(path: str) -> str:
+    """/v1/content/123 -> /v1/content/{id}"""
+    return NUMERIC_SEGMENT.sub("/{id}", path)
+
+def load_records(args):
+    records = []
+    for path in args.files:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    records.append(json.loads(line))
+    records.sort(key=lambda record: record["t"])  # Stable: each file's own order is kept for ties
+
+    selected = [
+        record for record in records
+        if (not args.include or record["path"].startswith(tuple(args.include)))
+        and not (args.exclude and record["path"].startswith(tuple(args.exclude)))
+    ]
+    return selected[:args.limit] if args.limit else selected
+
+def summarize(latencies, statuses) -> dict:
+    return {
+        "count": len(latencies),
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 1),
+            "p90": round(percentile(latencies, 0.90), 1),
+            "p95": round(percentile(latencies, 0.95), 1),
+            "p99": round(percentile(latencies, 0.99), 1),
+            "max": round(max(latencies), 1) if latencies else 0.0
+        }
+    }
+
+# ============================================
+# REPLAY
+# ============================================
+
+class Replayer:
+    """Sends captured requests in order and pacing, remapping created ids"""
+
+    def __init__(self, client: httpx.AsyncClient, base_url: str, webhook_url, args):
+        self.client = client
+        self.base_url = base_url
+        self.webhook_url = webhook_url
+        self.args = args
+        self.created = {}  # captured content id -> future of the replayed id
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.counts = Counter()  # sent, skipped, status_mismatches, unmapped_references
+        self.max_lag = 0.0
+        self.semaphore = asyncio.Semaphore(args.max_concurrency)
+
+    async def resolve(self, captured_id):
+        """Replayed id for a captured content id (the captured id if it predates the capture)"""
+        future = self.created.get(captured_id) if isinstance(captured_id, int) else None
+        if future is None:
+            if isinstance(captured_id, int):
+                self.counts["unmapped_references"] += 1
+            return captured_id
+        replayed = await future
+        return replayed if replayed is not None else captured_id
+
+    async def build(self, record):
+        """(path, params, body) for a record, or None to skip it"""
+        path = record["path"]
+        params = [list(pair) for pair in record.get("query", [])]
+        body = record.get("body")
+
+        match = CONTENT_REFERENCE.match(path)
+        if match:
+            path = f"/v1/{match.group(1)}/{await self.resolve(int(match.group(2)))}"
+        for pair in params:
+            if pair[0] == "content_id" and pair[1].isdigit():
+                pair[1] = str(await self.resolve(int(pair[1])))
+        if isinstance(body, dict) and "content_id" in body:
+            body = {**body, "content_id": await self.resolve(body["content_id"])}
+
+        if path.startswith("/v1/webhook/"):
+            has_url = any(key == "url" for key, _ in params) or (isinstance(body, dict) and "url" in body)
+            if has_url:
+                if not self.webhook_url:
+                    return None  # Never call the URLs registered in production
+                params = [[key, self.webhook_url if key == "url" else value] for key, value in params]
+                if isinstance(body, dict) and "url" in body:
+                    body = {**body, "url": self.webhook_url}
+
+        return path, params, body
+
+    async def send(self, record, creates):
+        try:
+            built = await self.build(record)  # Outside the semaphore: may wait for another request
+            if built is None:
+                self.counts["skipped"] += 1
+                return
+            path, params, body = built
+
+            async with self.semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await self.client.request(
+                        record["method"], f"{self.base_url}{path}",
+                        params=params, json=body if "body" in record else None
+                    )
+                    status = response.status_code
+                except httpx.TimeoutException:
+                    status, response = "timeout", None
+                except httpx.HTTPError as e:
+                    status, response = type(e).__name__, None
+                elapsed = (time.perf_counter() - start) * 1000
+
+            route = route_of(record["path"])
+            self.counts["sent"] += 1
+            self.statuses[route][status] += 1
+            self.latencies[route].append(elapsed)
+            if status != record["status"]:
+                self.counts["status_mismatches"] += 1
+
+            if creates and not creates.done():
+                replayed_id = None
+                if response is not None and 200 <= response.status_code < 300:
+                    replayed_id = response.json().get("id")
+                creates.set_result(replayed_id)
+        finally:
+            if creates and not creates.done():
+                creates.set_result(None)  # Skipped or failed; dependents use the captured id
+
+    async def run(self, records):
+        tasks = []
+        if not records:
+            return
+        first = records[0]["t"]
+        start = time.perf_counter()
+
+        for record in records:
+            creates = None
+            if record.get("created_id") and record["path"] in CONTENT_CREATORS:
+                creates = asyncio.get_running_loop().create_future()
+                self.created[record["created_id"]] = creates
+
+            if self.args.speed > 0:
+                due = start + (record["t"] - first) / self.args.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self.max_lag = max(self.max_lag, -delay)
+            tasks.append(asyncio.create_task(self.send(record, creates)))
+
+        await asyncio.gather(*tasks)
+
+    def results(self):
+        return {route: summarize(self.latencies[route], self.statuses[route]) for route in sorted(self.latencies)}
+
+def captured_results(records):
+    latencies, statuses = defaultdict(list), defaultdict(Counter)
+    for record in records:
+        route = route_of(record["path"])
+        latencies[route].append(record["ms"])
+        statuses[route][record["status"]] += 1
+    return {route: summarize(latencies[route], statuses[route]) for route in sorted(latencies)}
+
+def print_comparison(results, reference, reference_name, args):
+    """Print both runs side by side; return the routes that regressed"""
+    print(f"\nLatency in ms, {reference_name} -> now")
+    print(f"{'route':<36}{'count':>7}  {'p50':^17}  {'p95':^17}  {'p99':^17}  {'p95 ratio':>9}")
+    regressions = []
+    for route in sorted(set(results) | set(reference)):
+        now = results.get(route)
+        before = reference.get(route)
+        if not now:
+            print(f"{route:<36}{'-':>7}  (only in {reference_name})")
+            continue
+
+        cells = []
+        for key in ("p50", "p95", "p99"):
+            old = f"{before['latency_ms'][key]:.0f}" if before else "-"
+            cells.append(f"{old:>7} -> {now['latency_ms'][key]:<7.0f}")
+        ratio_text, flag = "-", ""
+        if before and before["latency_ms"]["p95"]:
+            ratio = now["latency_ms"]["p95"] / before["latency_ms"]["p95"]
+            ratio_text = f"{ratio:.2f}x"
+            slower = now["latency_ms"]["p95"] - before["latency_ms"]["p95"]
+            if (ratio > args.threshold and slower > args.min_delta_ms
+                    and min(now["count"], before["count"]) >= args.min_count):
+                regressions.append((route, ratio))
+                flag = "  << REGRESSION"
+        print(f"{route:<36}{now['count']:>7}  " + "  ".join(cells) + f"  {ratio_text:>9}{flag}")
+    return regressions
+
+async def run(args):
+    records = load_records(args)
+    if not records:
+        raise SystemExit("No requests to replay")
+    span = records[-1]["t"] - records[0]["t"]
+    print(f"Replaying {len(records)} requests captured over {span:.0f}s"
+          + (f" at {args.speed:g}x speed" if args.speed > 0 else " without pacing"))
+
+    stack = None if args.target else Stack(args)
+    base_url, api_key, webhook_url = args.target, args.api_key, args.webhook_url
+
+    limits = httpx.Limits(max_connections=args.max_concurrency, max_keepalive_connections=args.max_concurrency)
+    try:
+        if stack:
+            stack.start()  # Inside the try: a half-started stack is stopped too
+            base_url, api_key = stack.urls["app"], API_KEY
+            webhook_url = webhook_url or f"{stack.urls['sink']}/replay"
+
+        async with httpx.AsyncClient(
+            headers={"X-API-Key": api_key}, timeout=httpx.Timeout(120.0), limits=limits
+        ) as client:
+            await wait_until_healthy(client, base_url)
+            replayer = Replayer(client, base_url, webhook_url, args)
+            start = time.perf_counter()
+            await replayer.run(records)
+            elapsed = time.perf_counter() - start
+    finally:
+        if stack:
+            stack.stop()
+
+    results = replayer.results()
+    counts = replayer.counts
+    print(f"\nSent {counts['sent']} in {elapsed:.1f}s ({counts['sent'] / elapsed:.1f} rps), "
+          f"skipped {counts['skipped']}, status different from capture: {counts['status_mismatches']}, "
+          f"references to pre-capture ids: {counts['unmapped_references']}")
+    if args.speed > 0 and replayer.max_lag > 1:
+        print(f"Pacing fell up to {replayer.max_lag:.1f}s behind (raise --max-concurrency or lower --speed)")
+
+    if args.compare:
+        with open(args.compare) as f:
+            reference = json.load(f)
+        regressions = print_comparison(results, reference["routes"], "before", args)
+    else:
+        regressions = print_comparison(results, captured_results(records), "captured", args)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "files": args.files,
+                "speed": args.speed,
+                "requests": counts["sent"],
+                "routes": results
+            }, f, indent=2)
+            f.write("\n")
+        print(f"\nResults saved to {args.save}")
+
+    if args.compare and regressions:
+        print(f"\n{len(regressions)} route(s) with p95 more than {args.threshold:g}x the previous run:")
+        for route, ratio in regressions:
+            print(f"  {route}: {ratio:.2f}x")
+    return 1 if args.check and args.compare and regressions else 0
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.getcwd())
+    sys.exit(asyncio.run(run(parse_args())))
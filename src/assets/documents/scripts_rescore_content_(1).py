@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+SPLANTS Marketing Engine - Re-score the Content Library
+
+Recomputes quality and SEO scores for every stored document with the
+current scoring rules and writes back the ones that changed. Same job as
+POST /v1/system/rescore, run from the command line (no API server needed).
+
+Usage (from the directory containing main.py):
+    DATABASE_URL=postgresql://... python scripts/rescore_content.py
+    python scripts/rescore_content.py --chunk-size 5000 --dry-run
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Re-score stored content with the current scoring rules")
+    parser.add_argument("--chunk-size", type=int, default=None,
+                        help="Documents per read/score/write round (default: RESCORE_CHUNK_SIZE)")
+    parser.add_argument("--dry-run", action="store_true", help="Score everything but write nothing back")
+    return parser.parse_args()
+
+def configure():
+    """Environment for main.py - must be set before it is imported"""
+    os.environ.setdefault("OPENAI_API_KEY", "rescore")
+    os.environ["SCHEDULER_ENABLED"] = "false"  # Don't publish anything from here
+
+async def run(args):
+    sys.path.insert(0, os.getcwd())
+    import main
+
+    await main.startup()
+    try:
+        result = await main.content_rescorer.run(args.chunk_size, args.dry_run)
+    finally:
+        await main.shutdown()
+
+    print("=" * 60)
+    print("Content re-scoring" + (" (dry run)" if args.dry_run else ""))
+    print("=" * 60)
+    print(f"Documents scored:   {result['scored']}")
+    print(f"Documents skipped:  {result['skipped']}  (changed by hashtags or platform optimization after scoring)")
+    print(f"Scores updated:     {result['updated']}")
+    print(f"Elapsed:            {result['elapsed_seconds']}s  ({result['documents_per_second']} documents/s)")
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    configure()
+    asyncio.run(run(arguments))
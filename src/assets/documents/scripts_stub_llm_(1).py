@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+SPLANTS Marketing Engine - Stub LLM Server
+
+Answers OpenAI chat completion and Anthropic messages requests with
+synthetic marketing copy, so main.py can be load-tested without spending
+money. Latency is first-token latency (drawn from a distribution) plus
+generation time at a fixed token rate - the two things that decide how
+many requests a worker holds open at once.
+
+Usage:
+    python scripts/stub_llm.py --port 9300 --latency-ms 800 --latency-p99-ms 4000 --tokens-per-second 60
+
+    OPENAI_BASE_URL=http://localhost:9300/v1 ANTHROPIC_BASE_URL=http://localhost:9300 python main.py
+
+    curl http://localhost:9300/stats      # requests, tokens and latency served
+"""
+
+import argparse
+import asyncio
+import math
+import random
+import time
+import uuid
+from collections import defaultdict, deque
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="SPLANTS Stub LLM")
+
+config = {
+    "latency_ms": 800.0,
+    "latency_p99_ms": 3000.0,
+    "distribution": "lognormal",
+    "tokens_per_second": 60.0,
+    "max_words": 3000,
+    "error_rate": 0.0,
+    "rate_limit_rate": 0.0,
+}
+LATENCY_SAMPLES = 100_000  # Percentiles cover the most recent requests, so memory stays flat on long runs
+stats = defaultdict(lambda: {
+    "requests": 0, "errors": 0, "rate_limited": 0, "completion_tokens": 0,
+    "latencies_ms": deque(maxlen=LATENCY_SAMPLES)
+})
+started = time.time()
+
+WORDS = (
+    "marketing teams customers growth results data insights audience engagement campaign budget "
+    "channel conversion funnel traffic content posts video search ranking strategy tools platform "
+    "workflow quality value trust story offer launch simple faster better proven practical measurable "
+    "consistent personal local build grow learn discover start try explore improve measure share"
+).split()
+
+def first_token_latency() -> float:
+    """Seconds before the first token, from the configured distribution"""
+    median = config["latency_ms"] / 1000
+    if config["distribution"] == "fixed":
+        return median
+    if config["distribution"] == "uniform":
+        return random.uniform(0, 2 * median)
+    # lognormal: heavy right tail, parameterized by its median and p99
+    sigma = max(math.log(max(config["latency_p99_ms"], config["latency_ms"]) / config["latency_ms"]) / 2.326, 1e-6)
+    return random.lognormvariate(math.log(median), sigma)
+
+def synthesize(max_tokens: int, prompt: str) -> str:
+    """Marketing-style markdown of about 0.75 words per token"""
+    words = max(20, min(int(max_tokens * 0.75), config["max_words"]))
+    keywords = [word.strip(",.") for word in prompt.split() if len(word) > 6][:5] or WORDS[:3]
+    paragraphs = [f"## {random.choice(keywords).title()} That Works"]
+    written = 0
+    while written < words:
+        sentences = []
+        for _ in range(random.randint(2, 4)):
+            length = random.randint(10, 20)
+            tokens = [random.choice(WORDS) for _ in range(length)]
+            tokens[random.randrange(length)] = random.choice(keywords)
+            sentences.append(" ".join(tokens).capitalize() + random.choice([".", ".", "!", "?"]))
+            written += length
+        paragraphs.append(" ".join(sentences))
+    paragraphs.append("In summary, start small, measure everything and learn more every week.")
+    return "\n\n".join(paragraphs)
+
+async def respond(api: str, body: dict, prompt: str):
+    """Shared latency, failure injection and accounting; returns (text, tokens) or an error response"""
+    counters = stats[api]
+    counters["requests"] += 1
+
+    roll = random.random()
+    if roll < config["rate_limit_rate"]:
+        counters["rate_limited"] += 1
+        return None, JSONResponse(
+            {"error": {"type": "rate_limit_error", "message": "Rate limit exceeded (stub)"}},
+            status_code=429,
+            headers={"Retry-After": "1"}
+        )
+    if roll < config["rate_limit_rate"] + config["error_rate"]:
+        counters["errors"] += 1
+        await asyncio.sleep(first_token_latency())
+        return None, JSONResponse(
+            {"error": {"type": "server_error", "message": "Injected failure (stub)"}},
+            status_code=500
+        )
+
+    start = time.perf_counter()
+    text = synthesize(int(body.get("max_tokens") or 1000), prompt)
+    completion_tokens = int(len(text.split()) / 0.75)
+    await asyncio.sleep(first_token_latency() + completion_tokens / config["tokens_per_second"])
+
+    counters["completion_tokens"] += completion_tokens
+    counters["latencies_ms"].append((time.perf_counter() - start) * 1000)
+    return (text, completion_tokens), None
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    """OpenAI-compatible chat completion"""
+    body = await request.json()
+    prompt = " ".join(str(message.get("content", "")) for message in body.get("messages", []))
+    result, error = await respond("openai", body, prompt)
+    if error:
+        return error
+
+    text, completion_tokens = result
+    prompt_tokens = int(len(prompt.split()) / 0.75)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4-turbo-preview"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+    }
+
+@app.post("/v1/messages")
+async def messages(request: Request):
+    """Anthropic-compatible messages"""
+    body = await request.json()
+    prompt = str(body.get("system", "")) + " " + " ".join(
+        str(message.get("content", "")) for message in body.get("messages", [])
+    )
+    result, error = await respond("anthropic", body, prompt)
+    if error:
+        return error
+
+    text, completion_tokens = result
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": body.get("model", "claude-3-sonnet-20240229"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": int(len(prompt.split()) / 0.75), "output_tokens": completion_tokens}
+    }
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+@app.get("/stats")
+async def get_stats():
+    return {
+        "elapsed_seconds": round(time.time() - started, 1),
+        "config": config,
+        "apis": {
+            api: {
+                "requests": counters["requests"],
+                "errors": counters["errors"],
+                "rate_limited": counters["rate_limited"],
+                "completion_tokens": counters["completion_tokens"],
+                "latency_ms": {
+                    "p50": round(percentile(counters["latencies_ms"], 0.50), 1),
+                    "p95": round(percentile(counters["latencies_ms"], 0.95), 1),
+                    "p99": round(percentile(counters["latencies_ms"], 0.99), 1)
+                }
+            }
+            for api, counters in stats.items()
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI/Anthropic-compatible stub with configurable latency")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9300)
+    parser.add_argument("--latency-ms", type=float, default=800, help="Median first-token latency")
+    parser.add_argument("--latency-p99-ms", type=float, default=3000, help="p99 first-token latency (lognormal)")
+    parser.add_argument("--distribution", choices=["lognormal", "uniform", "fixed"], default="lognormal")
+    parser.add_argument("--tokens-per-second", type=float, default=60, help="Generation speed")
+    parser.add_argument("--max-words", type=int, default=3000, help="Cap on generated words per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests rejected with 429")
+    args = parser.parse_args()
+
+    config.update(
+        latency_ms=args.latency_ms,
+        latency_p99_ms=args.latency_p99_ms,
+        distribution=args.distribution,
+        tokens_per_second=args.tokens_per_second,
+        max_words=args.max_words,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate
+    )
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
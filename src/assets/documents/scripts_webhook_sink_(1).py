@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+SPLANTS Marketing Engine - Webhook Sink
+
+Receives webhook deliveries during load tests and reports what arrived:
+deliveries, events per type, batch sizes and delivery lag (time from the
+event's timestamp to its arrival). Can answer slowly or fail on purpose to
+exercise retries and the dead-letter queue.
+
+Usage:
+    python scripts/webhook_sink.py --port 9200 --latency-ms 50 --error-rate 0.05
+
+    curl -X POST -H "X-API-Key: ..." \\
+         "http://localhost:8080/v1/webhook/register?event=content_generated&url=http://localhost:9200/hooks"
+    curl http://localhost:9200/stats
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="SPLANTS Webhook Sink")
+
+config = {"latency_ms": 0.0, "error_rate": 0.0}
+deliveries = Counter()  # accepted / failed
+events = Counter()  # event type -> events received
+batch_sizes = Counter()
+LAG_SAMPLES = 100_000  # Percentiles cover the most recent events, so memory stays flat on long runs
+lags_ms = deque(maxlen=LAG_SAMPLES)
+started = time.time()
+
+@app.post("/{path:path}")
+async def receive(path: str, request: Request):
+    """Accept a single event or a batch (JSON array)"""
+    body = await request.json()
+
+    if config["latency_ms"]:
+        await asyncio.sleep(random.uniform(0.5, 1.5) * config["latency_ms"] / 1000)
+
+    if random.random() < config["error_rate"]:
+        deliveries["failed"] += 1
+        return JSONResponse({"error": "injected failure"}, status_code=503)
+
+    batch = body if isinstance(body, list) else [body]
+    deliveries["accepted"] += 1
+    batch_sizes[len(batch)] += 1
+    now = datetime.utcnow()
+    for event in batch:
+        events[event.get("event", "unknown")] += 1
+        try:
+            lags_ms.append((now - datetime.fromisoformat(event["timestamp"])).total_seconds() * 1000)
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    return {"received": len(batch)}
+
+def percentile(values, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+@app.get("/stats")
+async def get_stats():
+    return {
+        "elapsed_seconds": round(time.time() - started, 1),
+        "deliveries": dict(deliveries),
+        "events": dict(events),
+        "batch_sizes": dict(sorted(batch_sizes.items())),
+        "delivery_lag_ms": {
+            "p50": round(percentile(lags_ms, 0.50), 1),
+            "p95": round(percentile(lags_ms, 0.95), 1),
+            "p99": round(percentile(lags_ms, 0.99), 1),
+            "max": round(max(lags_ms), 1) if lags_ms else 0.0
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Webhook receiver that records what arrives")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Average response latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of deliveries answered with 503")
+    args = parser.parse_args()
+
+    config.update(latency_ms=args.latency_ms, error_rate=args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+SPLANTS Marketing Engine - Scoring Unit Tests
+
+BatchScorer must give the same scores as the per-document scorers it
+mirrors (assess_quality() and calculate_seo_score() through
+run_post_processing()), or re-scoring the library silently changes scores.
+Checked over randomized documents that reach every scoring branch.
+KeywordMatcher is checked against a plain per-keyword regex. No server,
+database or API keys needed.
+
+Usage (from the directory containing scoring.py):
+    python -m pytest -q test_scoring.py
+"""
+
+import random
+import re
+
+import numpy as np
+import pytest
+
+from scoring import BatchScorer, KeywordMatcher, PostProcessRequest, TextAnalysis, run_post_processing
+
+KEYWORDS = [
+    "AI", "ai marketing", "marketing", "SEO", "small business", "content strategy",
+    "email", "c++", ".net", "growth",
+]
+
+VOCABULARY = (
+    "the a of to and in for with your our that this is are can will more "
+    "customers teams results data maintain email-ready marketing-led growth "
+    "click visit learn discover join get try start explore conclusion finally"
+).split()
+
+def random_document(rng: random.Random, keywords) -> str:
+    """Text with a random mix of the features the scorers look at"""
+    shape = rng.random()
+    if shape < 0.05:
+        return ""
+    if shape < 0.15:
+        # No sentence endings at all (readability is skipped)
+        return " ".join(rng.choice(VOCABULARY + keywords) for _ in range(rng.randint(1, 400)))
+
+    paragraphs = []
+    for _ in range(rng.randint(1, 14)):
+        if rng.random() < 0.2:
+            header = rng.choice(["## ", "### ", "H2: ", "**"])
+            paragraphs.append(header + " ".join(rng.choice(VOCABULARY + keywords) for _ in range(rng.randint(1, 6))))
+        sentences = []
+        for _ in range(rng.randint(1, 8)):
+            tokens = [rng.choice(VOCABULARY) for _ in range(rng.randint(1, 35))]
+            for _ in range(rng.randint(0, 3)):
+                if keywords and rng.random() < 0.5:
+                    tokens.insert(rng.randint(0, len(tokens)), rng.choice(keywords).upper() if rng.random() < 0.2 else rng.choice(keywords))
+            if rng.random() < 0.1:
+                tokens.append(str(rng.randint(1, 99)) + "%")
+            sentences.append(" ".join(tokens) + rng.choice([".", ".", "!", "?", ""]))
+        if rng.random() < 0.15:
+            sentences.append("\n" + "\n".join(rng.choice(["- ", "• ", "1. ", "* "]) + rng.choice(VOCABULARY) for _ in range(3)))
+        if rng.random() < 0.1:
+            sentences.append("[see also]")
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+def random_case(seed: int):
+    rng = random.Random(seed)
+    keywords = rng.sample(KEYWORDS, rng.choice([0, 0, 1, 2, 3, 5]))
+    text = random_document(rng, keywords)
+    words = len(text.split())
+    # No target, or one that puts the word count in each of the length bands
+    length = rng.choice([None, max(1, int(words / rng.uniform(0.5, 1.5))), rng.randint(1, 3000)])
+    seo_optimize = rng.random() < 0.7
+    return text, keywords, length, seo_optimize
+
+@pytest.mark.parametrize("seed", range(20))
+def test_batch_scores_match_per_document_scores(seed):
+    cases = [random_case(seed * 1000 + i) for i in range(100)]
+
+    quality, seo = BatchScorer().score_documents(
+        [(text, keywords, length) for text, keywords, length, _ in cases],
+        [seo_optimize for *_, seo_optimize in cases]
+    )
+
+    for i, (text, keywords, length, seo_optimize) in enumerate(cases):
+        request = PostProcessRequest("blog", "blog", keywords, length, False)
+        expected = run_post_processing(text, request, score_seo=seo_optimize, optimize=False)
+        assert quality[i] == pytest.approx(expected["quality_score"], abs=1e-9), (text[:200], keywords, length)
+        assert seo[i] == pytest.approx(expected["seo_score"], abs=1e-9), (text[:200], keywords, length)
+
+def test_batch_scores_reach_every_branch():
+    """The randomized cases above cover the branches the scorers special-case"""
+    cases = [random_case(seed * 1000 + i) for seed in range(20) for i in range(100)]
+    scorer = BatchScorer()
+    features = np.array([scorer.extract_features(text, keywords, length) for text, keywords, length, _ in cases])
+    f = dict(zip(BatchScorer.FEATURES, features.T))
+
+    assert (f["keywords"] == 0).any() and (f["keywords"] > 0).any()
+    assert (f["sentences"] == 0).any() and (f["sentences"] > 0).any()
+    assert (f["target_length"] == 0).any() and (f["target_length"] > 0).any()
+    assert (f["word_count"] == 0).any()
+    assert any(seo_optimize for *_, seo_optimize in cases) and not all(seo_optimize for *_, seo_optimize in cases)
+
+def test_score_documents_empty():
+    quality, seo = BatchScorer().score_documents([])
+    assert quality.shape == seo.shape == (0,)
+
+# ============================================
+# KEYWORD MATCHING
+# ============================================
+
+def reference_search(keywords, text):
+    """One whole-word regex scan per keyword (non-overlapping, like re.finditer)"""
+    return {
+        keyword.lower(): [m.start() for m in re.finditer(r'(?<!\w)' + re.escape(keyword.lower()) + r'(?!\w)', text)]
+        for keyword in keywords
+    }
+
+def test_keyword_is_whole_word_only():
+    found = KeywordMatcher.compile(["AI"]).search("maintain email, paid ai. ai-driven ai_tools (ai)")
+    assert found == {"ai": [21, 25, 45]}
+
+def test_keyword_prefix_of_another_keyword():
+    text = "ai marketing beats marketing ai. ai marketers"
+    found = KeywordMatcher.compile(["ai", "ai marketing", "marketing"]).search(text)
+    assert found == {"ai": [0, 29, 33], "ai marketing": [0], "marketing": [3, 19]}
+
+def test_keywords_with_non_word_characters():
+    text = "learn c++ and .net; c++x, asp.net and c++."
+    found = KeywordMatcher.compile(["C++", ".NET"]).search(text)
+    assert found == {"c++": [6, 38], ".net": [14]}
+
+def test_repeated_keyword_occurrences_do_not_overlap():
+    assert KeywordMatcher.compile(["go go"]).search("go go go go") == {"go go": [0, 6]}
+
+def test_text_analysis_counts_whole_words_case_insensitively():
+    analysis = TextAnalysis("AI helps you maintain focus. Ai marketing wins, ai!", ["AI"])
+    assert analysis.keyword_count("ai") == 3
+    assert analysis.contains("AI marketing")
+    assert not analysis.contains("main")
+
+@pytest.mark.parametrize("seed", range(10))
+def test_matcher_matches_reference_search(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        keywords = rng.sample(KEYWORDS, rng.randint(1, 5))
+        text = " ".join(
+            rng.choice(VOCABULARY + keywords + ["ai-", "c++x", "asp.net", "ai_", "(ai)"]) for _ in range(rng.randint(0, 60))
+        ).lower()
+        assert KeywordMatcher.compile(keywords).search(text) == reference_search(keywords, text), (keywords, text)